@@ -1,55 +1,42 @@
+import datetime
+import functools
+from urllib.parse import urlencode
+
 from django import forms
+from django.conf import settings
 from django.contrib import admin
-from django.utils.translation import gettext as _
-from import_export.resources import ModelResource
-from import_export.admin import ExportMixin
-from import_export.formats.base_formats import CSV, XLSX
-
-from .forms import ClientAdminForm
-from .models import Client
-
-
-class ClientResource(ModelResource):
-    class Meta:
-        # Set the model to be used for the resource
-        model = Client
-
-        # Exclude following fields from export
-        exclude = (
-            'id',
-            # 'added', 'tracker_activation_date',
-            # 'tracker_status_note', 'sim_active', 'sim_status_note',
-            # 'sim_code', 'sage_invoice_reference', 'sage_payment_reference',
-            # 'description',
-            'created_at'
-        )
+from django.contrib import messages
+from django.contrib.admin import helpers
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404, HttpResponseRedirect, StreamingHttpResponse
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
+from django.utils.translation import get_language, gettext as _
+from django_countries import countries
+from import_export.signals import post_export
 
-        # Set export field order
-        # export_order = (
-        #     'email', 'sage_details', 'tracker_imei', 'expire_date', 'tracker_expire_date',
-        #     'sim_number', 'sim_exp_date', 'sim_expire', 'sim_provider', 'tracker_status',
-        #     'tracker_model', 'sold_by', 'country', 'status'
-        # )
+from ezitrack.db import read_from_replica, replica_alias
+
+from .export import LazyExportMixin, get_export_field_names, stream_csv, streaming_export_response
+from .filters import CachedFacetFilter, ExpiryCodeFilter
+from .forms import ClientAdminForm, ClientImportForm, ExpiryExtensionForm, SimReconcileForm
+from .importer import import_clients, read_rows
+from .models import (
+    EXPIRY_CODE_FIELDS, STATUS, Client, ClientEvent, ExpiryExtension, ExpiryRollup, ExportJob, expiry_code,
+)
+from .pagination import EstimatedCountPaginator, KeysetChangeList
+from .reconcile import DIFF_HEADERS, provider_rows, reconcile
+from .rollups import ROLLUP_KINDS, add_months, dashboard_tables
+from .search import search_clients
 
-    def get_export_headers(self, fields=None, selected_fields=None):
-        """
-        Returns a list of headers to be used in the export file.
-        Uses the verbose name of each field in the export fields.
-        """
-        headers = []
-        # If selected_fields is provided, use it; otherwise, use all export fields
-        if selected_fields:
-            fields = selected_fields
-        else:
-            fields = self.get_export_fields()
 
-        for field in fields:
-            # Get the verbose name of the field from the model's meta data
-            headers.append(self.Meta.model._meta.get_field(field).verbose_name)
-        return headers
+@functools.lru_cache
+def country_names(language):
+    return dict(countries)
 
 
-class ClientAdmin(ExportMixin, admin.ModelAdmin):
+class ClientAdmin(LazyExportMixin, admin.ModelAdmin):
     form = ClientAdminForm  # Use the custom form
 
     fieldsets = (
@@ -69,6 +56,8 @@ class ClientAdmin(ExportMixin, admin.ModelAdmin):
                 'sim_exp_date',
                 'sim_expire',
                 'status',
+                'activated_at',
+                'suspended_at',
                 'sim_status_note',
                 'sim_provider',
                 'sim_code',
@@ -98,38 +87,470 @@ class ClientAdmin(ExportMixin, admin.ModelAdmin):
         }),
     )
 
-    def save_model(self, request, obj, form, change):
-        # Save concatenated fields back to the original fields
-        obj.sage_invoice_reference = form.cleaned_data['sage_invoice_reference']
-        obj.sage_payment_reference = form.cleaned_data['sage_payment_reference']
-        super().save_model(request, obj, form, change)
+    readonly_fields = ('expire_date', 'sim_exp_date', 'activated_at', 'suspended_at')
+
+    actions = ['activate_sims', 'suspend_sims', 'extend_expiry']
+
+    @admin.action(description=_('Set SIM status to ACTIVE'), permissions=['change'])
+    def activate_sims(self, request, queryset):
+        count = Client.objects.bulk_set_status(queryset, "ACTIVE")
+        self.message_user(request, _("%d SIM(s) activated.") % count, messages.SUCCESS)
+
+    @admin.action(description=_('Set SIM status to SUSPENDED'), permissions=['change'])
+    def suspend_sims(self, request, queryset):
+        count = Client.objects.bulk_set_status(queryset, "SUSPENDED")
+        self.message_user(request, _("%d SIM(s) suspended.") % count, messages.SUCCESS)
+
+    @admin.action(description=_('Extend SIM or tracker expiry'), permissions=['change'])
+    def extend_expiry(self, request, queryset):
+        # Ask for the kind and the number of months first, then extend with one UPDATE
+        form = ExpiryExtensionForm(request.POST if 'apply' in request.POST else None)
+        selected = request.POST.getlist(helpers.ACTION_CHECKBOX_NAME)
+        select_across = request.POST.get('select_across', '0')
+        if form.is_valid():
+            if select_across == '1':
+                description = _("Admin: all clients matching ?%s") % request.GET.urlencode()
+            else:
+                description = _("Admin: %d selected clients") % len(selected)
+            count = Client.objects.bulk_extend_expiry(
+                queryset, form.cleaned_data['kind'], form.cleaned_data['months'],
+                user=request.user, description=description,
+            )
+            self.message_user(
+                request,
+                _("Extended the %(kind)s expiry of %(count)d client(s) by %(months)d months.") % {
+                    'kind': form.cleaned_data['kind'], 'count': count, 'months': form.cleaned_data['months'],
+                },
+                messages.SUCCESS,
+            )
+            return None
 
-    # Set export formats
-    formats = [CSV, XLSX]
+        context = {
+            **self.admin_site.each_context(request),
+            'title': _('Extend expiry'),
+            'opts': self.model._meta,
+            'form': form,
+            'count': queryset.count(),
+            'selected': selected,
+            'select_across': select_across,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        }
+        return TemplateResponse(request, 'admin/client/client/extend_expiry.html', context)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        form.save_references()
+
+    # Set export formats; they and the resource are imported on the first export, see LazyExportMixin
+    formats = ['import_export.formats.base_formats.CSV', 'import_export.formats.base_formats.XLSX']
 
     # Set export resource class
-    resource_class = ClientResource
+    resource_classes = ['client.resources.ClientResource']
+
+    # Allow exports to be queued as background jobs
+    export_form_class = 'client.forms.ClientExportForm'
+
+    # Show the Import and Reconcile SIMs buttons next to Export
+    import_export_change_list_template = 'admin/client/client/change_list_import_export.html'
+
+    def get_urls(self):
+        urls = super().get_urls()
+        my_urls = [
+            path('import/', self.admin_site.admin_view(self.import_view), name='client_client_import'),
+            path('reconcile/', self.admin_site.admin_view(self.reconcile_view), name='client_client_reconcile'),
+        ]
+        return my_urls + urls
+
+    def has_import_permission(self, request):
+        return self.has_add_permission(request) and self.has_change_permission(request)
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = extra_context or {}
+        extra_context['has_import_permission'] = self.has_import_permission(request)
+        if request.method != 'GET':
+            # Actions write, so they run against the primary
+            return super().changelist_view(request, extra_context)
+
+        # Page reads go to the replica; render inside the block since the
+        # result list is only fetched when the template is rendered
+        with read_from_replica():
+            response = super().changelist_view(request, extra_context)
+            if hasattr(response, 'render'):
+                response.render()
+        return response
+
+    def import_view(self, request):
+        from .resources import ClientResource
+
+        if not self.has_import_permission(request):
+            raise PermissionDenied
+
+        report = None
+        form = ClientImportForm(request.POST or None, request.FILES or None)
+        if form.is_valid():
+            import_file = form.cleaned_data['import_file']
+            extension = import_file.name.rsplit('.', 1)[-1].lower()
+            report = import_clients(
+                ClientResource(),
+                read_rows(import_file, extension),
+                dry_run=form.cleaned_data['dry_run'],
+            )
+            if not report.dry_run and not report.has_errors:
+                self.message_user(
+                    request,
+                    _("Imported %(created)d new and %(updated)d updated clients.") % {
+                        'created': report.created, 'updated': report.updated,
+                    },
+                    messages.SUCCESS,
+                )
+                return HttpResponseRedirect(reverse('admin:client_client_changelist'))
+
+        context = {
+            **self.admin_site.each_context(request),
+            'title': _('Import'),
+            'opts': self.model._meta,
+            'form': form,
+            'report': report,
+        }
+        return TemplateResponse(request, 'admin/client/client/import.html', context)
+
+    def reconcile_view(self, request):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+
+        form = SimReconcileForm(request.POST or None, request.FILES or None)
+        if form.is_valid():
+            provider_file = form.cleaned_data['provider_file']
+            file_format = form.cleaned_data['provider']
+            as_of = form.cleaned_data['as_of']
+            extension = provider_file.name.rsplit('.', 1)[-1].lower()
+            try:
+                rows = provider_rows(read_rows(provider_file, extension), file_format)
+            except ValueError as exc:
+                form.add_error('provider_file', str(exc))
+            else:
+                # The diff is written out while the file and the clients are merged
+                response = StreamingHttpResponse(
+                    stream_csv(DIFF_HEADERS, reconcile(rows, file_format, as_of)), content_type='text/csv',
+                )
+                response['Content-Disposition'] = 'attachment; filename="sim-reconciliation-{}-{}.csv"'.format(
+                    file_format, as_of.isoformat(),
+                )
+                return response
+
+        context = {
+            **self.admin_site.each_context(request),
+            'title': _('Reconcile SIMs'),
+            'opts': self.model._meta,
+            'form': form,
+        }
+        return TemplateResponse(request, 'admin/client/client/reconcile.html', context)
+
+    # XLSX exports of more clients than this are queued as an ExportJob: the
+    # workbook can't be streamed, so the request would build it all first
+    xlsx_export_limit = getattr(settings, 'CLIENT_XLSX_EXPORT_LIMIT', 10000)
+
+    def queue_export(self, request, file_format, field_names, export_form):
+        # Queue the export for the job runner and return straight away
+        job = ExportJob.objects.create(
+            created_by=request.user,
+            file_format=file_format.get_extension(),
+            filters=request.GET.urlencode(),
+            items=[int(pk) for pk in export_form.cleaned_data.get('export_items') or []],
+            fields=field_names,
+        )
+        messages.info(request, _("Export #%s has been queued.") % job.pk)
+        return HttpResponseRedirect(reverse('admin:client_exportjob_changelist'))
+
+    def _do_file_export(self, file_format, request, queryset, export_form=None):
+        # Stream the export instead of building the whole tablib dataset in memory
+        if not self.has_export_permission(request):
+            raise PermissionDenied
+
+        resource_class = self.choose_export_resource_class(export_form, request)
+        resource = resource_class(**self.get_export_resource_kwargs(request))
+        field_names = get_export_field_names(
+            resource, self.get_export_resource_fields_from_form(export_form)
+        )
+
+        if export_form is not None:
+            if export_form.cleaned_data.get('background'):
+                return self.queue_export(request, file_format, field_names, export_form)
+            if file_format.is_binary() and queryset.using(replica_alias()).count() > self.xlsx_export_limit:
+                messages.info(request, _("XLSX exports of more than %s clients run in the background.") % (
+                    self.xlsx_export_limit,
+                ))
+                return self.queue_export(request, file_format, field_names, export_form)
+
+        # The rows are read while the response streams, so pin the replica on the queryset
+        response = streaming_export_response(
+            file_format, resource, queryset.using(replica_alias()), field_names,
+            self.get_export_filename(request, queryset, file_format),
+        )
+        post_export.send(sender=None, model=self.model)
+        return response
 
     # Set the fields to be displayed in the list view of the admin
     list_display = (
-        'email', 'sage_details', 'tracker_imei', 'expire_date', 'tracker_expire_date',
-        'sim_number', 'sim_exp_date', 'sim_expire', 'sim_provider', 'tracker_status',
-        'tracker_model', 'sold_by', 'country', 'status'
+        'email', 'sage_details', 'tracker_imei', 'tracker_exp_code', 'tracker_expire_date',
+        'sim_number', 'sim_exp_code', 'sim_expire', 'sim_provider', 'tracker_status',
+        'tracker_model', 'sold_by', 'country_name', 'status'
     )
 
-    # Add search fields for the admin
+    # Columns read by the list_display methods
+    list_display_columns = {
+        'tracker_exp_code': ('expire_date',),
+        'sim_exp_code': ('sim_exp_date',),
+        'country_name': ('country',),
+    }
+
+    # Days before expiry a SIM or tracker is highlighted as expiring soon
+    expiry_warning_days = getattr(settings, 'CLIENT_EXPIRY_WARNING_DAYS', 30)
+
+    # Columns read by row_classes()
+    row_class_columns = ('status', 'tracker_status', 'sim_expire', 'tracker_expire_date')
+
+    def row_classes(self, obj, today):
+        """
+        Returns the CSS classes of the changelist row of ``obj``; custom.css
+        colours the status and expiry cells by them.
+        """
+        classes = []
+        if obj.status == "SUSPENDED":
+            classes.append('sim-suspended')
+        if obj.tracker_status == "SUSPENDED":
+            classes.append('tracker-suspended')
+        warning_date = today + datetime.timedelta(days=self.expiry_warning_days)
+        for prefix, expire in (('sim', obj.sim_expire), ('tracker', obj.tracker_expire_date)):
+            if expire < today:
+                classes.append(f'{prefix}-expired')
+            elif expire <= warning_date:
+                classes.append(f'{prefix}-expiring')
+        return ' '.join(classes)
+
+    def get_list_columns(self, request):
+        """
+        Returns the columns the changelist rows are loaded with, so a page
+        doesn't fetch the note TextFields or other columns it doesn't show.
+        """
+        columns = ['pk', *self.row_class_columns]
+        for name in self.get_list_display(request):
+            if name in self.list_display_columns:
+                columns.extend(self.list_display_columns[name])
+            elif name in {field.name for field in Client._meta.concrete_fields}:
+                columns.append(name)
+        return columns
+
+    # Expiry code columns sort by their date rather than alphabetically
+    @admin.display(description=_('TRACKER EXP DATE'), ordering='tracker_expire_date')
+    def tracker_exp_code(self, obj):
+        return obj.expire_date
+
+    @admin.display(description=_('SIM EXP DATE'), ordering='sim_expire')
+    def sim_exp_code(self, obj):
+        return obj.sim_exp_date
+
+    # Page by position with an estimated count, so deep pages and big fleets stay as fast as the first page
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    # Looked up in a dict built once per language; the field's own display rebuilds the country list per cell
+    @admin.display(description=_('COUNTRY IN USE'), ordering='country')
+    def country_name(self, obj):
+        return country_names(get_language()).get(obj.country.code, obj.country.code)
+
+    # Add search fields for the admin; matching itself is done by get_search_results
     search_fields = [
         'email', 'sage_details', 'tracker_imei', 'expire_date', 'sim_number',
         'sim_exp_date', 'tracker_model', 'sim_provider', 'tracker_status', 'status',
-        'sold_by', 'sage_invoice_reference', 'sage_payment_reference'
+        'sold_by', 'sage_references__reference'
     ]
 
-    # Define list filter fields
+    def get_search_results(self, request, queryset, search_term):
+        # Use the indexed search instead of an icontains scan on every search field
+        if not search_term:
+            return queryset, False
+        return search_clients(queryset, search_term), False
+
+    # Define list filter fields, rendered from the cached facet counts
     list_filter = (
-        'status', 'tracker_status', 'expire_date', 'sim_exp_date', 'sold_by',
-        'sim_provider', 'tracker_model', 'country'
+        ('status', CachedFacetFilter),
+        ('tracker_status', CachedFacetFilter),
+        ('expire_date', ExpiryCodeFilter),
+        ('sim_exp_date', ExpiryCodeFilter),
+        ('sold_by', CachedFacetFilter),
+        ('sim_provider', CachedFacetFilter),
+        ('tracker_model', CachedFacetFilter),
+        ('country', CachedFacetFilter),
     )
 
 
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'created_by', 'created_at', 'status', 'progress', 'download')
+    list_filter = ('status', 'file_format')
+    readonly_fields = (
+        'created_by', 'created_at', 'started_at', 'finished_at', 'status', 'file_format',
+        'filters', 'items', 'fields', 'total_rows', 'processed_rows', 'file', 'error',
+    )
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request).select_related('created_by')
+        # Users only see their own exports unless they are superusers
+        if not request.user.is_superuser:
+            queryset = queryset.filter(created_by=request.user)
+        return queryset
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description=_('PROGRESS'))
+    def progress(self, obj):
+        if not obj.total_rows:
+            return f"{obj.processed_rows}"
+        return f"{obj.processed_rows} / {obj.total_rows} ({obj.processed_rows * 100 // obj.total_rows}%)"
+
+    @admin.display(description=_('DOWNLOAD'))
+    def download(self, obj):
+        if obj.status != "DONE" or not obj.file:
+            return "-"
+        url = reverse('admin:client_exportjob_download', args=[obj.pk])
+        return format_html('<a href="{}">{}</a>', url, _("Download"))
+
+    def get_urls(self):
+        urls = super().get_urls()
+        my_urls = [
+            path(
+                '<int:pk>/download/',
+                self.admin_site.admin_view(self.download_view),
+                name='client_exportjob_download',
+            ),
+        ]
+        return my_urls + urls
+
+    def download_view(self, request, pk):
+        job = self.get_queryset(request).filter(pk=pk, status="DONE").first()
+        if job is None or not job.file:
+            raise Http404
+        return FileResponse(job.file.open('rb'), as_attachment=True, filename=job.file.name.split('/')[-1])
+
+
+class ExpiryExtensionAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'kind', 'months', 'client_count', 'created_by', 'description')
+    list_filter = ('kind',)
+    list_select_related = ('created_by',)
+
+    # Audit records are written by ClientManager.bulk_extend_expiry only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class ClientEventAdmin(admin.ModelAdmin):
+    list_display = ('at', 'client', 'field', 'old_value', 'new_value', 'user')
+    list_filter = ('field',)
+    list_select_related = ('client', 'user')
+    search_fields = ('=client__tracker_imei', '=client__sim_number')
+    # The history outgrows the client table, so page it like the changelist
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    # History is written by the Client model and its bulk updates only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class ExpiryRollupAdmin(admin.ModelAdmin):
+    """
+    Expiry dashboard: clients expiring per month, broken down by SIM network,
+    seller and country, read from the materialized rollup table.
+    """
+
+    # Number of months shown from the start month
+    dashboard_months = 12
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        if not self.has_view_or_change_permission(request):
+            raise PermissionDenied
+
+        kind = request.GET.get('kind')
+        if kind not in ROLLUP_KINDS:
+            kind = "SIM"
+        status = request.GET.get('status', "ACTIVE")
+        try:
+            start = datetime.datetime.strptime(request.GET.get('start', ''), '%Y-%m').date()
+        except ValueError:
+            start = datetime.date.today().replace(day=1)
+
+        code_field, _date_field, status_field = ROLLUP_KINDS[kind]
+        prefix = EXPIRY_CODE_FIELDS[code_field][0]
+        changelist_url = reverse('admin:client_client_changelist')
+        tables = []
+        for dimension, columns, rows in dashboard_tables(kind, status, start, self.dashboard_months):
+            # Every count links to the matching clients on the changelist
+            links = []
+            for month, total, cells in rows:
+                params = {f'{code_field}__exact': expiry_code(prefix, month)}
+                if status:
+                    params[f'{status_field}__exact'] = status
+                links.append((
+                    month,
+                    (total, f'{changelist_url}?{urlencode(params)}'),
+                    [
+                        (count, f'{changelist_url}?{urlencode({**params, f"{dimension}__exact": value})}')
+                        for count, (value, _label) in zip(cells, columns)
+                    ],
+                ))
+            tables.append((Client._meta.get_field(dimension).verbose_name, columns, links))
+
+        context = {
+            **self.admin_site.each_context(request),
+            **(extra_context or {}),
+            'title': _('Expiry dashboard'),
+            'opts': self.model._meta,
+            'kinds': list(ROLLUP_KINDS),
+            'kind': kind,
+            'statuses': STATUS,
+            'status': status,
+            'start': start,
+            'previous_start': add_months(start, -self.dashboard_months),
+            'next_start': add_months(start, self.dashboard_months),
+            'tables': tables,
+        }
+        return TemplateResponse(request, 'admin/client/expiryrollup/dashboard.html', context)
+
+
 # Register the Client model with the custom admin class
 admin.site.register(Client, ClientAdmin)
+admin.site.register(ExportJob, ExportJobAdmin)
+admin.site.register(ExpiryRollup, ExpiryRollupAdmin)
+admin.site.register(ExpiryExtension, ExpiryExtensionAdmin)
+admin.site.register(ClientEvent, ClientEventAdmin)
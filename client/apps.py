@@ -4,3 +4,18 @@ from django.apps import AppConfig
 class ClientConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'client'
+
+    def ready(self):
+        # Connect the signal receivers
+        from . import signals  # noqa: F401
+
+        # Apply the SQLite pragmas to every new connection
+        from django.db.backends.signals import connection_created
+        from ezitrack.db import tune_sqlite
+        connection_created.connect(tune_sqlite, dispatch_uid='ezitrack.db.tune_sqlite')
+
+        # Time and count the queries of every connection
+        from ezitrack.instrumentation import install_query_recorder
+        connection_created.connect(
+            install_query_recorder, dispatch_uid='ezitrack.instrumentation.install_query_recorder',
+        )
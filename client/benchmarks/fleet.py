@@ -0,0 +1,133 @@
+import datetime
+import random
+from collections import Counter
+
+from client.models import SIM_PROVIDER, SOLD_BY, Client, SageReference
+
+# (country, share of the fleet)
+COUNTRIES = [
+    ('ZA', 60), ('NA', 8), ('BW', 8), ('ZW', 6), ('MZ', 5), ('LS', 3), ('SZ', 3), ('ZM', 3), ('GB', 2), ('US', 2),
+]
+
+# Tracker models with the type allocation code (first 8 IMEI digits) of their modem
+TRACKER_MODELS = {
+    'FMB920': '35209378',
+    'FMB120': '35209379',
+    'FMC130': '35094513',
+    'GV300': '86223903',
+    'TK103': '86476903',
+    'ST4300': '35316210',
+}
+
+# (SIM network, share of the fleet, SIM code it is sold with)
+SIM_NETWORKS = [
+    ('FLOLIVE_RSA', 30, 'ESC'),
+    ('FLOLIVE_SSA', 15, 'ESC'),
+    ('FLICKSWITCH_VODACOM', 20, 'EFSC'),
+    ('FLICKSWITCH_MTN', 15, 'EFSC'),
+    ('FLICKSWITCH_OTHER', 5, 'EFSC'),
+    ('CLIENT_OWN', 10, 'PRIV'),
+    ('OTHER', 5, 'OTHER'),
+]
+assert {name for name, _share, _code in SIM_NETWORKS} == {name for name, _label in SIM_PROVIDER}
+
+SELLERS = [('TAKEALOT', 25), ('EZITRACK_DIRECT_SALE', 30), ('AMAZON', 10), ('OTHER', 5), ('EZITRACK_DEALER', 30)]
+assert {name for name, _share in SELLERS} == {name for name, _label in SOLD_BY}
+
+
+def luhn_check_digit(digits):
+    """
+    Returns the Luhn check digit completing the string of ``digits``, as
+    used by IMEIs and SIM ICCIDs.
+    """
+    total = 0
+    for index, digit in enumerate(reversed(digits)):
+        value = int(digit) * (2 if index % 2 == 0 else 1)
+        total += value - 9 if value > 9 else value
+    return str(-total % 10)
+
+
+def make_imei(tac, serial):
+    body = f'{tac}{serial:06d}'
+    return body + luhn_check_digit(body)
+
+
+def make_iccid(issuer, account):
+    # 89 (telecom) + 27 (South Africa) + issuer + account number + check digit
+    body = f'8927{issuer:02d}{account:012d}'
+    return body + luhn_check_digit(body)
+
+
+def weighted(rng, choices):
+    return rng.choices([choice[0] for choice in choices], [choice[1] for choice in choices])[0]
+
+
+def generate_clients(rows, seed=0, today=None):
+    """
+    Yields ``rows`` unsaved, realistic clients: valid IMEIs and SIM ICCIDs,
+    weighted networks, sellers and countries, and expiry dates spread a
+    year back and three years ahead. The same seed and day give the same
+    fleet.
+    """
+    rng = random.Random(seed)
+    today = today or datetime.date.today()
+    serials = Counter()
+    networks = {name: (share, code) for name, share, code in SIM_NETWORKS}
+    for i in range(rows):
+        model = rng.choice(list(TRACKER_MODELS))
+        tac = TRACKER_MODELS[model]
+        # Serials count up per modem type, so every IMEI is unique
+        imei = make_imei(tac, serials[tac])
+        serials[tac] += 1
+        network = weighted(rng, SIM_NETWORKS)
+        added = today - datetime.timedelta(days=rng.randint(0, 5 * 365))
+        sim_expire = today + datetime.timedelta(days=rng.randint(-365, 3 * 365))
+        tracker_expire = today + datetime.timedelta(days=rng.randint(-365, 3 * 365))
+        # Lapsed SIMs are far more often suspended
+        suspended_share = 0.4 if sim_expire < today else 0.03
+
+        client = Client(
+            added=added,
+            email=f'user{i}@example.com',
+            sage_details=f'SAGE{i:07d}',
+            tracker_imei=imei,
+            tracker_activation_date=added + datetime.timedelta(days=rng.randint(0, 14)),
+            tracker_expire_date=tracker_expire,
+            tracker_status="SUSPENDED" if rng.random() < 0.05 else "ACTIVE",
+            sim_number=make_iccid(rng.randint(1, 99), i),
+            sim_active=added,
+            sim_expire=sim_expire,
+            status="SUSPENDED" if rng.random() < suspended_share else "ACTIVE",
+            sim_provider=network,
+            sim_code=networks[network][1],
+            tracker_model=model,
+            sold_by=weighted(rng, SELLERS),
+            country=weighted(rng, COUNTRIES),
+            description="Fleet vehicle" if rng.random() < 0.1 else None,
+        )
+        client.set_expiry_codes()
+        client.set_status_timestamps()
+        yield client
+
+
+def seed_clients(rows, seed=0, batch_size=5000, today=None):
+    """
+    Inserts a generate_clients() fleet with bulk_create, with one Sage
+    invoice reference per client. Model signals don't run, so rebuild the
+    facets and rollups afterwards if they are needed.
+    """
+    batch = []
+    for client in generate_clients(rows, seed, today):
+        batch.append(client)
+        if len(batch) == batch_size:
+            insert_batch(batch)
+            batch = []
+    insert_batch(batch)
+
+
+def insert_batch(clients):
+    Client.objects.bulk_create(clients)
+    SageReference.objects.bulk_create([
+        SageReference(client=client, kind="INVOICE", reference=f'INV{client.sage_details[4:]}', position=1)
+        for client in clients
+    ])
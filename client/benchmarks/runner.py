@@ -0,0 +1,125 @@
+import datetime
+import platform
+import secrets
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.db import connection
+from django.test.utils import override_settings
+
+
+class QueryCounter:
+    """
+    connection.execute_wrapper() counting queries, cheaper than recording
+    them with CaptureQueriesContext.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def app_static_files():
+    """
+    Settings serving the static files from the apps, so the admin pages
+    render without a collectstatic run.
+    """
+    return override_settings(
+        STORAGES={
+            **settings.STORAGES,
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        },
+        WHITENOISE_USE_FINDERS=True,
+        WHITENOISE_AUTOREFRESH=True,
+    )
+
+
+def isolated_cache():
+    """
+    Settings giving a run against a throwaway database its own cache keys,
+    so it neither reads nor overwrites those of the real one.
+    """
+    prefix = f'benchmark-{secrets.token_hex(4)}'
+    return override_settings(CACHES={
+        alias: {**config, 'KEY_PREFIX': prefix} for alias, config in settings.CACHES.items()
+    })
+
+
+def measure(scenario, context, repeat):
+    """
+    Runs ``scenario`` once to warm up, ``repeat`` times timed, and once more
+    under tracemalloc for its peak memory.
+    """
+    status, size = scenario(context, 0)
+    if status >= 400:
+        raise RuntimeError(f"HTTP {status}")
+
+    timings = []
+    queries = []
+    for run in range(1, repeat + 1):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            start = time.perf_counter()
+            scenario(context, run)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(counter.count)
+
+    tracemalloc.start()
+    try:
+        scenario(context, repeat + 1)
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'wall_ms': {
+            'min': round(min(timings), 2),
+            'median': round(statistics.median(timings), 2),
+            'max': round(max(timings), 2),
+        },
+        'queries': max(queries),
+        'peak_memory_kb': round(peak / 1024),
+        'response_kb': round(size / 1024, 1),
+    }
+
+
+def git(*args):
+    try:
+        return subprocess.run(
+            ['git', *args], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """
+    Describes what a report was measured on, to tell which reports compare.
+    """
+    status = git('status', '--porcelain', '--untracked-files=no')
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(status) if status is not None else None,
+        'measured_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'machine': platform.machine(),
+    }
+
+
+def compare(baseline, report):
+    """
+    Yields (scenario, baseline result, result) for the scenarios both
+    reports measured.
+    """
+    for name, result in report['scenarios'].items():
+        if name in baseline.get('scenarios', {}):
+            yield name, baseline['scenarios'][name], result
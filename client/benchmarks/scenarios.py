@@ -0,0 +1,133 @@
+import json
+import random
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+
+from client.models import Client
+from client.resources import ClientResource
+
+
+def consume(response):
+    """
+    Reads the whole response and returns its status code and size in bytes.
+    """
+    if response.streaming:
+        size = sum(len(chunk) for chunk in response.streaming_content)
+    else:
+        size = len(response.content)
+    return response.status_code, size
+
+
+class BenchmarkContext:
+    """
+    What the scenarios share: a logged-in admin test client, an API test
+    client, and the seeded clients to pick from. Picks are seeded too, so
+    every run of a report makes the same requests.
+    """
+
+    def __init__(self, browser, api, seed=0, sample_size=1000):
+        self.browser = browser
+        self.api = api
+        self.seed = seed
+        self.pks = list(Client.objects.order_by('pk').values_list('pk', flat=True)[:sample_size])
+        self.imeis = list(Client.objects.filter(pk__in=self.pks).values_list('tracker_imei', flat=True))
+        self.import_csv = ClientResource().export(Client.objects.filter(pk__in=self.pks[:500])).csv.encode()
+
+    def rng(self, run):
+        return random.Random(f'{self.seed}:{run}')
+
+
+def changelist(context, run):
+    return consume(context.browser.get('/admin/client/client/'))
+
+
+def changelist_sorted(context, run):
+    # Sorted on SIM expiry instead of the default -pk
+    return consume(context.browser.get('/admin/client/client/', {'o': '-10'}))
+
+
+def changelist_search(context, run):
+    imei = context.rng(run).choice(context.imeis)
+    return consume(context.browser.get('/admin/client/client/', {'q': imei}))
+
+
+def changelist_search_text(context, run):
+    return consume(context.browser.get('/admin/client/client/', {'q': f'user{context.rng(run).randrange(1000)}'}))
+
+
+def changelist_filters(context, run):
+    return consume(context.browser.get('/admin/client/client/', {
+        'status__exact': "ACTIVE", 'sim_provider__exact': 'FLOLIVE_RSA', 'country__exact': 'ZA',
+    }))
+
+
+def change_form(context, run):
+    pk = context.rng(run).choice(context.pks)
+    return consume(context.browser.get(f'/admin/client/client/{pk}/change/'))
+
+
+def add_form(context, run):
+    return consume(context.browser.get('/admin/client/client/add/'))
+
+
+def export(file_format):
+    def scenario(context, run):
+        return consume(context.browser.post('/admin/client/client/export/', {
+            'format': file_format,
+            **{f'clientresource_{name}': 'on' for name in (
+                'email', 'sage_details', 'tracker_imei', 'sim_number', 'sim_expire', 'status',
+                'sim_provider', 'country', 'sage_invoice_reference',
+            )},
+        }, QUERY_STRING='status__exact=ACTIVE'))
+    return scenario
+
+
+def bulk_save(context, run):
+    """
+    Client.save() for 100 clients in one transaction, with every signal
+    handler a change in the admin runs.
+    """
+    pks = context.rng(run).sample(context.pks, 100)
+    with transaction.atomic():
+        for client in Client.objects.filter(pk__in=pks):
+            client.status = "SUSPENDED" if client.status == "ACTIVE" else "ACTIVE"
+            client.sim_status_note = f"Benchmark run {run}"
+            client.save()
+    return 200, 0
+
+
+def status_action(context, run):
+    action = 'suspend_sims' if run % 2 else 'activate_sims'
+    selected = context.rng(run).sample(context.pks, 200)
+    return consume(context.browser.post('/admin/client/client/', {'action': action, '_selected_action': selected}))
+
+
+def import_dry_run(context, run):
+    upload = SimpleUploadedFile('fleet.csv', context.import_csv, content_type='text/csv')
+    return consume(context.browser.post('/admin/client/client/import/', {'import_file': upload, 'dry_run': 'on'}))
+
+
+def api_lookup(context, run):
+    imeis = context.rng(run).sample(context.imeis, 500)
+    return consume(context.api.post(
+        '/api/clients/lookup/', json.dumps({'tracker_imei': imeis}), content_type='application/json',
+    ))
+
+
+# Scenarios in the order they run; later ones see the writes of earlier ones
+SCENARIOS = {
+    'changelist': changelist,
+    'changelist sorted': changelist_sorted,
+    'changelist search imei': changelist_search,
+    'changelist search text': changelist_search_text,
+    'changelist filters': changelist_filters,
+    'change form': change_form,
+    'add form': add_form,
+    'export csv': export('0'),
+    'export xlsx': export('1'),
+    'import dry run': import_dry_run,
+    'bulk save': bulk_save,
+    'status action': status_action,
+    'api lookup': api_lookup,
+}
@@ -0,0 +1,191 @@
+import time
+import zlib
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import BaseMemcachedCache
+from django.core.cache.backends.redis import RedisCache
+
+# Written over discarded keys, and read as a miss, for DISCARD_TIMEOUT
+# seconds: longer than a read takes, so one that started before the discard
+# can't put the old value back, see VersionedCache.add_many()
+DISCARDED = 'client:discarded'
+DISCARD_TIMEOUT = getattr(settings, 'CLIENT_CACHE_DISCARD_TIMEOUT', 60)
+
+# Backends whose incr() is atomic; the file and database caches read the
+# value and write it back, so concurrent increments can be lost
+ATOMIC_INCR_BACKENDS = (LocMemCache, BaseMemcachedCache, RedisCache)
+
+# The keys of a per-process cache are spread over this many versions, so
+# discarding a key drops 1/SHARDS of the entries instead of all of them
+SHARDS = getattr(settings, 'CLIENT_CACHE_SHARDS', 64)
+
+
+def new_version():
+    # Starts from the time, so a version evicted from the cache never comes back as an older one
+    return int(time.time() * 1000)
+
+
+def bump_version(cache, key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, new_version(), None)
+
+
+class VersionedCache:
+    """
+    Cache keys under one prefix that are dropped all at once by bumping a
+    version number, instead of deleting each key. The version is kept in the
+    default cache, which all the workers share; the entries may live in
+    another cache ``alias``, e.g. a faster per-process one.
+
+    The ``version`` the methods take is either one version, or {key: version}
+    as returned by versions(); read it before the database, so a value read
+    before a discard is stored under the old version.
+    """
+
+    def __init__(self, prefix, timeout, alias=DEFAULT_CACHE_ALIAS):
+        self.prefix = prefix
+        self.timeout = timeout
+        self.alias = alias
+        self.version_key = f'{prefix}:version'
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def local(self):
+        # Each process has its own entries but they share the versions, so
+        # bumping one is the only way to drop a key in every process
+        return self.alias != DEFAULT_CACHE_ALIAS and isinstance(self.cache, LocMemCache)
+
+    @property
+    def atomic_incr(self):
+        return isinstance(self.cache, ATOMIC_INCR_BACKENDS)
+
+    def key(self, *parts):
+        return ':'.join((self.prefix, *map(str, parts)))
+
+    def shard_key(self, key):
+        return f'{self.version_key}:{zlib.crc32(key.encode()) % SHARDS}'
+
+    def version(self):
+        return caches[DEFAULT_CACHE_ALIAS].get_or_set(self.version_key, new_version, None)
+
+    async def aversion(self):
+        return await caches[DEFAULT_CACHE_ALIAS].aget_or_set(self.version_key, new_version, None)
+
+    def versions(self, keys):
+        """
+        Returns {key: version} for ``keys``: the version, combined with the
+        version of each key's shard in a per-process cache.
+        """
+        version = self.version()
+        if not self.local:
+            return dict.fromkeys(keys, version)
+        default = caches[DEFAULT_CACHE_ALIAS]
+        shard_keys = {key: self.shard_key(key) for key in keys}
+        shard_versions = default.get_many(set(shard_keys.values()))
+        for shard_key in set(shard_keys.values()) - set(shard_versions):
+            shard_versions[shard_key] = default.get_or_set(shard_key, new_version, None)
+        return {key: f'{version}.{shard_versions[shard_key]}' for key, shard_key in shard_keys.items()}
+
+    async def aversions(self, keys):
+        version = await self.aversion()
+        if not self.local:
+            return dict.fromkeys(keys, version)
+        default = caches[DEFAULT_CACHE_ALIAS]
+        shard_keys = {key: self.shard_key(key) for key in keys}
+        shard_versions = await default.aget_many(set(shard_keys.values()))
+        for shard_key in set(shard_keys.values()) - set(shard_versions):
+            shard_versions[shard_key] = await default.aget_or_set(shard_key, new_version, None)
+        return {key: f'{version}.{shard_versions[shard_key]}' for key, shard_key in shard_keys.items()}
+
+    def group(self, keys, version):
+        """
+        Returns {version: [key]}, to read or write ``keys`` one version at a
+        time.
+        """
+        if not isinstance(version, dict):
+            return {version: list(keys)}
+        groups = {}
+        for key in keys:
+            groups.setdefault(version[key], []).append(key)
+        return groups
+
+    def get(self, key, version=None):
+        value = self.cache.get(key, version=version or self.versions([key])[key])
+        return None if value == DISCARDED else value
+
+    def set(self, key, value, version=None):
+        self.cache.set(key, value, self.timeout, version=version or self.versions([key])[key])
+
+    def incr(self, key, delta=1, version=None):
+        """
+        Adds ``delta`` to the number cached under ``key``. Raises ValueError
+        if the key isn't cached.
+        """
+        return self.cache.incr(key, delta, version=version or self.versions([key])[key])
+
+    def get_many(self, keys, version=None):
+        values = {}
+        for group_version, group in self.group(keys, version or self.versions(keys)).items():
+            values.update(self.cache.get_many(group, version=group_version))
+        return {key: value for key, value in values.items() if value != DISCARDED}
+
+    async def aget_many(self, keys, version=None):
+        values = {}
+        for group_version, group in self.group(keys, version or await self.aversions(keys)).items():
+            values.update(await self.cache.aget_many(group, version=group_version))
+        return {key: value for key, value in values.items() if value != DISCARDED}
+
+    def set_many(self, mapping, version=None):
+        for group_version, group in self.group(mapping, version or self.versions(mapping)).items():
+            self.cache.set_many({key: mapping[key] for key in group}, self.timeout, version=group_version)
+
+    async def aset_many(self, mapping, version=None):
+        for group_version, group in self.group(mapping, version or await self.aversions(mapping)).items():
+            await self.cache.aset_many({key: mapping[key] for key in group}, self.timeout, version=group_version)
+
+    def add_many(self, mapping, version=None):
+        """
+        Caches values read from the database, except for keys set or
+        discarded since: a read racing a discard() would otherwise cache
+        the row as it was before the change.
+        """
+        for group_version, group in self.group(mapping, version or self.versions(mapping)).items():
+            if self.local:
+                # discard() bumps the shard versions instead, which leaves these behind
+                self.cache.set_many({key: mapping[key] for key in group}, self.timeout, version=group_version)
+                continue
+            for key in group:
+                self.cache.add(key, mapping[key], self.timeout, version=group_version)
+
+    async def aadd_many(self, mapping, version=None):
+        for group_version, group in self.group(mapping, version or await self.aversions(mapping)).items():
+            if self.local:
+                await self.cache.aset_many({key: mapping[key] for key in group}, self.timeout, version=group_version)
+                continue
+            for key in group:
+                await self.cache.aadd(key, mapping[key], self.timeout, version=group_version)
+
+    def discard(self, keys):
+        """
+        Drops ``keys`` everywhere: marks them DISCARDED in a shared cache, or
+        bumps the versions of their shards in a local one.
+        """
+        if self.local:
+            default = caches[DEFAULT_CACHE_ALIAS]
+            for shard_key in {self.shard_key(key) for key in keys}:
+                bump_version(default, shard_key)
+        else:
+            self.cache.set_many(dict.fromkeys(keys, DISCARDED), DISCARD_TIMEOUT, version=self.version())
+
+    def invalidate(self):
+        """
+        Drops every key under the prefix.
+        """
+        bump_version(caches[DEFAULT_CACHE_ALIAS], self.version_key)
@@ -0,0 +1,209 @@
+import csv
+import tempfile
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_permission_codename
+from django.http import FileResponse, StreamingHttpResponse
+from django.urls import path
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+
+# Number of rows fetched from the database per round trip while exporting
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """
+    File-like object that hands back whatever is written to it, so the csv
+    writer can be used to produce lines for a streaming response.
+    """
+
+    def write(self, value):
+        return value
+
+
+def get_export_field_names(resource, selected_fields=None):
+    """
+    Returns the resource field names to export, in export order.
+    """
+    if selected_fields:
+        return [name for name in resource.get_export_order() if name in selected_fields]
+    return [name for name in resource.get_export_order() if name in resource.fields]
+
+
+def iter_values_by_pk(queryset, attributes):
+    """
+    Yields ``values_list('pk', *attributes)`` rows in primary key order, one
+    short query per chunk. No read transaction stays open between chunks, so
+    the caller can write (e.g. job progress) while iterating, even on SQLite.
+    """
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(chunk.values_list('pk', *attributes)[:EXPORT_CHUNK_SIZE])
+        if not rows:
+            return
+        yield from rows
+        last_pk = rows[-1][0]
+
+
+def iter_export_rows(resource, queryset, field_names, force_native_type=False, by_pk=False):
+    """
+    Yields one rendered row per object without building model instances.
+
+    Rows are read with ``values_list()`` in chunks (a server-side cursor on
+    PostgreSQL), and each value is rendered through the resource field's
+    widget so the output matches the regular import_export export. Fields
+    that aren't model columns come from ``resource.get_related_values()``,
+    called once per chunk.
+    """
+    fields = [resource.fields[name] for name in field_names]
+    columns = {field.name for field in queryset.model._meta.concrete_fields}
+    column_names = [name for name, field in zip(field_names, fields) if field.attribute in columns]
+    attributes = [resource.fields[name].attribute for name in column_names]
+    related = len(column_names) < len(field_names)
+
+    if by_pk:
+        rows = iter_values_by_pk(queryset, attributes)
+    else:
+        rows = queryset.values_list('pk', *attributes).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    while True:
+        chunk = list(islice(rows, EXPORT_CHUNK_SIZE))
+        if not chunk:
+            return
+        related_values = resource.get_related_values([row[0] for row in chunk]) if related else {}
+        for row in chunk:
+            values = dict(zip(column_names, row[1:]))
+            values.update(related_values.get(row[0], {}))
+            yield [
+                field.widget.render(values.get(name), force_native_type=force_native_type)
+                for name, field in zip(field_names, fields)
+            ]
+
+
+def write_csv(headers, rows, fileobj):
+    writer = csv.writer(fileobj)
+    writer.writerow(headers)
+    for row in rows:
+        writer.writerow(row)
+
+
+def write_xlsx(headers, rows, fileobj):
+    """
+    Writes rows through a write-only workbook, which keeps only the current
+    row in memory and spools the sheet to disk.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(headers)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(fileobj)
+
+
+def stream_csv(headers, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def streaming_export_response(file_format, resource, queryset, field_names, filename):
+    """
+    Returns a response that sends the export without holding the whole
+    dataset in memory. CSV is streamed row by row; XLSX is written to a
+    temporary file first since the zip container can't be streamed, so the
+    admin queues large XLSX exports as jobs instead.
+    """
+    headers = resource.get_export_headers(selected_fields=field_names)
+    content_type = file_format.get_content_type()
+
+    if file_format.is_binary():
+        rows = iter_export_rows(resource, queryset, field_names, force_native_type=True)
+        tmp = tempfile.TemporaryFile()
+        write_xlsx(headers, rows, tmp)
+        tmp.seek(0)
+        response = FileResponse(tmp, content_type=content_type)
+    else:
+        rows = iter_export_rows(resource, queryset, field_names)
+        response = StreamingHttpResponse(stream_csv(headers, rows), content_type=content_type)
+
+    response["Content-Disposition"] = 'attachment; filename="{}"'.format(filename)
+    return response
+
+
+class LazyExportMixin:
+    """
+    ModelAdmin mixin standing in for import_export's ExportMixin until the
+    first export. Importing ExportMixin loads every tablib format it checks
+    for, openpyxl and PyYAML among them, which would otherwise slow down the
+    start of every worker and management command.
+
+    ``formats``, ``resource_classes`` and ``export_form_class`` are dotted
+    paths, imported with ExportMixin.
+    """
+    import_export_change_list_template = 'admin/import_export/change_list_export.html'
+    export_form_class = 'import_export.forms.SelectableFieldsExportForm'
+    formats = ()
+    resource_classes = ()
+
+    # ExportMixin's methods, run by the export admin once it is loaded
+    export_methods = ('export_action', 'get_export_queryset')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The export templates extend the admin's own change list template, as with ExportMixin
+        self.ie_base_change_list_template = self.change_list_template or 'admin/change_list.html'
+        self.change_list_template = self.import_export_change_list_template or self.ie_base_change_list_template
+
+    @cached_property
+    def export_admin(self):
+        """
+        This admin with ExportMixin mixed in after it, so the admin's own
+        export overrides still apply.
+        """
+        from import_export.admin import ExportMixin
+
+        admin_class = type(self)
+        namespace = {'__module__': admin_class.__module__, '__qualname__': admin_class.__qualname__}
+        namespace.update((name, getattr(ExportMixin, name)) for name in self.export_methods)
+        namespace['export_form_class'] = import_string(self.export_form_class)
+        if self.formats:
+            namespace['formats'] = [import_string(format_path) for format_path in self.formats]
+        if self.resource_classes:
+            namespace['resource_classes'] = [import_string(resource_path) for resource_path in self.resource_classes]
+        export_class = type(admin_class)(admin_class.__name__, (admin_class, ExportMixin), namespace)
+        return export_class(self.model, self.admin_site)
+
+    def get_urls(self):
+        info = self.opts.app_label, self.opts.model_name
+        return [
+            path('export/', self.admin_site.admin_view(self.export_action), name='%s_%s_export' % info),
+            *super().get_urls(),
+        ]
+
+    def has_export_permission(self, request):
+        # Same rule as ExportMixin
+        permission_code = getattr(settings, 'IMPORT_EXPORT_EXPORT_PERMISSION_CODE', None)
+        if permission_code is None:
+            return True
+        codename = get_permission_codename(permission_code, self.opts)
+        return request.user.has_perm(f'{self.opts.app_label}.{codename}')
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {
+            **(extra_context or {}),
+            'has_export_permission': self.has_export_permission(request),
+            'ie_base_change_list_template': self.ie_base_change_list_template,
+        }
+        return super().changelist_view(request, extra_context)
+
+    def export_action(self, request):
+        return self.export_admin.export_action(request)
+
+    def get_export_queryset(self, request):
+        return self.export_admin.get_export_queryset(request)
@@ -0,0 +1,117 @@
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count
+
+from .caching import VersionedCache
+from .models import Client
+
+# Fields shown as list filters on the Client changelist
+FACET_FIELDS = (
+    'status', 'tracker_status', 'expire_date', 'sim_exp_date', 'sold_by',
+    'sim_provider', 'tracker_model', 'country',
+)
+
+FACET_CACHE_TIMEOUT = getattr(settings, 'CLIENT_FACET_CACHE_TIMEOUT', 60 * 60)
+
+# The filter counts of the Client changelist: per field the list of its
+# values, and a counter per value that saves and deletes adjust
+FACETS = VersionedCache('client:facets', FACET_CACHE_TIMEOUT)
+
+
+def bucket_key(field_name, value):
+    # Hashed, values may contain spaces or be longer than a memcached key
+    return FACETS.key(field_name, hashlib.md5(repr(value).encode()).hexdigest())
+
+
+def count_facet(field_name):
+    """
+    Returns {value: number of clients} for one field, with a single GROUP BY.
+    """
+    rows = Client.objects.order_by().values_list(field_name).annotate(count=Count('pk'))
+    return {value: count for value, count in rows}
+
+
+def store_facet(field_name, counts, version=None):
+    FACETS.set_many({bucket_key(field_name, value): count for value, count in counts.items()}, version)
+    # The list last, so a read that finds it finds the counters too
+    FACETS.set(FACETS.key(field_name), list(counts), version)
+
+
+def get_facet(field_name):
+    # Read before counting, so counts made before an invalidate() are stored under the old version
+    version = FACETS.version()
+    values = FACETS.get(FACETS.key(field_name), version)
+    if values is not None:
+        keys = {bucket_key(field_name, value): value for value in values}
+        counts = FACETS.get_many(list(keys), version)
+        if len(counts) == len(keys):
+            # Values no client has any more are left at 0 until the next recount
+            return {keys[key]: count for key, count in counts.items() if count > 0}
+    counts = count_facet(field_name)
+    store_facet(field_name, counts, version)
+    return counts
+
+
+def rebuild_facets():
+    FACETS.invalidate()
+    for field_name in FACET_FIELDS:
+        store_facet(field_name, count_facet(field_name))
+
+
+def invalidate_facets(field_names=None):
+    """
+    Drops the cached counts of ``field_names``, or all of them, and the next
+    read recounts them. Call it once the change commits, so a read in
+    between can't cache the old counts again.
+    """
+    if field_names is None:
+        FACETS.invalidate()
+    else:
+        FACETS.discard([FACETS.key(field_name) for field_name in field_names])
+
+
+def facet_value(field_name, value):
+    return Client._meta.get_field(field_name).get_prep_value(value)
+
+
+def changed_facets(old_values, new_values):
+    """
+    Returns the FACET_FIELDS one client's change from ``old_values`` to
+    ``new_values`` moves between buckets; all of them for a create or a
+    delete, where either is empty.
+    """
+    return [
+        field_name for field_name in FACET_FIELDS
+        if not (old_values and new_values) or field_name not in old_values
+        or facet_value(field_name, old_values[field_name]) != facet_value(field_name, new_values[field_name])
+    ]
+
+
+def adjust_facets(old_values, new_values):
+    """
+    Moves one client's change from ``old_values`` to ``new_values`` (either
+    empty for a create or a delete) between the cached counters, once it
+    commits. A field whose counter isn't cached, or whose old value is
+    unknown, is dropped instead, as are all of them on a cache without an
+    atomic incr(): there an adjustment is a get and a set that concurrent
+    saves can interleave.
+    """
+    field_names = changed_facets(old_values, new_values)
+    if not FACETS.atomic_incr:
+        invalidate_facets(field_names)
+        return
+    version = FACETS.version()
+    stale = []
+    for field_name in field_names:
+        try:
+            if old_values:
+                if field_name not in old_values:
+                    raise ValueError(f"Previous {field_name} unknown")
+                FACETS.incr(bucket_key(field_name, facet_value(field_name, old_values[field_name])), -1, version)
+            if new_values:
+                FACETS.incr(bucket_key(field_name, facet_value(field_name, new_values[field_name])), 1, version)
+        except ValueError:
+            stale.append(field_name)
+    if stale:
+        invalidate_facets(stale)
@@ -0,0 +1,72 @@
+import datetime
+
+from django.contrib import admin
+from django.utils.translation import gettext as _
+
+from .facets import get_facet
+from .models import EXPIRY_CODE_FIELDS, next_month, parse_expiry_code
+
+
+class CachedFacetFilter(admin.FieldListFilter):
+    """
+    List filter rendered from the facet cache instead of a SELECT DISTINCT
+    and a COUNT per choice. Only values in use are listed, and the counts
+    are for the whole fleet.
+    """
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f'{field_path}__exact'
+        value = params.get(self.lookup_kwarg)
+        # Django 5 passes parameter values as lists
+        self.lookup_val = value[-1] if isinstance(value, list) else value
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def sort_values(self, values, labels):
+        if labels:
+            # Keep the declared order of the choices
+            order = {value: index for index, value in enumerate(labels)}
+            return sorted(values, key=lambda value: order.get(value, len(order)))
+        return sorted(values)
+
+    def choices(self, changelist):
+        counts = get_facet(self.field.name)
+        labels = dict(self.field.flatchoices)
+        values = self.sort_values(counts, labels)
+
+        yield {
+            'selected': self.lookup_val is None,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg]),
+            'display': _('All'),
+        }
+        for value in values:
+            yield {
+                'selected': self.lookup_val == str(value),
+                'query_string': changelist.get_query_string({self.lookup_kwarg: value}),
+                'display': f"{labels.get(value, value)} ({counts[value]})",
+            }
+
+
+class ExpiryCodeFilter(CachedFacetFilter):
+    """
+    Lists expiry codes in time order and filters on the range of the date
+    they are derived from, so the filter is served by the date indexes.
+    """
+
+    def sort_values(self, values, labels):
+        def month(value):
+            expiry = parse_expiry_code(value)
+            # Anything that isn't a valid code goes last
+            return expiry[1] if expiry else datetime.date.max
+
+        return sorted(values, key=month)
+
+    def queryset(self, request, queryset):
+        expiry = parse_expiry_code(self.lookup_val) if self.lookup_val else None
+        if expiry is None:
+            return super().queryset(request, queryset)
+        code_field, month = expiry
+        date_field = EXPIRY_CODE_FIELDS[code_field][1]
+        return queryset.filter(**{f'{date_field}__gte': month, f'{date_field}__lt': next_month(month)})
@@ -1,6 +1,14 @@
+import datetime
+
 from django import forms
+from import_export.forms import SelectableFieldsExportForm
+
+from .models import EXPIRY_ROLLUP_KIND, Client, SageReference
+from .reconcile import PROVIDER_FILES
+from .widgets import CachedSelect
 
-from .models import Client
+# Choice fields of the client form whose options never change, rendered from a per-language cache
+CACHED_CHOICE_FIELDS = ('tracker_status', 'status', 'sim_provider', 'sim_code', 'sold_by', 'country')
 
 
 class ClientAdminForm(forms.ModelForm):
@@ -18,42 +26,97 @@ class ClientAdminForm(forms.ModelForm):
 
     class Meta:
         model = Client
-        exclude = ('sage_invoice_reference', 'sage_payment_reference')  # Exclude the original fields
+        fields = '__all__'
+        widgets = {name: CachedSelect(f'client:{name}') for name in CACHED_CHOICE_FIELDS}
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        # Repopulate fields from semicolon-separated values if the instance already exists
+        # Repopulate the reference fields from the instance's Sage references
         if self.instance.pk:
-            # Split the sage_invoice_reference into individual fields
-            inv_refs = self.instance.sage_invoice_reference.split(';')
-            for i in range(len(inv_refs)):
-                if i < 5:  # Only populate the first 5 inv_ref fields
-                    self.fields[f'inv_ref_{i+1}'].initial = inv_refs[i]
-
-            # Split the sage_payment_reference into individual fields
-            rcp_refs = self.instance.sage_payment_reference.split(';')
-            for i in range(len(rcp_refs)):
-                if i < 5:  # Only populate the first 5 rcp_ref fields
-                    self.fields[f'rcp_ref_{i+1}'].initial = rcp_refs[i]
+            references = {"INVOICE": [], "PAYMENT": []}
+            for reference in self.instance.sage_references.all():
+                references[reference.kind].append(reference.reference)
+
+            # Only populate the first 5 fields of each kind
+            for i, reference in enumerate(references["INVOICE"][:5], start=1):
+                self.fields[f'inv_ref_{i}'].initial = reference
+            for i, reference in enumerate(references["PAYMENT"][:5], start=1):
+                self.fields[f'rcp_ref_{i}'].initial = reference
 
     def clean(self):
         cleaned_data = super().clean()
 
-        # Join all invoice references with a semicolon
-        invoice_refs = [
+        # Collect the filled in invoice references in field order
+        cleaned_data['invoice_references'] = [
             cleaned_data.get(f'inv_ref_{i}')
             for i in range(1, 6)
             if cleaned_data.get(f'inv_ref_{i}')
         ]
-        cleaned_data['sage_invoice_reference'] = ';'.join(invoice_refs)
 
-        # Join all payment references with a semicolon
-        payment_refs = [
+        # Collect the filled in payment references in field order
+        cleaned_data['payment_references'] = [
             cleaned_data.get(f'rcp_ref_{i}')
             for i in range(1, 6)
             if cleaned_data.get(f'rcp_ref_{i}')
         ]
-        cleaned_data['sage_payment_reference'] = ';'.join(payment_refs)
 
-        return cleaned_data
\ No newline at end of file
+        return cleaned_data
+
+    def save_references(self):
+        """
+        Replaces the instance's Sage references with the ones entered. Call
+        it once the instance is saved; ClientAdmin.save_related() does.
+        """
+        SageReference.objects.replace({
+            self.instance.pk: {
+                "INVOICE": self.cleaned_data['invoice_references'],
+                "PAYMENT": self.cleaned_data['payment_references'],
+            },
+        })
+
+
+class ClientExportForm(SelectableFieldsExportForm):
+    background = forms.BooleanField(
+        required=False,
+        initial=True,
+        label="Run in background",
+        help_text="Queue the export and download it from Export jobs when it is ready.",
+    )
+
+
+class ExpiryExtensionForm(forms.Form):
+    kind = forms.ChoiceField(choices=EXPIRY_ROLLUP_KIND, label="Expiry")
+    months = forms.IntegerField(min_value=1, max_value=120, initial=12, label="Months")
+
+
+class ClientImportForm(forms.Form):
+    import_file = forms.FileField(label="File", help_text="CSV or XLSX with the same columns as the export.")
+    dry_run = forms.BooleanField(
+        required=False,
+        initial=True,
+        label="Dry run",
+        help_text="Validate the file and show the changes without saving anything.",
+    )
+
+    def clean_import_file(self):
+        import_file = self.cleaned_data['import_file']
+        if import_file.name.rsplit('.', 1)[-1].lower() not in ('csv', 'xlsx'):
+            raise forms.ValidationError("Upload a .csv or .xlsx file.")
+        return import_file
+
+
+class SimReconcileForm(forms.Form):
+    provider = forms.ChoiceField(choices=[(name, name) for name in PROVIDER_FILES], label="Provider")
+    provider_file = forms.FileField(label="File", help_text="The provider's monthly SIM activity file, CSV or XLSX.")
+    as_of = forms.DateField(
+        initial=datetime.date.today,
+        label="Expired before",
+        help_text="SIMs expiring before this day and still billed are reported as expired but billing.",
+    )
+
+    def clean_provider_file(self):
+        provider_file = self.cleaned_data['provider_file']
+        if provider_file.name.rsplit('.', 1)[-1].lower() not in ('csv', 'xlsx'):
+            raise forms.ValidationError("Upload a .csv or .xlsx file.")
+        return provider_file
@@ -0,0 +1,86 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections, transaction
+
+# Client fields whose changes are recorded as ClientEvents
+HISTORY_FIELDS = (
+    'status', 'tracker_status', 'sim_expire', 'tracker_expire_date', 'sim_number',
+    'tracker_imei', 'sim_provider', 'sold_by', 'country', 'email',
+)
+
+# Recorded for new clients too, so a client's history starts with its first status
+CREATE_HISTORY_FIELDS = ('status', 'tracker_status')
+
+_acting_request = ContextVar('client_history_request', default=None)
+
+
+@contextmanager
+def acting_request(request):
+    """
+    Attributes the client changes made inside the block to the user of
+    ``request``. The request is kept rather than its lazy user: asgiref
+    type-checks every context variable when it hands the context to an async
+    view, which would load the user from the database in the event loop.
+    """
+    token = _acting_request.set(request)
+    try:
+        yield
+    finally:
+        _acting_request.reset(token)
+
+
+def current_user_id():
+    user = getattr(_acting_request.get(), 'user', None)
+    if user is None or not user.is_authenticated:
+        return None
+    return user.pk
+
+
+def event_value(field, value):
+    """
+    Returns ``value`` of ``field`` as stored in a ClientEvent, e.g. a date as
+    2025-01-31 and a country as its code.
+    """
+    value = field.get_prep_value(value)
+    return None if value is None else str(value)
+
+
+class EventBuffer:
+    """
+    Events queued in one transaction (or savepoint), written with a single
+    bulk_create when it commits and dropped with it on rollback.
+    """
+
+    def __init__(self, manager, using, savepoint_ids):
+        self.manager = manager
+        self.using = using
+        self.savepoint_ids = savepoint_ids
+        self.events = []
+
+    def is_queued(self, connection):
+        return any(entry[1] == self.flush for entry in connection.run_on_commit)
+
+    def flush(self):
+        self.manager.using(self.using).bulk_create(self.events, batch_size=1000)
+
+
+def queue_events(manager, events, using):
+    """
+    Writes ``events`` with ``manager`` when the current transaction commits,
+    together with the other events queued in it, or straight away outside a
+    transaction.
+    """
+    if not events:
+        return
+    connection = connections[using]
+    if not connection.in_atomic_block:
+        manager.using(using).bulk_create(events, batch_size=1000)
+        return
+    # Events queued in a savepoint get their own buffer, so rolling it back drops them
+    savepoint_ids = list(connection.savepoint_ids)
+    buffer = getattr(connection, 'client_event_buffer', None)
+    if buffer is None or buffer.savepoint_ids != savepoint_ids or not buffer.is_queued(connection):
+        buffer = connection.client_event_buffer = EventBuffer(manager, using, savepoint_ids)
+        transaction.on_commit(buffer.flush, using=using)
+    buffer.events.extend(events)
@@ -0,0 +1,351 @@
+import csv
+import io
+from itertools import islice
+
+from django.core import validators
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.utils import timezone
+
+from .models import EXPIRY_CODE_FIELDS, Client, ClientEvent, SageReference, clients_bulk_updated
+from .rollups import ROLLUP_FIELDS, apply_rollup_delta, rollup_delta
+
+# Number of rows validated and written per round trip
+IMPORT_BATCH_SIZE = 1000
+
+# Number of row changes and errors kept for the report
+REPORT_LIMIT = 200
+
+
+class ImportReport:
+    """
+    Outcome of an import run; also the dry-run diff shown before importing.
+    """
+
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.error_count = 0
+        self.errors = []
+        self.changes = []
+
+    @property
+    def has_errors(self):
+        return self.error_count > 0
+
+    def add_error(self, row_number, message):
+        self.error_count += 1
+        if len(self.errors) < REPORT_LIMIT:
+            self.errors.append((row_number, message))
+
+    def add_change(self, row_number, action, imei, diff):
+        if len(self.changes) < REPORT_LIMIT:
+            self.changes.append((row_number, action, imei, diff))
+
+
+def read_rows(fileobj, extension):
+    """
+    Yields the rows of an uploaded CSV or XLSX file one at a time.
+    """
+    if extension == 'xlsx':
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+        for row in workbook.active.iter_rows(values_only=True):
+            yield ['' if value is None else value for value in row]
+        workbook.close()
+    else:
+        yield from csv.reader(io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline=''))
+
+
+def get_import_columns(resource, headers):
+    """
+    Maps the file headers to resource field names. Headers may be the field
+    names or the verbose names written by the export. Unknown columns map to None.
+    """
+    editable = {field.name for field in Client._meta.concrete_fields if field.editable}
+    names = [name for name in resource.fields if name in editable or name in resource.reference_fields]
+    lookup = {}
+    for name, header in zip(names, resource.get_export_headers(selected_fields=names)):
+        lookup[str(header).strip().lower()] = name
+        lookup[name.lower()] = name
+    return [lookup.get(str(header).strip().lower()) for header in headers]
+
+
+class RowParser:
+    """
+    Cleans file values through the resource widgets. Date columns repeat the
+    same few hundred values, so their parsed values are cached instead of
+    going through strptime for every row. Empty values of nullable text
+    columns are read as NULL, as the admin form saves them.
+    """
+
+    def __init__(self, resource, columns):
+        self.widgets = [None if name is None else resource.fields[name].widget for name in columns]
+        self.columns = columns
+        self.resource = resource
+        self.reference_fields = resource.reference_fields
+        self.cached = {
+            name for name in columns
+            if name is not None and name not in self.reference_fields
+            and isinstance(Client._meta.get_field(name), models.DateField)
+        }
+        self.cache = {}
+        self.nullable = {
+            name for name in columns
+            if name is not None and name not in self.reference_fields and is_nullable_text(name)
+        }
+
+    def parse(self, values):
+        """
+        Returns the model field values and the Sage references, split into
+        lists, keyed by resource field name.
+        """
+        data = {}
+        references = {}
+        for name, widget, value in zip(self.columns, self.widgets, values):
+            if name is None:
+                continue
+            if name in self.reference_fields:
+                references[name] = [reference.strip() for reference in str(value).split(';') if reference.strip()]
+            elif name in self.cached:
+                key = (name, value)
+                if key not in self.cache:
+                    self.cache[key] = widget.clean(value)
+                data[name] = self.cache[key]
+            elif name in self.nullable:
+                data[name] = widget.clean(value) or None
+            else:
+                data[name] = widget.clean(value)
+        return data, references
+
+
+def is_nullable_text(name):
+    field = Client._meta.get_field(name)
+    return field.null and field.empty_strings_allowed
+
+
+def prep(name, value):
+    value = Client._meta.get_field(name).get_prep_value(value)
+    # An empty note compares equal to a NULL one
+    if value == '' and is_nullable_text(name):
+        return None
+    return value
+
+
+def get_choice_values():
+    """
+    Returns the allowed values of each choice field. Django normalizes the
+    whole choice list on every ``Field.validate()`` call, which dominates the
+    cost of validating a large file (the country list alone has ~250 entries).
+    """
+    return {
+        field.name: {str(value) for value, _ in field.flatchoices}
+        for field in Client._meta.concrete_fields
+        if field.choices
+    }
+
+
+def validate_client(instance, choice_values):
+    """
+    Same checks as ``full_clean()`` without the uniqueness queries, with the
+    choice fields checked against ``choice_values``.
+    """
+    errors = {}
+    try:
+        instance.clean_fields(exclude=choice_values)
+    except ValidationError as e:
+        errors = e.message_dict
+    for name, allowed in choice_values.items():
+        field = Client._meta.get_field(name)
+        value = getattr(instance, name)
+        if value in validators.EMPTY_VALUES:
+            if not field.blank:
+                errors.setdefault(name, []).append(str(field.error_messages['blank']))
+        elif str(value) not in allowed:
+            errors.setdefault(name, []).append(str(field.error_messages['invalid_choice'] % {'value': value}))
+    if errors:
+        raise ValidationError(errors)
+
+
+def rollup_values(instance, old_values=None):
+    """
+    Returns the ROLLUP_FIELDS values of ``instance``, or those it had before
+    the import given the ``old_values`` of the fields the import compared.
+    """
+    return {name: (old_values or {}).get(name, getattr(instance, name)) for name in ROLLUP_FIELDS}
+
+
+def import_clients(resource, rows, dry_run=True, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Validates and imports client rows, matched on tracker_imei.
+
+    Rows are handled in batches: each batch looks up its existing clients and
+    SIM numbers with one IN query each, then is written with bulk_create and
+    bulk_update. The import runs in a single transaction and nothing is
+    written if any row fails; with ``dry_run`` nothing is written at all.
+    """
+    report = ImportReport(dry_run)
+    rows = iter(rows)
+    headers = next(rows, None)
+    if headers is None:
+        report.add_error(1, "The file is empty.")
+        return report
+    columns = get_import_columns(resource, headers)
+    if 'tracker_imei' not in columns:
+        report.add_error(1, "The file has no TRACKER IMEI column.")
+        return report
+
+    seen = {'tracker_imei': set(), 'sim_number': set()}
+    parser = RowParser(resource, columns)
+    choice_values = get_choice_values()
+    changed_fields = set()
+    numbered = enumerate(rows, start=2)
+    with transaction.atomic():
+        while True:
+            batch = list(islice(numbered, batch_size))
+            if not batch:
+                break
+            changed_fields |= import_batch(parser, batch, seen, choice_values, report)
+        if report.has_errors or dry_run:
+            transaction.set_rollback(True)
+
+    if changed_fields and not dry_run and not report.has_errors:
+        clients_bulk_updated.send(sender=Client, fields=list(changed_fields), count=report.created + report.updated)
+    return report
+
+
+def import_batch(parser, batch, seen, choice_values, report):
+    parsed = []
+    for row_number, values in batch:
+        if not any(str(value).strip() for value in values):
+            continue
+        try:
+            data, references = parser.parse(values)
+        except ValueError as e:
+            report.add_error(row_number, str(e))
+            continue
+        if not data.get('tracker_imei'):
+            report.add_error(row_number, "TRACKER IMEI is required.")
+            continue
+        too_long = [reference for kind in references.values() for reference in kind if len(reference) > 50]
+        if too_long:
+            report.add_error(row_number, f"Sage reference {too_long[0]} is longer than 50 characters.")
+            continue
+
+        duplicate = False
+        for name in ('tracker_imei', 'sim_number'):
+            value = data.get(name)
+            if value and value in seen[name]:
+                report.add_error(row_number, f"{value} appears more than once in the file.")
+                duplicate = True
+            elif value:
+                seen[name].add(value)
+        if not duplicate:
+            parsed.append((row_number, data, references))
+
+    # One query each for the clients being updated, their Sage references
+    # and the owners of the SIM numbers
+    existing = Client.objects.in_bulk([data['tracker_imei'] for _, data, _ in parsed], field_name='tracker_imei')
+    old_references = {}
+    if existing and set(parser.columns) & set(parser.reference_fields):
+        old_references = parser.resource.get_related_values([client.pk for client in existing.values()])
+    sim_owners = dict(
+        Client.objects.filter(sim_number__in=[data['sim_number'] for _, data, _ in parsed if data.get('sim_number')])
+        .values_list('sim_number', 'tracker_imei')
+    )
+
+    to_create = []
+    to_update = []
+    # (client, values before the import) of the clients updated, for their history
+    changed = []
+    update_fields = set()
+    reference_updates = []
+    for row_number, data, references in parsed:
+        imei = data['tracker_imei']
+        owner = sim_owners.get(data.get('sim_number'))
+        if owner is not None and owner != imei:
+            report.add_error(row_number, f"SIM {data['sim_number']} already belongs to tracker {owner}.")
+            continue
+
+        # Expiry codes aren't imported but follow the imported dates
+        compared = [*data, *EXPIRY_CODE_FIELDS]
+        instance = existing.get(imei)
+        if instance is None:
+            instance = Client(**data)
+            old_values = {}
+        else:
+            old_values = {name: getattr(instance, name) for name in compared}
+            for name, value in data.items():
+                setattr(instance, name, value)
+        instance.set_expiry_codes()
+
+        try:
+            validate_client(instance, choice_values)
+        except ValidationError as e:
+            report.add_error(row_number, "; ".join(
+                f"{field}: {' '.join(messages)}" for field, messages in e.message_dict.items()
+            ))
+            continue
+
+        # Compare the cleaned values, so e.g. an XLSX datetime matches the stored date
+        diff = {
+            name: (old_values.get(name), getattr(instance, name))
+            for name in compared
+            if name not in old_values or prep(name, old_values[name]) != prep(name, getattr(instance, name))
+        }
+        reference_diff = {}
+        for name, values in references.items():
+            old_value = old_references.get(instance.pk, {}).get(name, '')
+            new_value = ';'.join(values)
+            if new_value != old_value:
+                reference_diff[name] = (old_value if instance.pk else None, new_value)
+        if reference_diff:
+            reference_updates.append((instance, {
+                parser.reference_fields[name]: references[name] for name in reference_diff
+            }))
+
+        if instance.pk is None:
+            instance.set_status_timestamps()
+            to_create.append(instance)
+            report.created += 1
+            report.add_change(row_number, 'new', imei, {**diff, **reference_diff})
+        elif diff or reference_diff:
+            if 'status' in diff:
+                instance.set_status_timestamps()
+                update_fields |= {'activated_at', 'suspended_at'}
+            update_fields |= set(diff)
+            if diff:
+                to_update.append(instance)
+                changed.append((instance, old_values))
+            report.updated += 1
+            report.add_change(row_number, 'update', imei, {**diff, **reference_diff})
+        else:
+            report.unchanged += 1
+
+    if report.dry_run or report.has_errors:
+        return set()
+    Client.objects.bulk_create(to_create)
+    if to_update:
+        # bulk_update() doesn't apply auto_now
+        now = timezone.now()
+        for instance in to_update:
+            instance.updated_at = now
+        Client.objects.bulk_update(to_update, sorted({*update_fields, 'updated_at'}))
+    events = [event for instance in to_create for event in ClientEvent.objects.changes(instance, {}, created=True)]
+    for instance, old_values in changed:
+        events += ClientEvent.objects.changes(instance, old_values)
+    ClientEvent.objects.record(events)
+    # The rows are all at hand, so the expiry rollups are adjusted without counting any
+    apply_rollup_delta(rollup_delta([
+        *(({}, rollup_values(instance)) for instance in to_create),
+        *((rollup_values(instance, old_values), rollup_values(instance)) for instance, old_values in changed),
+    ]))
+    # New clients have their primary keys by now
+    SageReference.objects.replace({instance.pk: kinds for instance, kinds in reference_updates})
+    if to_create:
+        update_fields |= {name for name in parser.columns if name is not None and name not in parser.reference_fields}
+        update_fields |= set(EXPIRY_CODE_FIELDS)
+    return update_fields
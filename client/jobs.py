@@ -0,0 +1,102 @@
+import io
+import tempfile
+import traceback
+
+from django.contrib import admin
+from django.contrib.auth.models import AnonymousUser
+from django.core.files import File
+from django.db import close_old_connections
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+
+from ezitrack.db import replica_alias
+
+from .export import EXPORT_CHUNK_SIZE, iter_export_rows, write_csv, write_xlsx
+from .models import Client, ExportJob
+from .resources import ClientResource
+
+
+def claim_export_job(job_id):
+    """
+    Marks a pending job as running. Returns False when another runner got
+    to it first, so several runners can poll the same table safely.
+    """
+    return bool(
+        ExportJob.objects.filter(pk=job_id, status="PENDING").update(
+            status="RUNNING", started_at=timezone.now()
+        )
+    )
+
+
+def get_job_queryset(job):
+    """
+    Rebuilds the export queryset the job was started from by replaying the
+    changelist query string through ClientAdmin, so search and list_filter
+    behave exactly as they did in the browser.
+    """
+    request = HttpRequest()
+    request.method = "GET"
+    request.GET = QueryDict(job.filters)
+    request.user = job.created_by or AnonymousUser()
+
+    model_admin = admin.site._registry[Client]
+    queryset = model_admin.get_export_queryset(request)
+    if job.items:
+        queryset = queryset.filter(pk__in=job.items)
+    # Progress is written to the primary while the rows are read from the replica
+    return queryset.using(replica_alias())
+
+
+def track_progress(job, rows):
+    """
+    Passes rows through while saving the processed count once per chunk.
+    """
+    processed = 0
+    for row in rows:
+        yield row
+        processed += 1
+        if processed % EXPORT_CHUNK_SIZE == 0:
+            ExportJob.objects.filter(pk=job.pk).update(processed_rows=processed)
+    ExportJob.objects.filter(pk=job.pk).update(processed_rows=processed)
+
+
+def run_export_job(job_id):
+    """
+    Runs a claimed export job and stores the result under MEDIA_ROOT.
+    """
+    close_old_connections()
+    job = ExportJob.objects.select_related("created_by").get(pk=job_id)
+    try:
+        queryset = get_job_queryset(job)
+        ExportJob.objects.filter(pk=job.pk).update(total_rows=queryset.count())
+
+        resource = ClientResource()
+        headers = resource.get_export_headers(selected_fields=job.fields)
+        binary = job.file_format == "xlsx"
+        rows = track_progress(
+            job, iter_export_rows(resource, queryset, job.fields, force_native_type=binary, by_pk=True)
+        )
+
+        with tempfile.TemporaryFile() as tmp:
+            if binary:
+                write_xlsx(headers, rows, tmp)
+            else:
+                text = io.TextIOWrapper(tmp, encoding="utf-8", newline="")
+                write_csv(headers, rows, text)
+                text.detach()
+            tmp.seek(0)
+            filename = "Client-{}-{}.{}".format(
+                job.pk, timezone.now().strftime("%Y-%m-%d"), job.file_format
+            )
+            job.file.save(filename, File(tmp), save=False)
+
+        ExportJob.objects.filter(pk=job.pk).update(
+            status="DONE", file=job.file.name, finished_at=timezone.now()
+        )
+    except Exception:
+        ExportJob.objects.filter(pk=job.pk).update(
+            status="FAILED", error=traceback.format_exc(), finished_at=timezone.now()
+        )
+        raise
+    finally:
+        close_old_connections()
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS
+
+from .caching import VersionedCache
+from .models import Client
+
+# Client fields returned by the API
+API_FIELDS = (
+    'tracker_imei', 'sim_number', 'email', 'sage_details', 'status', 'tracker_status',
+    'sim_provider', 'sim_code', 'sim_expire', 'sim_exp_date', 'tracker_expire_date',
+    'expire_date', 'tracker_model', 'sold_by', 'country',
+)
+
+# Unique fields clients are looked up by
+LOOKUP_FIELDS = ('tracker_imei', 'sim_number')
+
+API_CACHE_TIMEOUT = getattr(settings, 'CLIENT_API_CACHE_TIMEOUT', 24 * 60 * 60)
+
+# Versioned, so a bulk update can drop every lookup at once while a saved
+# client only drops its own, in a per-worker cache those sharing their shards
+LOOKUPS = VersionedCache(
+    'client:api', API_CACHE_TIMEOUT, alias=getattr(settings, 'CLIENT_API_CACHE_ALIAS', DEFAULT_CACHE_ALIAS),
+)
+
+
+def lookup_key(field_name, value):
+    # Hashed, since the value comes from the request
+    return LOOKUPS.key(field_name, hashlib.md5(str(value).encode()).hexdigest())
+
+
+def serialize_client(client):
+    data = {'id': client.pk}
+    for name in API_FIELDS:
+        data[name] = Client._meta.get_field(name).value_to_string(client)
+    return data
+
+
+def make_entry(client):
+    """
+    Returns the cached form of a lookup: the client's data (None if there
+    is no such client), its ETag and when it last changed, or for a missing
+    client when it was looked up.
+    """
+    data = None if client is None else serialize_client(client)
+    return {
+        'client': data,
+        'etag': hashlib.md5(json.dumps(data, sort_keys=True).encode()).hexdigest(),
+        'modified': int(time.time() if client is None else client.updated_at.timestamp()),
+    }
+
+
+def get_clients(field_name, values):
+    """
+    Returns {value: entry} for the clients whose ``field_name`` is one of
+    ``values``, from the cache where possible; the rest are read with one IN
+    query on the field's unique index and cached, missing clients included,
+    unless discarded meanwhile, see VersionedCache.add_many().
+    """
+    keys = {lookup_key(field_name, value): value for value in values}
+    versions = LOOKUPS.versions(keys)
+    entries = {keys[key]: entry for key, entry in LOOKUPS.get_many(list(keys), versions).items()}
+    missing = [value for value in values if value not in entries]
+    if missing:
+        found = Client.objects.only(*API_FIELDS, 'updated_at').in_bulk(missing, field_name=field_name)
+        new_entries = {value: make_entry(found.get(value)) for value in missing}
+        LOOKUPS.add_many(
+            {lookup_key(field_name, value): entry for value, entry in new_entries.items()}, versions,
+        )
+        entries.update(new_entries)
+    return entries
+
+
+async def aget_clients(field_name, values):
+    """
+    get_clients() for async views, with the async cache and ORM APIs, so a
+    lookup doesn't tie up a thread while it waits.
+    """
+    keys = {lookup_key(field_name, value): value for value in values}
+    versions = await LOOKUPS.aversions(keys)
+    cached = await LOOKUPS.aget_many(list(keys), versions)
+    entries = {keys[key]: entry for key, entry in cached.items()}
+    missing = [value for value in values if value not in entries]
+    if missing:
+        found = await Client.objects.only(*API_FIELDS, 'updated_at').ain_bulk(missing, field_name=field_name)
+        new_entries = {value: make_entry(found.get(value)) for value in missing}
+        await LOOKUPS.aadd_many(
+            {lookup_key(field_name, value): entry for value, entry in new_entries.items()}, versions,
+        )
+        entries.update(new_entries)
+    return entries
+
+
+def invalidate_client(*values):
+    """
+    Drops the cached lookups of one client. ``values`` are its field values
+    (keyed by attname) before and after the change.
+    """
+    keys = {
+        lookup_key(field_name, client_values[field_name])
+        for client_values in values
+        for field_name in LOOKUP_FIELDS
+        if client_values.get(field_name)
+    }
+    LOOKUPS.discard(list(keys))
+
+
+def invalidate_lookups():
+    """
+    Drops every cached lookup, e.g. after a QuerySet.update() that bypasses
+    signals.
+    """
+    LOOKUPS.invalidate()
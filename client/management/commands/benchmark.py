@@ -0,0 +1,117 @@
+import datetime
+import json
+import secrets
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client as TestClient
+from django.test.utils import override_settings
+
+from client.benchmarks.fleet import seed_clients
+from client.benchmarks.runner import app_static_files, compare, environment, isolated_cache, measure
+from client.benchmarks.scenarios import SCENARIOS, BenchmarkContext
+from client.facets import rebuild_facets
+from client.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a throwaway test database with a synthetic fleet, runs the admin, export, "
+        "import, save and API scenarios with the test client, and reports wall time, query "
+        "counts and peak memory as JSON. Run it with the same --rows, --seed and --date on "
+        "two commits and pass the first report to --compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help="Number of clients to seed.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--date', type=datetime.date.fromisoformat, default=datetime.date.today(),
+            help="Day the fleet's expiry dates are spread around (YYYY-MM-DD, default today).",
+        )
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per scenario.")
+        parser.add_argument(
+            '--scenario', action='append', choices=list(SCENARIOS),
+            help="Scenario to run; may be repeated. Defaults to all.",
+        )
+        parser.add_argument('--output', metavar='FILE', help="Write the report to FILE as JSON.")
+        parser.add_argument('--compare', metavar='FILE', help="Report to compare the results with.")
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be at least 1.")
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Can't read {options['compare']}: {exc}")
+
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with app_static_files(), isolated_cache():
+                report = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
+        if baseline is not None:
+            self.print_comparison(baseline, report)
+
+    def run(self, options):
+        start = time.perf_counter()
+        seed_clients(options['rows'], options['seed'], today=options['date'])
+        rebuild_facets()
+        rebuild_rollups()
+        self.stdout.write(f"Seeded {options['rows']} clients in {time.perf_counter() - start:.1f}s")
+
+        user = get_user_model().objects.create_superuser('benchmark', 'benchmark@example.com', 'benchmark')
+        browser = TestClient()
+        browser.force_login(user)
+        api_key = secrets.token_urlsafe()
+        api = TestClient(HTTP_AUTHORIZATION=f'Bearer {api_key}')
+        context = BenchmarkContext(browser, api, options['seed'])
+
+        report = {
+            **environment(),
+            'rows': options['rows'],
+            'seed': options['seed'],
+            'fleet_date': options['date'].isoformat(),
+            'repeat': options['repeat'],
+            'scenarios': {},
+        }
+        with override_settings(CLIENT_API_KEYS=[api_key]):
+            for name in options['scenario'] or SCENARIOS:
+                try:
+                    result = measure(SCENARIOS[name], context, options['repeat'])
+                except Exception as exc:
+                    raise CommandError(f"Scenario {name!r} failed: {exc!r}")
+                report['scenarios'][name] = result
+                self.stdout.write(
+                    f"{name:<24} {result['wall_ms']['median']:9.1f} ms  {result['queries']:5d} queries  "
+                    f"{result['peak_memory_kb']:8d} kB peak"
+                )
+        return report
+
+    def print_comparison(self, baseline, report):
+        if (baseline.get('rows'), baseline.get('seed'), baseline.get('fleet_date')) != (
+            report['rows'], report['seed'], report['fleet_date']
+        ):
+            self.stdout.write(self.style.WARNING("The baseline was measured on a different fleet."))
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Compared with {(baseline.get('commit') or '?')[:10]}"))
+        for name, old, new in compare(baseline, report):
+            old_ms, new_ms = old['wall_ms']['median'], new['wall_ms']['median']
+            change = (new_ms - old_ms) / old_ms * 100 if old_ms else 0
+            style = self.style.ERROR if change > 10 else self.style.SUCCESS if change < -10 else str
+            self.stdout.write(style(
+                f"{name:<24} {old_ms:9.1f} -> {new_ms:9.1f} ms ({change:+6.1f}%)  "
+                f"queries {old['queries']} -> {new['queries']}  "
+                f"peak {old['peak_memory_kb']} -> {new['peak_memory_kb']} kB"
+            ))
@@ -0,0 +1,227 @@
+import asyncio
+import json
+import os
+import random
+import secrets
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from client.benchmarks.fleet import seed_clients
+from client.models import Client
+
+GUNICORN = [
+    sys.executable, '-m', 'gunicorn', 'ezitrack.wsgi:application', '--bind', '{host}:{port}',
+    '--workers', '{workers}', '--worker-class', 'gthread', '--threads', '{threads}',
+    '--log-level', 'warning',
+]
+UVICORN = [
+    sys.executable, '-m', 'uvicorn', 'ezitrack.asgi:application', '--host', '{host}', '--port', '{port}',
+    '--workers', '{workers}', '--lifespan', 'off', '--no-access-log', '--log-level', 'warning',
+]
+
+# (command line, settings module) of each server profile; the command
+# serves {host}:{port} with {workers} processes
+SERVERS = {
+    'wsgi': (GUNICORN, 'ezitrack.settings'),
+    'asgi': (UVICORN, 'ezitrack.settings'),
+    # The deployment profile in ezitrack/asgi.py
+    'asgi-api': (UVICORN, 'ezitrack.api_settings'),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class HttpConnection:
+    """
+    A minimal keep-alive HTTP/1.1 client for GET requests, so the load
+    generator measures the server rather than a client library.
+    """
+
+    def __init__(self, host, port, headers):
+        self.host = host
+        self.port = port
+        self.headers = ''.join(f'{name}: {value}\r\n' for name, value in headers.items())
+        self.reader = self.writer = None
+
+    async def get(self, path):
+        """
+        Returns the status code of a GET of ``path``, reading the whole body.
+        """
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(f'GET {path} HTTP/1.1\r\nHost: {self.host}\r\n{self.headers}\r\n'.encode())
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while (line := await self.reader.readline()) not in (b'\r\n', b''):
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.lower()] = value.strip().lower()
+        if headers.get('transfer-encoding') == 'chunked':
+            while size := int((await self.reader.readline()).split(b';')[0], 16):
+                await self.reader.readexactly(size + 2)
+            await self.reader.readline()
+        else:
+            await self.reader.readexactly(int(headers.get('content-length', 0)))
+        if headers.get('connection') == 'close':
+            await self.close()
+        return status
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+async def run_load(host, port, headers, paths, concurrency, duration):
+    """
+    Requests random ``paths`` from ``concurrency`` connections for
+    ``duration`` seconds. Returns (latencies in seconds, errors).
+    """
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + duration
+
+    async def user():
+        http = HttpConnection(host, port, headers)
+        try:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    status = await http.get(random.choice(paths))
+                except (OSError, ValueError, IndexError, asyncio.IncompleteReadError) as exc:
+                    errors.append(repr(exc))
+                    await http.close()
+                    continue
+                if status >= 400:
+                    errors.append(f"HTTP {status}")
+                else:
+                    latencies.append(time.perf_counter() - start)
+        finally:
+            await http.close()
+
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    return latencies, errors
+
+
+def wait_until_up(url, headers, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f"The server exited with status {process.returncode}.")
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=5):
+                return
+        except urllib.error.HTTPError as exc:
+            raise CommandError(f"The server answered {url} with HTTP {exc.code}.")
+        except OSError:
+            # Not listening yet, or still loading the app
+            time.sleep(0.2)
+    raise CommandError(f"The server didn't answer {url} within {timeout} seconds.")
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a throwaway test database, serves it with gunicorn (WSGI) and uvicorn "
+        "(ASGI, with the full and the API-only settings) in turn, and compares the "
+        "throughput and latency of the client lookup API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help="Number of clients to seed.")
+        parser.add_argument('--servers', nargs='+', choices=list(SERVERS), default=list(SERVERS))
+        parser.add_argument('--workers', type=int, default=2, help="Server processes.")
+        parser.add_argument('--threads', type=int, default=8, help="Threads per WSGI worker.")
+        parser.add_argument('--concurrency', type=int, default=64, help="Concurrent connections.")
+        parser.add_argument('--duration', type=float, default=10, help="Seconds measured per server.")
+        parser.add_argument('--warmup', type=float, default=3, help="Seconds of load before measuring.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', metavar='FILE', help="Also write the results to FILE as JSON.")
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        with tempfile.TemporaryDirectory() as tmp:
+            if connection.vendor == 'sqlite':
+                # The servers are separate processes, so the database must be a file
+                connection.settings_dict['TEST']['NAME'] = os.path.join(tmp, 'benchmark_api.sqlite3')
+            test_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                seed_clients(options['rows'], options['seed'])
+                imeis = list(Client.objects.values_list('tracker_imei', flat=True))
+                connections.close_all()
+                results = [self.benchmark(server, test_name, imeis, options) for server in options['servers']]
+            finally:
+                connections.close_all()
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump(results, f, indent=2)
+
+    def benchmark(self, server, database_name, imeis, options):
+        host, port = '127.0.0.1', free_port()
+        api_key = secrets.token_urlsafe()
+        headers = {'Authorization': f'Bearer {api_key}'}
+        command, settings_module = SERVERS[server]
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': settings_module,
+            'DB_NAME': str(database_name),
+            'CLIENT_API_KEYS': api_key,
+            # Keeps the lookups of the test database apart from the real ones
+            'CACHE_KEY_PREFIX': f'benchmark-{api_key[:8]}',
+        }
+        # Only the test database is seeded
+        env.pop('DB_REPLICA_HOST', None)
+        command = [
+            part.format(host=host, port=port, workers=options['workers'], threads=options['threads'])
+            for part in command
+        ]
+        rng = random.Random(options['seed'])
+        paths = [f'/api/clients/imei/{imei}/' for imei in rng.sample(imeis, min(len(imeis), 5000))]
+
+        process = subprocess.Popen(command, env=env, cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL)
+        try:
+            wait_until_up(f'http://{host}:{port}{paths[0]}', headers, process)
+            # Fills the lookup caches, so both servers are measured warm
+            asyncio.run(run_load(host, port, headers, paths, options['concurrency'], options['warmup']))
+            latencies, errors = asyncio.run(
+                run_load(host, port, headers, paths, options['concurrency'], options['duration'])
+            )
+        finally:
+            process.terminate()
+            process.wait()
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{server}: {options['workers']} workers, {options['concurrency']} connections"
+        ))
+        if len(latencies) < 2:
+            raise CommandError(f"{len(errors)} errors, first: {errors[0] if errors else 'none'}")
+        percentiles = statistics.quantiles(latencies, n=100)
+        result = {
+            'server': server,
+            'requests_per_second': round((len(latencies) + len(errors)) / options['duration'], 1),
+            'p50_ms': round(statistics.median(latencies) * 1000, 2),
+            'p99_ms': round(percentiles[98] * 1000, 2),
+            'errors': len(errors),
+        }
+        self.stdout.write(
+            f"  {result['requests_per_second']:8.1f} req/s   p50 {result['p50_ms']:8.2f} ms   "
+            f"p99 {result['p99_ms']:8.2f} ms   errors {result['errors']}"
+        )
+        if errors:
+            self.stdout.write(self.style.WARNING(f"  first error: {errors[0]}"))
+        return result
@@ -0,0 +1,101 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from client.benchmarks.fleet import COUNTRIES, TRACKER_MODELS, seed_clients
+from client.models import EXPIRY_CODE_FIELDS, SIM_PROVIDER, SOLD_BY, STATUS, Client, expiry_code
+
+
+def filter_scenarios():
+    """
+    Returns (name, filter kwargs) pairs mirroring the ClientAdmin list filters
+    and the "what expires this month" questions.
+    """
+    today = datetime.date.today()
+    month_start = today.replace(day=1)
+    month_end = (month_start + datetime.timedelta(days=32)).replace(day=1)
+    this_month = {'sim_expire__gte': month_start, 'sim_expire__lt': month_end}
+    sim_code = expiry_code('EXP', today)
+    tracker_code = expiry_code('TEXP', today)
+    return [
+        ('no filter', {}),
+        ('status', {'status': STATUS[1][0]}),
+        ('tracker_status', {'tracker_status': STATUS[1][0]}),
+        ('expire_date', {'expire_date': tracker_code}),
+        ('sim_exp_date', {'sim_exp_date': sim_code}),
+        ('sold_by', {'sold_by': SOLD_BY[0][0]}),
+        ('sim_provider', {'sim_provider': SIM_PROVIDER[0][0]}),
+        ('tracker_model', {'tracker_model': next(iter(TRACKER_MODELS))}),
+        ('country', {'country': COUNTRIES[0][0]}),
+        ('status + sim_provider', {'status': 'ACTIVE', 'sim_provider': SIM_PROVIDER[0][0]}),
+        ('status + country', {'status': 'ACTIVE', 'country': COUNTRIES[0][0]}),
+        ('sim expires this month', this_month),
+        ('active sim expires this month', {'status': 'ACTIVE', **this_month}),
+        ('tracker expires this month', {
+            'tracker_status': 'ACTIVE',
+            'tracker_expire_date__gte': month_start,
+            'tracker_expire_date__lt': month_end,
+        }),
+        ('provider sim expires this month', {'sim_provider': SIM_PROVIDER[0][0], **this_month}),
+    ]
+
+
+def timed(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a throwaway test database with N clients and prints the query plan and "
+        "timings of each admin list filter combination."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help="Number of clients to seed.")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per query, the best is reported.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, options):
+        start = time.perf_counter()
+        seed_clients(options['rows'], options['seed'])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.stdout.write(f"Seeded {options['rows']} clients in {time.perf_counter() - start:.1f}s\n")
+
+        for name, filters in filter_scenarios():
+            # Same shape as a changelist page: a filtered count plus the first page by -pk
+            queryset = Client.objects.filter(**filters)
+            page = queryset.order_by('-pk')[:100]
+            count_ms = timed(queryset.count, options['repeat'])
+            page_ms = timed(lambda: list(page.all()), options['repeat'])
+
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(f"  count {count_ms:8.2f} ms   first page {page_ms:8.2f} ms")
+            for line in page.explain().splitlines():
+                self.stdout.write(f"  {line}")
+
+        for code_field in EXPIRY_CODE_FIELDS:
+            # Renewal-month rollup: one GROUP BY over the month-bucket index
+            rollup = Client.objects.expiry_rollup(code_field)
+            rollup_ms = timed(lambda: list(rollup.all()), options['repeat'])
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{code_field} rollup"))
+            self.stdout.write(f"  {rollup.count()} months {rollup_ms:8.2f} ms")
+            for line in rollup.explain().splitlines():
+                self.stdout.write(f"  {line}")
@@ -0,0 +1,117 @@
+import datetime
+from itertools import groupby
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from client.history import HISTORY_FIELDS
+from client.models import ClientEvent
+
+# Events older than this many days are deleted
+RETENTION_DAYS = getattr(settings, 'CLIENT_HISTORY_RETENTION_DAYS', 2 * 365)
+
+# Events older than this many days are compacted to one per client, field and day
+COMPACT_DAYS = getattr(settings, 'CLIENT_HISTORY_COMPACT_DAYS', 90)
+
+
+def delete_events(before, batch_size):
+    """
+    Deletes the events older than ``before`` in batches of ``batch_size``,
+    one field at a time so each batch is read from the (field, at) index.
+    Returns the number deleted.
+    """
+    deleted = 0
+    for field in HISTORY_FIELDS:
+        old_events = ClientEvent.objects.filter(field=field, at__lt=before).order_by()
+        while pks := list(old_events.values_list('pk', flat=True)[:batch_size]):
+            deleted += ClientEvent.objects.filter(pk__in=pks).delete()[0]
+    return deleted
+
+
+def day_key(event):
+    return event.client_id, event.field, timezone.localdate(event.at)
+
+
+def compact_group(events):
+    """
+    Returns (pks to delete, event to keep or None) for the changes of one
+    field of one client on one day, oldest first: the last change is kept
+    with the first old value, or none if the field ended up unchanged.
+    """
+    first, last = events[0], events[-1]
+    if first.old_value == last.new_value:
+        return [event.pk for event in events], None
+    last.old_value = first.old_value
+    return [event.pk for event in events[:-1]], last
+
+
+def compact_events(after, before, batch_size):
+    """
+    Compacts the events between ``after`` and ``before``, ``batch_size``
+    clients at a time. Returns the number of events removed.
+    """
+    window = ClientEvent.objects.filter(at__gte=after, at__lt=before).order_by()
+    bounds = ClientEvent.objects.order_by().aggregate(first=Min('client_id'), last=Max('client_id'))
+    if bounds['first'] is None:
+        return 0
+
+    removed = 0
+    for start in range(bounds['first'], bounds['last'] + 1, batch_size):
+        events = (
+            window.filter(client_id__gte=start, client_id__lt=start + batch_size)
+            .only('client_id', 'field', 'at', 'old_value', 'new_value')
+            .order_by('client_id', 'field', 'at', 'pk')
+        )
+        to_delete = []
+        to_keep = []
+        for _key, group in groupby(events, key=day_key):
+            group = list(group)
+            if len(group) < 2:
+                continue
+            pks, kept = compact_group(group)
+            to_delete += pks
+            if kept is not None:
+                to_keep.append(kept)
+        with transaction.atomic():
+            ClientEvent.objects.bulk_update(to_keep, ['old_value'], batch_size=1000)
+            for offset in range(0, len(to_delete), 1000):
+                ClientEvent.objects.filter(pk__in=to_delete[offset:offset + 1000]).delete()
+        removed += len(to_delete)
+    return removed
+
+
+class Command(BaseCommand):
+    help = (
+        "Keeps the client history small: deletes events older than the retention period "
+        "and compacts older events to one change per client, field and day."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=RETENTION_DAYS,
+            help=f"Delete events older than this many days (default {RETENTION_DAYS}).",
+        )
+        parser.add_argument(
+            '--compact-days', type=int, default=COMPACT_DAYS,
+            help=f"Compact events older than this many days (default {COMPACT_DAYS}); 0 to skip.",
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options['days'] < 1 or options['compact_days'] < 0 or options['batch_size'] < 1:
+            raise CommandError("--days and --batch-size must be positive, --compact-days not negative.")
+
+        now = timezone.now()
+        retain_from = now - datetime.timedelta(days=options['days'])
+        deleted = delete_events(retain_from, options['batch_size'])
+        self.stdout.write(f"Deleted {deleted} events older than {options['days']} days.")
+
+        if options['compact_days'] and options['compact_days'] < options['days']:
+            compact_before = now - datetime.timedelta(days=options['compact_days'])
+            removed = compact_events(retain_from, compact_before, options['batch_size'])
+            self.stdout.write(f"Compacted away {removed} events older than {options['compact_days']} days.")
+
+        self.stdout.write(self.style.SUCCESS("Client history is up to date."))
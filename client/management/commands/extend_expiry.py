@@ -0,0 +1,56 @@
+from django.core.exceptions import FieldError, ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from client.models import EXPIRY_KIND_CODE_FIELDS, Client
+
+
+def parse_filter(value):
+    """
+    Parses a ``lookup=value`` command line filter, e.g. sold_by=EZITRACK_DEALER
+    or sim_expire__lt=2026-01-01.
+    """
+    lookup, sep, filter_value = value.partition('=')
+    if not sep or not lookup:
+        raise CommandError(f"Filters are lookup=value, got {value!r}")
+    return lookup, filter_value
+
+
+class Command(BaseCommand):
+    help = (
+        "Extends the SIM or tracker expiry of the matching clients by a number of "
+        "months with a single UPDATE, keeping the expiry codes in sync."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=list(EXPIRY_KIND_CODE_FIELDS), required=True)
+        parser.add_argument('--months', type=int, required=True)
+        parser.add_argument(
+            '--filter', action='append', default=[], metavar='LOOKUP=VALUE',
+            help="Client field lookup to select the clients, e.g. sold_by=EZITRACK_DEALER; may be repeated.",
+        )
+        parser.add_argument('--all', action='store_true', help="Extend every client when no filter is given.")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the matching clients.")
+
+    def handle(self, *args, **options):
+        filters = dict(parse_filter(value) for value in options['filter'])
+        if not filters and not options['all']:
+            raise CommandError("Give at least one --filter, or --all to extend every client.")
+        if options['months'] == 0:
+            raise CommandError("--months can't be 0.")
+
+        try:
+            queryset = Client.objects.filter(**filters)
+            if options['dry_run']:
+                count = queryset.count()
+                self.stdout.write(f"{count} clients would be extended.")
+                return
+            count = Client.objects.bulk_extend_expiry(
+                queryset, options['kind'], options['months'],
+                description="Command: " + (' '.join(options['filter']) or "all clients"),
+            )
+        except (FieldError, ValidationError, ValueError) as exc:
+            raise CommandError(f"Invalid filter: {exc}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Extended the {options['kind']} expiry of {count} clients by {options['months']} months."
+        ))
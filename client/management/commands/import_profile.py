@@ -0,0 +1,120 @@
+import json
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter, since modules already imported here can't be
+# timed again; prints the wall time in ms and the number of modules loaded
+BOOT_SCRIPT = (
+    "import sys, time\n"
+    "start = time.perf_counter()\n"
+    "import django\n"
+    "django.setup()\n"
+    "{imports}"
+    "print(round((time.perf_counter() - start) * 1000, 1), len(sys.modules))\n"
+)
+
+
+def parse_importtime(report):
+    """
+    Parses the ``python -X importtime`` report into [module, self ms,
+    cumulative ms, importer] rows, the importer being the module whose
+    import triggered it, or None when a function did (e.g. import_module()
+    during django.setup()).
+    """
+    rows = []
+    depths = []
+    pending = []
+    for line in report.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        # A module is reported after the modules it imports, one level deeper
+        while pending and depths[pending[-1]] > depth:
+            rows[pending.pop()][3] = name.strip()
+        rows.append([name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000, None])
+        depths.append(depth)
+        pending.append(len(rows) - 1)
+    return rows
+
+
+def package(module):
+    return module.split('.')[0] if module else None
+
+
+class Command(BaseCommand):
+    help = (
+        "Profiles what a process imports at startup: runs django.setup() (plus the --import "
+        "modules) in fresh interpreters, reports the median wall time, and with python -X "
+        "importtime the packages that take longest to import and the imports that pull them in."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--import', dest='modules', action='append', default=[], metavar='MODULE',
+            help="Also import MODULE after django.setup(), e.g. ezitrack.wsgi or ezitrack.urls "
+                 "(what a worker loads on its first request). May be repeated.",
+        )
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs, the median is reported.")
+        parser.add_argument('--limit', type=int, default=15, help="Rows shown per table.")
+        parser.add_argument('--json', metavar='FILE', help="Also write the results to FILE as JSON.")
+
+    def handle(self, *args, **options):
+        script = BOOT_SCRIPT.format(imports=''.join(f"import {module}\n" for module in options['modules']))
+        runs = [self.run(script) for _ in range(options['repeat'])]
+        wall_ms = statistics.median(ms for ms, _modules in runs)
+        module_count = runs[-1][1]
+        rows = parse_importtime(self.run(script, importtime=True))
+
+        packages = defaultdict(lambda: [0.0, 0])
+        for module, self_ms, _cumulative_ms, _importer in rows:
+            packages[package(module)][0] += self_ms
+            packages[package(module)][1] += 1
+        heaviest_packages = sorted(packages.items(), key=lambda item: -item[1][0])[:options['limit']]
+        # Where an import crosses into another package, with everything it loads
+        entry_points = [row for row in rows if package(row[3]) != package(row[0])]
+        heaviest_imports = sorted(entry_points, key=lambda row: -row[2])[:options['limit']]
+
+        target = ' + '.join(['django.setup()', *options['modules']])
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{target}: {wall_ms:.0f} ms (median of {len(runs)}), {module_count} modules"
+        ))
+        self.stdout.write("Packages by own import time:")
+        for name, (self_ms, count) in heaviest_packages:
+            self.stdout.write(f"  {name:<30} {self_ms:8.1f} ms {count:5d} modules")
+        self.stdout.write("Imports by cumulative time, where they enter a package:")
+        for module, _self_ms, cumulative_ms, importer in heaviest_imports:
+            self.stdout.write(f"  {module:<45} {cumulative_ms:8.1f} ms  imported by {importer or '-'}")
+
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump({
+                    'target': target,
+                    'wall_ms': wall_ms,
+                    'runs_ms': [ms for ms, _modules in runs],
+                    'modules': module_count,
+                    'packages': {
+                        name: {'self_ms': round(self_ms, 1), 'modules': count}
+                        for name, (self_ms, count) in packages.items()
+                    },
+                    'imports': [
+                        {'module': module, 'self_ms': self_ms, 'cumulative_ms': cumulative_ms, 'importer': importer}
+                        for module, self_ms, cumulative_ms, importer in rows
+                    ],
+                }, f, indent=2)
+
+    def run(self, script, importtime=False):
+        command = [sys.executable, *(['-X', 'importtime'] if importtime else []), '-c', script]
+        # Inherits DJANGO_SETTINGS_MODULE, so the same settings as this process (manage.py or --settings)
+        process = subprocess.run(command, cwd=settings.BASE_DIR, capture_output=True, text=True)
+        if process.returncode:
+            raise CommandError(f"The profiled process failed:\n{process.stderr[-2000:]}")
+        if importtime:
+            return process.stderr
+        ms, modules = process.stdout.split()[-2:]
+        return float(ms), int(modules)
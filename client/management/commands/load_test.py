@@ -0,0 +1,153 @@
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client as TestClient
+
+from client.benchmarks.fleet import seed_clients
+from client.benchmarks.runner import app_static_files, isolated_cache
+from client.benchmarks.scenarios import consume
+from client.facets import rebuild_facets
+from client.models import Client
+from client.rollups import rebuild_rollups
+
+
+def scenarios(pks):
+    """
+    Returns (name, function) pairs; each function makes one request with the
+    given test client and returns the response.
+    """
+    def changelist(browser, i):
+        # Sort by each of the first columns in turn; pages are reached with cursors, not numbers
+        return browser.get('/admin/client/client/', {'o': i % 10 + 1})
+
+    def search(browser, i):
+        return browser.get('/admin/client/client/', {'q': f'user{i % 1000}'})
+
+    def filtered(browser, i):
+        return browser.get('/admin/client/client/', {'status__exact': 'ACTIVE', 'sim_provider__exact': 'OTHER'})
+
+    def change_form(browser, i):
+        return browser.get(f'/admin/client/client/{pks[i % len(pks)]}/change/')
+
+    def status_action(browser, i):
+        # Writes: flip a handful of SIMs between ACTIVE and SUSPENDED
+        action = 'suspend_sims' if i % 2 else 'activate_sims'
+        selected = [pks[(i * 5 + offset) % len(pks)] for offset in range(5)]
+        return browser.post('/admin/client/client/', {'action': action, '_selected_action': selected})
+
+    def export(browser, i):
+        return browser.post('/admin/client/client/export/', {
+            'format': '0',
+            'clientresource_email': 'on',
+            'clientresource_tracker_imei': 'on',
+            'clientresource_sim_expire': 'on',
+        }, QUERY_STRING='sim_provider__exact=OTHER')
+
+    return [
+        ('changelist', changelist),
+        ('search', search),
+        ('filtered changelist', filtered),
+        ('change form', change_form),
+        ('status action', status_action),
+        ('streaming export', export),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a throwaway test database and measures admin throughput with concurrent "
+        "users. Run it once per database profile (DB_ENGINE, DB_CONN_MAX_AGE, DB_POOL, "
+        "DB_SQLITE_TUNED) to compare them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help="Number of clients to seed.")
+        parser.add_argument('--users', type=int, default=8, help="Number of concurrent users.")
+        parser.add_argument('--requests', type=int, default=25, help="Requests per user and scenario.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        with tempfile.TemporaryDirectory() as tmp:
+            if connection.vendor == 'sqlite':
+                # A file like a real install; the default in-memory test database
+                # uses shared-cache table locks instead of the file locking being measured
+                connection.settings_dict['TEST']['NAME'] = os.path.join(tmp, 'load_test.sqlite3')
+            connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                with app_static_files(), isolated_cache():
+                    self.run(options)
+            finally:
+                connections.close_all()
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, options):
+        seed_clients(options['rows'], options['seed'])
+        rebuild_facets()
+        rebuild_rollups()
+        user = get_user_model().objects.create_superuser('load-test', 'load-test@example.com', 'load-test')
+        pks = list(Client.objects.values_list('pk', flat=True)[:1000])
+
+        settings_dict = connection.settings_dict
+        self.stdout.write(
+            f"{connection.vendor}, CONN_MAX_AGE={settings_dict['CONN_MAX_AGE']}, "
+            f"pool={bool(settings_dict['OPTIONS'].get('pool'))}, "
+            f"{options['users']} users, {options['rows']} clients"
+        )
+
+        for name, request in scenarios(pks):
+            timings, sizes, errors, elapsed = self.run_scenario(request, user, options['users'], options['requests'])
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            if len(timings) < 2:
+                self.stdout.write(self.style.ERROR(f"  {len(errors)} errors, first: {errors[0]}"))
+                continue
+            self.stdout.write(
+                f"  {(len(timings) + len(errors)) / elapsed:8.1f} req/s   "
+                f"p50 {statistics.median(timings) * 1000:8.1f} ms   "
+                f"p95 {statistics.quantiles(timings, n=20)[-1] * 1000:8.1f} ms   "
+                f"{statistics.mean(sizes) / 1024:8.1f} kB   errors {len(errors)}"
+            )
+            if errors:
+                self.stdout.write(self.style.WARNING(f"  first error: {errors[0]}"))
+
+    def run_scenario(self, request, user, users, requests):
+        timings = []
+        sizes = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker(offset):
+            browser = TestClient()
+            browser.force_login(user)
+            try:
+                for i in range(offset * requests, (offset + 1) * requests):
+                    start = time.perf_counter()
+                    try:
+                        status, size = consume(request(browser, i))
+                        error = f"HTTP {status}" if status >= 400 else None
+                    except Exception as exc:
+                        error = repr(exc)
+                    took = time.perf_counter() - start
+                    with lock:
+                        if error:
+                            errors.append(error)
+                        else:
+                            timings.append(took)
+                            sizes.append(size)
+            finally:
+                # Each thread has its own connections; close them so the test database can be dropped
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(users)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return timings, sizes, errors, time.perf_counter() - start
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from client.rollups import ROLLUP_KINDS, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recounts the expiry dashboard rollup table from the Client table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind', choices=list(ROLLUP_KINDS), action='append',
+            help="Only rebuild this kind of expiry, may be repeated.",
+        )
+
+    def handle(self, *args, **options):
+        kinds = options['kind'] or list(ROLLUP_KINDS)
+        rebuild_rollups(kinds)
+        self.stdout.write(f"Rebuilt expiry rollups for {', '.join(kinds)}")
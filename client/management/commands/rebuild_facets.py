@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from client.facets import FACET_FIELDS, rebuild_facets
+
+
+class Command(BaseCommand):
+    help = "Recounts the cached Client list filter facets from the database."
+
+    def handle(self, *args, **options):
+        rebuild_facets()
+        self.stdout.write(f"Rebuilt facets for {', '.join(FACET_FIELDS)}")
@@ -0,0 +1,83 @@
+import datetime
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+
+def init_worker():
+    # Workers are spawned, not forked, so they never share the parent's DB connections
+    django.setup()
+
+
+def reconcile_path(file_format, path, output, as_of):
+    # Imported here because spawned workers load this module before django.setup()
+    from client.reconcile import reconcile_file
+
+    extension = path.rsplit('.', 1)[-1].lower()
+    with open(path, 'rb') as fileobj, open(output, 'w', encoding='utf-8', newline='') as out:
+        return reconcile_file(fileobj, extension, file_format, as_of, out)
+
+
+def provider_file(value):
+    file_format, sep, path = value.partition('=')
+    if not sep or not path:
+        raise ValueError(value)
+    return file_format.upper(), path
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconciles monthly SIM activity files from the providers with the clients and writes "
+        "the differences (unknown SIMs, suspended but active, expired but billing, active but "
+        "not in the file) to a CSV per file. Each file is sorted on disk and merged with the "
+        "clients in SIM number order, so memory stays bounded; several files run in a process pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files', nargs='+', type=provider_file, metavar='PROVIDER=FILE',
+            help="A provider file, e.g. FLOLIVE=flolive-2026-09.csv. CSV or XLSX.",
+        )
+        parser.add_argument(
+            '--date', type=datetime.date.fromisoformat, default=datetime.date.today(),
+            help="SIMs expiring before this day count as expired (YYYY-MM-DD, default today).",
+        )
+        parser.add_argument('--output-dir', default='.', help="Directory the diff files are written to.")
+        parser.add_argument('--workers', type=int, default=2, help="Number of files reconciled at once.")
+
+    def handle(self, *args, **options):
+        from client.reconcile import PROVIDER_FILES
+
+        jobs = []
+        for file_format, path in options['files']:
+            if file_format not in PROVIDER_FILES:
+                raise CommandError(f"Unknown provider {file_format}; use one of {', '.join(PROVIDER_FILES)}.")
+            if not os.path.isfile(path):
+                raise CommandError(f"No such file: {path}")
+            output = os.path.join(
+                options['output_dir'], f"sim-reconciliation-{file_format}-{options['date'].isoformat()}.csv",
+            )
+            jobs.append((file_format, path, output, options['date']))
+
+        if len(jobs) == 1 or options['workers'] < 2:
+            results = [self.run(reconcile_path, job) for job in jobs]
+        else:
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(
+                max_workers=min(options['workers'], len(jobs)), mp_context=context, initializer=init_worker,
+            ) as pool:
+                futures = [pool.submit(reconcile_path, *job) for job in jobs]
+                results = [self.run(future.result) for future in futures]
+
+        for (file_format, path, output, _), counts in zip(jobs, results):
+            summary = ', '.join(f"{count} {category}" for category, count in sorted(counts.items())) or "no differences"
+            self.stdout.write(f"{file_format} ({path}): {summary} -> {output}")
+
+    def run(self, function, args=()):
+        try:
+            return function(*args)
+        except ValueError as exc:
+            raise CommandError(str(exc))
@@ -0,0 +1,64 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+
+def init_worker():
+    # Workers are spawned, not forked, so they never share the parent's DB connections
+    django.setup()
+
+
+def run_job(job_id):
+    # Imported here because spawned workers load this module before django.setup()
+    from client.jobs import run_export_job
+
+    run_export_job(job_id)
+
+
+class Command(BaseCommand):
+    help = "Polls the database for pending client exports and runs them in a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help="Number of exports to run at once.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds between polls.")
+        parser.add_argument('--once', action='store_true', help="Run the pending jobs and exit.")
+
+    def handle(self, *args, **options):
+        from client.jobs import claim_export_job
+        from client.models import ExportJob
+
+        workers = options['workers']
+        running = {}
+        context = multiprocessing.get_context('spawn')
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker) as pool:
+            while True:
+                for job_id, future in list(running.items()):
+                    if not future.done():
+                        continue
+                    del running[job_id]
+                    if future.exception():
+                        # The job is still RUNNING if the worker died before recording the failure
+                        ExportJob.objects.filter(pk=job_id, status="RUNNING").update(
+                            status="FAILED", error=str(future.exception()), finished_at=timezone.now()
+                        )
+                        self.stderr.write(f"Export #{job_id} failed: {future.exception()}")
+                    else:
+                        self.stdout.write(f"Export #{job_id} done")
+
+                free = workers - len(running)
+                if free > 0:
+                    pending = ExportJob.objects.filter(status="PENDING").order_by('created_at')
+                    for job_id in pending.values_list('pk', flat=True)[:free]:
+                        if claim_export_job(job_id):
+                            running[job_id] = pool.submit(run_job, job_id)
+
+                if options['once'] and not running:
+                    break
+                connections.close_all()
+                time.sleep(options['interval'])
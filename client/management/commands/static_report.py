@@ -0,0 +1,169 @@
+import json
+import re
+import tempfile
+from urllib.parse import urljoin, urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client as TestClient
+from django.test.utils import override_settings
+
+from client.benchmarks.fleet import seed_clients
+from client.benchmarks.runner import isolated_cache
+from client.benchmarks.scenarios import consume
+from client.models import Client
+
+# Admin pages measured: name -> (path, logged in)
+PAGES = {
+    'login': ('/admin/login/', False),
+    'index': ('/admin/', True),
+    'changelist': ('/admin/client/client/', True),
+    'add form': ('/admin/client/client/add/', True),
+    'change form': ('/admin/client/client/{pk}/change/', True),
+}
+
+HTML_ASSET = re.compile(r'''(?:href|src)=["']([^"']+)["']''')
+CSS_ASSET = re.compile(r'''url\(\s*["']?([^"')]+)["']?\s*\)|@import\s+["']([^"']+)["']''')
+
+# Of the fonts a stylesheet offers, a current browser only downloads these
+FONT_EXTENSIONS = ('.eot', '.svg', '.ttf', '.woff', '.woff2', '.otf')
+LOADED_FONT_EXTENSION = '.woff2'
+
+
+def is_immutable(response):
+    return 'immutable' in response.get('Cache-Control', '')
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures what the admin pages transfer in static files, with the development "
+        "settings (files from the apps, uncompressed, revalidated) and the production ones "
+        "(collectstatic's hashed copies, precompressed, cached as immutable). Each page "
+        "counts the stylesheets, scripts and images it links and the stylesheets' imports "
+        "and woff2 fonts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--no-collect', action='store_true',
+            help="Measure the files already in STATIC_ROOT instead of collecting them into a "
+                 "temporary directory (which takes a minute or two with brotli).",
+        )
+        parser.add_argument('--json', metavar='FILE', help="Also write the results to FILE as JSON.")
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with tempfile.TemporaryDirectory() as tmp, isolated_cache():
+                results = self.run(tmp if not options['no_collect'] else None)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        for name, modes in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{name} ({modes['development']['path']})"))
+            for mode, result in modes.items():
+                self.stdout.write(
+                    f"  {mode:<12} {result['files']:3d} files {result['kb']:9.1f} kB, "
+                    f"{result['revalidated']:3d} requested again on a repeat visit"
+                )
+        dev_kb = sum(modes['development']['kb'] for modes in results.values())
+        prod_kb = sum(modes['production']['kb'] for modes in results.values())
+        if dev_kb:
+            self.stdout.write(self.style.SUCCESS(
+                f"All pages: {dev_kb:.1f} kB -> {prod_kb:.1f} kB ({(prod_kb - dev_kb) / dev_kb * 100:+.1f}%)"
+            ))
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump(results, f, indent=2)
+
+    def run(self, static_root):
+        seed_clients(20)
+        pk = Client.objects.order_by('pk').values_list('pk', flat=True).first()
+        user = get_user_model().objects.create_superuser('static-report', 'static-report@example.com', 'static')
+
+        storages = {**settings.STORAGES}
+        development = override_settings(
+            STORAGES={**storages, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}},
+            WHITENOISE_USE_FINDERS=True,
+            WHITENOISE_AUTOREFRESH=True,
+        )
+        production = override_settings(
+            STORAGES={
+                **storages,
+                'staticfiles': {'BACKEND': 'ezitrack.storage.ManifestStaticFilesStorage'},
+            },
+            STATIC_ROOT=static_root or settings.STATIC_ROOT,
+            WHITENOISE_USE_FINDERS=False,
+            WHITENOISE_AUTOREFRESH=False,
+        )
+
+        results = {name: {} for name in PAGES}
+        for mode, overrides in (('development', development), ('production', production)):
+            with overrides:
+                if mode == 'production' and static_root:
+                    self.stdout.write(f"Collecting the static files into {static_root}...")
+                    call_command('collectstatic', interactive=False, verbosity=0)
+                # New test clients, so WhiteNoise scans the files with these settings
+                browser = TestClient()
+                browser.force_login(user)
+                anonymous = TestClient()
+                for name, (path, logged_in) in PAGES.items():
+                    path = path.format(pk=pk)
+                    results[name][mode] = self.measure_page(browser if logged_in else anonymous, path)
+        return results
+
+    def measure_page(self, browser, path):
+        """
+        Fetches the page and every static file it loads the way a browser
+        accepting brotli and gzip would, and sums what the files transfer.
+        """
+        response = browser.get(path)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} answered HTTP {response.status_code}")
+        static_url = settings.STATIC_URL
+        queue = [url for url in HTML_ASSET.findall(response.content.decode()) if url.startswith(static_url)]
+        seen = set()
+        size = 0
+        revalidated = 0
+        while queue:
+            url = urlsplit(queue.pop(0)).path
+            if url in seen:
+                continue
+            seen.add(url)
+            asset = browser.get(url, headers={'accept-encoding': 'br, gzip'})
+            status, length = consume(asset)
+            if status != 200:
+                raise RuntimeError(f"{url}, loaded by {path}, answered HTTP {status}")
+            size += length
+            if not is_immutable(asset):
+                revalidated += 1
+            if url.endswith('.css'):
+                css = self.read_text(browser, url)
+                for match in CSS_ASSET.finditer(css):
+                    ref = match.group(1) or match.group(2)
+                    if ref.startswith(('data:', '#', 'http:', 'https:', '//')):
+                        continue
+                    ref = urljoin(url, ref)
+                    ref_path = urlsplit(ref).path
+                    if ref_path.endswith(FONT_EXTENSIONS):
+                        if ref_path.endswith(LOADED_FONT_EXTENSION):
+                            queue.append(ref)
+                    elif ref_path.endswith('.css'):
+                        queue.append(ref)
+        return {
+            'path': path,
+            'files': len(seen),
+            'kb': round(size / 1024, 1),
+            'revalidated': revalidated,
+        }
+
+    def read_text(self, browser, url):
+        # Uncompressed, to parse
+        response = browser.get(url, headers={'accept-encoding': 'identity'})
+        return b''.join(response.streaming_content if response.streaming else [response.content]).decode(
+            'utf-8', 'replace'
+        )
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from client.models import EXPIRY_CODE_FIELDS, Client, expiry_code_expression
+
+
+class Command(BaseCommand):
+    help = "Recomputes the expiry codes of the clients whose codes no longer match their dates."
+
+    def handle(self, *args, **options):
+        codes = {
+            field_name: expiry_code_expression(prefix, date_field)
+            for field_name, (prefix, date_field) in EXPIRY_CODE_FIELDS.items()
+        }
+        # Only the drifted rows, so the others keep their updated_at and cached lookups
+        count = Client.objects.exclude(**codes).sync_expiry_codes()
+        self.stdout.write(f"Synced the expiry codes of {count} clients")
@@ -0,0 +1,29 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .history import acting_request
+
+
+class ClientHistoryMiddleware:
+    """
+    Attributes the client changes made while handling a request to the
+    logged-in user. Goes after AuthenticationMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Runs natively under ASGI instead of costing a thread switch per request
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # request.user stays lazy until an event is written
+        with acting_request(request):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with acting_request(request):
+            return await self.get_response(request)
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:07
+
+import django_countries.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Client',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('added', models.DateField(verbose_name='ADDED')),
+                ('email', models.EmailField(max_length=100, verbose_name='EZIMAP USER ACCOUNT')),
+                ('sage_details', models.CharField(max_length=255, verbose_name='SAGE ACCOUNT')),
+                ('tracker_imei', models.CharField(max_length=255, unique=True, verbose_name='TRACKER IMEI')),
+                ('tracker_activation_date', models.DateField(verbose_name='TRACKER ACTIVATION DATE')),
+                ('expire_date', models.CharField(choices=[('TEXPJAN24', 'TEXPJAN24'), ('TEXPFEB24', 'TEXPFEB24'), ('TEXPMAR24', 'TEXPMAR24'), ('TEXPAPR24', 'TEXPAPR24'), ('TEXPMAY24', 'TEXPMAY24'), ('TEXPJUN24', 'TEXPJUN24'), ('TEXPJUL24', 'TEXPJUL24'), ('TEXPAUG24', 'TEXPAUG24'), ('TEXPSEP24', 'TEXPSEP24'), ('TEXPOCT24', 'TEXPOCT24'), ('TEXPNOV24', 'TEXPNOV24'), ('TEXPDEC24', 'TEXPDEC24'), ('TEXPJAN25', 'TEXPJAN25'), ('TEXPFEB25', 'TEXPFEB25'), ('TEXPMAR25', 'TEXPMAR25'), ('TEXPAPR25', 'TEXPAPR25'), ('TEXPMAY25', 'TEXPMAY25'), ('TEXPJUN25', 'TEXPJUN25'), ('TEXPJUL25', 'TEXPJUL25'), ('TEXPAUG25', 'TEXPAUG25'), ('TEXPSEP25', 'TEXPSEP25'), ('TEXPOCT25', 'TEXPOCT25'), ('TEXPNOV25', 'TEXPNOV25'), ('TEXPDEC25', 'TEXPDEC25'), ('TEXPJAN26', 'TEXPJAN26'), ('TEXPFEB26', 'TEXPFEB26'), ('TEXPMAR26', 'TEXPMAR26'), ('TEXPAPR26', 'TEXPAPR26'), ('TEXPMAY26', 'TEXPMAY26'), ('TEXPJUN26', 'TEXPJUN26'), ('TEXPJUL26', 'TEXPJUL26'), ('TEXPAUG26', 'TEXPAUG26'), ('TEXPSEP26', 'TEXPSEP26'), ('TEXPOCT26', 'TEXPOCT26'), ('TEXPNOV26', 'TEXPNOV26'), ('TEXPDEC26', 'TEXPDEC26'), ('TEXPJAN27', 'TEXPJAN27'), ('TEXPFEB27', 'TEXPFEB27'), ('TEXPMAR27', 'TEXPMAR27'), ('TEXPAPR27', 'TEXPAPR27'), ('TEXPMAY27', 'TEXPMAY27'), ('TEXPJUN27', 'TEXPJUN27'), ('TEXPJUL27', 'TEXPJUL27'), ('TEXPAUG27', 'TEXPAUG27'), ('TEXPSEP27', 'TEXPSEP27'), ('TEXPOCT27', 'TEXPOCT27'), ('TEXPNOV27', 'TEXPNOV27'), ('TEXPDEC27', 'TEXPDEC27'), ('TEXPJAN28', 'TEXPJAN28'), ('TEXPFEB28', 'TEXPFEB28'), ('TEXPMAR28', 'TEXPMAR28'), ('TEXPAPR28', 'TEXPAPR28'), ('TEXPMAY28', 'TEXPMAY28'), ('TEXPJUN28', 'TEXPJUN28'), ('TEXPJUL28', 'TEXPJUL28'), ('TEXPAUG28', 'TEXPAUG28'), ('TEXPSEP28', 'TEXPSEP28'), ('TEXPOCT28', 'TEXPOCT28'), ('TEXPNOV28', 'TEXPNOV28'), ('TEXPDEC28', 'TEXPDEC28'), ('TEXPJAN29', 'TEXPJAN29'), ('TEXPFEB29', 'TEXPFEB29'), ('TEXPMAR29', 'TEXPMAR29'), ('TEXPAPR29', 'TEXPAPR29'), ('TEXPMAY29', 'TEXPMAY29'), ('TEXPJUN29', 'TEXPJUN29'), ('TEXPJUL29', 'TEXPJUL29'), ('TEXPAUG29', 'TEXPAUG29'), ('TEXPSEP29', 'TEXPSEP29'), ('TEXPOCT29', 'TEXPOCT29'), ('TEXPNOV29', 'TEXPNOV29'), ('TEXPDEC29', 'TEXPDEC29'), ('TEXPJAN30', 'TEXPJAN30'), ('TEXPFEB30', 'TEXPFEB30'), ('TEXPMAR30', 'TEXPMAR30'), ('TEXPAPR30', 'TEXPAPR30'), ('TEXPMAY30', 'TEXPMAY30'), ('TEXPJUN30', 'TEXPJUN30'), ('TEXPJUL30', 'TEXPJUL30'), ('TEXPAUG30', 'TEXPAUG30'), ('TEXPSEP30', 'TEXPSEP30'), ('TEXPOCT30', 'TEXPOCT30'), ('TEXPNOV30', 'TEXPNOV30'), ('TEXPDEC30', 'TEXPDEC30'), ('TEXPJAN31', 'TEXPJAN31'), ('TEXPFEB31', 'TEXPFEB31'), ('TEXPMAR31', 'TEXPMAR31'), ('TEXPAPR31', 'TEXPAPR31'), ('TEXPMAY31', 'TEXPMAY31'), ('TEXPJUN31', 'TEXPJUN31'), ('TEXPJUL31', 'TEXPJUL31'), ('TEXPAUG31', 'TEXPAUG31'), ('TEXPSEP31', 'TEXPSEP31'), ('TEXPOCT31', 'TEXPOCT31'), ('TEXPNOV31', 'TEXPNOV31'), ('TEXPDEC31', 'TEXPDEC31'), ('TEXPJAN32', 'TEXPJAN32'), ('TEXPFEB32', 'TEXPFEB32'), ('TEXPMAR32', 'TEXPMAR32'), ('TEXPAPR32', 'TEXPAPR32'), ('TEXPMAY32', 'TEXPMAY32'), ('TEXPJUN32', 'TEXPJUN32'), ('TEXPJUL32', 'TEXPJUL32'), ('TEXPAUG32', 'TEXPAUG32'), ('TEXPSEP32', 'TEXPSEP32'), ('TEXPOCT32', 'TEXPOCT32'), ('TEXPNOV32', 'TEXPNOV32'), ('TEXPDEC32', 'TEXPDEC32'), ('TEXPJAN33', 'TEXPJAN33'), ('TEXPFEB33', 'TEXPFEB33'), ('TEXPMAR33', 'TEXPMAR33'), ('TEXPAPR33', 'TEXPAPR33'), ('TEXPMAY33', 'TEXPMAY33'), ('TEXPJUN33', 'TEXPJUN33'), ('TEXPJUL33', 'TEXPJUL33'), ('TEXPAUG33', 'TEXPAUG33'), ('TEXPSEP33', 'TEXPSEP33'), ('TEXPOCT33', 'TEXPOCT33'), ('TEXPNOV33', 'TEXPNOV33'), ('TEXPDEC33', 'TEXPDEC33'), ('TEXPJAN34', 'TEXPJAN34'), ('TEXPFEB34', 'TEXPFEB34'), ('TEXPMAR34', 'TEXPMAR34'), ('TEXPAPR34', 'TEXPAPR34'), ('TEXPMAY34', 'TEXPMAY34'), ('TEXPJUN34', 'TEXPJUN34'), ('TEXPJUL34', 'TEXPJUL34'), ('TEXPAUG34', 'TEXPAUG34'), ('TEXPSEP34', 'TEXPSEP34'), ('TEXPOCT34', 'TEXPOCT34'), ('TEXPNOV34', 'TEXPNOV34'), ('TEXPDEC34', 'TEXPDEC34'), ('TEXPJAN35', 'TEXPJAN35'), ('TEXPFEB35', 'TEXPFEB35'), ('TEXPMAR35', 'TEXPMAR35'), ('TEXPAPR35', 'TEXPAPR35'), ('TEXPMAY35', 'TEXPMAY35'), ('TEXPJUN35', 'TEXPJUN35'), ('TEXPJUL35', 'TEXPJUL35'), ('TEXPAUG35', 'TEXPAUG35'), ('TEXPSEP35', 'TEXPSEP35'), ('TEXPOCT35', 'TEXPOCT35'), ('TEXPNOV35', 'TEXPNOV35'), ('TEXPDEC35', 'TEXPDEC35')], max_length=9, verbose_name='TRACKER EXP DATE')),
+                ('tracker_expire_date', models.DateField(verbose_name='TRACKER EXPIRE DATE')),
+                ('tracker_status', models.CharField(choices=[('ACTIVE', 'ACTIVE'), ('SUSPENDED', 'SUSPENDED')], default='ACTIVE', max_length=25, verbose_name='TRACKER STATUS')),
+                ('tracker_status_note', models.TextField(blank=True, null=True, verbose_name='TRACKER STATUS NOTE')),
+                ('sim_number', models.CharField(max_length=255, unique=True, verbose_name='SIM NUMBER')),
+                ('sim_active', models.DateField(verbose_name='SIM ACTIVATION DATE')),
+                ('sim_exp_date', models.CharField(choices=[('EXPJAN24', 'EXPJAN24'), ('EXPFEB24', 'EXPFEB24'), ('EXPMAR24', 'EXPMAR24'), ('EXPAPR24', 'EXPAPR24'), ('EXPMAY24', 'EXPMAY24'), ('EXPJUN24', 'EXPJUN24'), ('EXPJUL24', 'EXPJUL24'), ('EXPAUG24', 'EXPAUG24'), ('EXPSEP24', 'EXPSEP24'), ('EXPOCT24', 'EXPOCT24'), ('EXPNOV24', 'EXPNOV24'), ('EXPDEC24', 'EXPDEC24'), ('EXPJAN25', 'EXPJAN25'), ('EXPFEB25', 'EXPFEB25'), ('EXPMAR25', 'EXPMAR25'), ('EXPAPR25', 'EXPAPR25'), ('EXPMAY25', 'EXPMAY25'), ('EXPJUN25', 'EXPJUN25'), ('EXPJUL25', 'EXPJUL25'), ('EXPAUG25', 'EXPAUG25'), ('EXPSEP25', 'EXPSEP25'), ('EXPOCT25', 'EXPOCT25'), ('EXPNOV25', 'EXPNOV25'), ('EXPDEC25', 'EXPDEC25'), ('EXPJAN26', 'EXPJAN26'), ('EXPFEB26', 'EXPFEB26'), ('EXPMAR26', 'EXPMAR26'), ('EXPAPR26', 'EXPAPR26'), ('EXPMAY26', 'EXPMAY26'), ('EXPJUN26', 'EXPJUN26'), ('EXPJUL26', 'EXPJUL26'), ('EXPAUG26', 'EXPAUG26'), ('EXPSEP26', 'EXPSEP26'), ('EXPOCT26', 'EXPOCT26'), ('EXPNOV26', 'EXPNOV26'), ('EXPDEC26', 'EXPDEC26'), ('EXPJAN27', 'EXPJAN27'), ('EXPFEB27', 'EXPFEB27'), ('EXPMAR27', 'EXPMAR27'), ('EXPAPR27', 'EXPAPR27'), ('EXPMAY27', 'EXPMAY27'), ('EXPJUN27', 'EXPJUN27'), ('EXPJUL27', 'EXPJUL27'), ('EXPAUG27', 'EXPAUG27'), ('EXPSEP27', 'EXPSEP27'), ('EXPOCT27', 'EXPOCT27'), ('EXPNOV27', 'EXPNOV27'), ('EXPDEC27', 'EXPDEC27'), ('EXPJAN28', 'EXPJAN28'), ('EXPFEB28', 'EXPFEB28'), ('EXPMAR28', 'EXPMAR28'), ('EXPAPR28', 'EXPAPR28'), ('EXPMAY28', 'EXPMAY28'), ('EXPJUN28', 'EXPJUN28'), ('EXPJUL28', 'EXPJUL28'), ('EXPAUG28', 'EXPAUG28'), ('EXPSEP28', 'EXPSEP28'), ('EXPOCT28', 'EXPOCT28'), ('EXPNOV28', 'EXPNOV28'), ('EXPDEC28', 'EXPDEC28'), ('EXPJAN29', 'EXPJAN29'), ('EXPFEB29', 'EXPFEB29'), ('EXPMAR29', 'EXPMAR29'), ('EXPAPR29', 'EXPAPR29'), ('EXPMAY29', 'EXPMAY29'), ('EXPJUN29', 'EXPJUN29'), ('EXPJUL29', 'EXPJUL29'), ('EXPAUG29', 'EXPAUG29'), ('EXPSEP29', 'EXPSEP29'), ('EXPOCT29', 'EXPOCT29'), ('EXPNOV29', 'EXPNOV29'), ('EXPDEC29', 'EXPDEC29'), ('EXPJAN30', 'EXPJAN30'), ('EXPFEB30', 'EXPFEB30'), ('EXPMAR30', 'EXPMAR30'), ('EXPAPR30', 'EXPAPR30'), ('EXPMAY30', 'EXPMAY30'), ('EXPJUN30', 'EXPJUN30'), ('EXPJUL30', 'EXPJUL30'), ('EXPAUG30', 'EXPAUG30'), ('EXPSEP30', 'EXPSEP30'), ('EXPOCT30', 'EXPOCT30'), ('EXPNOV30', 'EXPNOV30'), ('EXPDEC30', 'EXPDEC30'), ('EXPJAN31', 'EXPJAN31'), ('EXPFEB31', 'EXPFEB31'), ('EXPMAR31', 'EXPMAR31'), ('EXPAPR31', 'EXPAPR31'), ('EXPMAY31', 'EXPMAY31'), ('EXPJUN31', 'EXPJUN31'), ('EXPJUL31', 'EXPJUL31'), ('EXPAUG31', 'EXPAUG31'), ('EXPSEP31', 'EXPSEP31'), ('EXPOCT31', 'EXPOCT31'), ('EXPNOV31', 'EXPNOV31'), ('EXPDEC31', 'EXPDEC31'), ('EXPJAN32', 'EXPJAN32'), ('EXPFEB32', 'EXPFEB32'), ('EXPMAR32', 'EXPMAR32'), ('EXPAPR32', 'EXPAPR32'), ('EXPMAY32', 'EXPMAY32'), ('EXPJUN32', 'EXPJUN32'), ('EXPJUL32', 'EXPJUL32'), ('EXPAUG32', 'EXPAUG32'), ('EXPSEP32', 'EXPSEP32'), ('EXPOCT32', 'EXPOCT32'), ('EXPNOV32', 'EXPNOV32'), ('EXPDEC32', 'EXPDEC32'), ('EXPJAN33', 'EXPJAN33'), ('EXPFEB33', 'EXPFEB33'), ('EXPMAR33', 'EXPMAR33'), ('EXPAPR33', 'EXPAPR33'), ('EXPMAY33', 'EXPMAY33'), ('EXPJUN33', 'EXPJUN33'), ('EXPJUL33', 'EXPJUL33'), ('EXPAUG33', 'EXPAUG33'), ('EXPSEP33', 'EXPSEP33'), ('EXPOCT33', 'EXPOCT33'), ('EXPNOV33', 'EXPNOV33'), ('EXPDEC33', 'EXPDEC33'), ('EXPJAN34', 'EXPJAN34'), ('EXPFEB34', 'EXPFEB34'), ('EXPMAR34', 'EXPMAR34'), ('EXPAPR34', 'EXPAPR34'), ('EXPMAY34', 'EXPMAY34'), ('EXPJUN34', 'EXPJUN34'), ('EXPJUL34', 'EXPJUL34'), ('EXPAUG34', 'EXPAUG34'), ('EXPSEP34', 'EXPSEP34'), ('EXPOCT34', 'EXPOCT34'), ('EXPNOV34', 'EXPNOV34'), ('EXPDEC34', 'EXPDEC34'), ('EXPJAN35', 'EXPJAN35'), ('EXPFEB35', 'EXPFEB35'), ('EXPMAR35', 'EXPMAR35'), ('EXPAPR35', 'EXPAPR35'), ('EXPMAY35', 'EXPMAY35'), ('EXPJUN35', 'EXPJUN35'), ('EXPJUL35', 'EXPJUL35'), ('EXPAUG35', 'EXPAUG35'), ('EXPSEP35', 'EXPSEP35'), ('EXPOCT35', 'EXPOCT35'), ('EXPNOV35', 'EXPNOV35'), ('EXPDEC35', 'EXPDEC35')], max_length=9, verbose_name='SIM EXP DATE')),
+                ('sim_expire', models.DateField(verbose_name='SIM EXPIRE DATE')),
+                ('status', models.CharField(choices=[('ACTIVE', 'ACTIVE'), ('SUSPENDED', 'SUSPENDED')], default='ACTIVE', max_length=25, verbose_name='SIM STATUS')),
+                ('sim_status_note', models.TextField(blank=True, null=True, verbose_name='SIM STATUS NOTE')),
+                ('sim_provider', models.CharField(choices=[('FLOLIVE_RSA', 'FLOLIVE – RSA NEIGHBOURS'), ('FLOLIVE_SSA', 'FLOLIVE – SUB-SAHARAN AFRICA'), ('FLICKSWITCH_VODACOM', 'FLICKSWITCH - VODACOM'), ('FLICKSWITCH_MTN', 'FLICKSWITCH – MTN'), ('FLICKSWITCH_OTHER', 'FLICKSWITCH - OTHER'), ('CLIENT_OWN', 'CLIENT - OWN SIM'), ('OTHER', 'OTHER')], max_length=50, verbose_name='SIM NETWORK')),
+                ('sim_code', models.CharField(choices=[('ESC', 'ESC – FLOLIVE EZITRACK SIMCONTROL'), ('EFSC', 'EFSC – FLICKSWITCH SIM CONTROL'), ('PRIV', 'PRIV – PRIVATE SIM'), ('OTHER', 'Other')], max_length=5, verbose_name='SIM CODE')),
+                ('tracker_model', models.CharField(max_length=255, verbose_name='TRACKER MODEL')),
+                ('sold_by', models.CharField(choices=[('TAKEALOT', 'TAKEALOT'), ('EZITRACK_DIRECT_SALE', 'EZITRACK DIRECT SALE'), ('AMAZON', 'AMAZON'), ('OTHER', 'OTHER'), ('EZITRACK_DEALER', 'EZITRACK DEALER')], max_length=25, verbose_name='SOLD BY')),
+                ('country', django_countries.fields.CountryField(max_length=2, verbose_name='COUNTRY IN USE')),
+                ('sage_invoice_reference', models.CharField(blank=True, max_length=50, verbose_name='SAGE INVOICE REFERENCE')),
+                ('sage_payment_reference', models.CharField(blank=True, max_length=50, verbose_name='SAGE PAYMENT REFERENCE')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='ADDITIONAL NOTES')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='CREATED AT')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='STARTED AT')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='FINISHED AT')),
+                ('status', models.CharField(choices=[('PENDING', 'PENDING'), ('RUNNING', 'RUNNING'), ('DONE', 'DONE'), ('FAILED', 'FAILED')], default='PENDING', max_length=25, verbose_name='STATUS')),
+                ('file_format', models.CharField(max_length=10, verbose_name='FORMAT')),
+                ('filters', models.TextField(blank=True, verbose_name='FILTERS')),
+                ('items', models.JSONField(blank=True, default=list, verbose_name='SELECTED ITEMS')),
+                ('fields', models.JSONField(blank=True, default=list, verbose_name='FIELDS')),
+                ('total_rows', models.PositiveIntegerField(default=0, verbose_name='TOTAL ROWS')),
+                ('processed_rows', models.PositiveIntegerField(default=0, verbose_name='PROCESSED ROWS')),
+                ('file', models.FileField(blank=True, upload_to='exports/', verbose_name='FILE')),
+                ('error', models.TextField(blank=True, verbose_name='ERROR')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('-created_at',),
+            },
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:11
+
+from django.db import migrations, models
+
+FTS_COLUMNS = ('email', 'sage_details', 'tracker_model', 'sage_invoice_reference', 'sage_payment_reference')
+
+SQLITE_COLUMNS = ', '.join(FTS_COLUMNS)
+SQLITE_NEW = ', '.join(f'new.{column}' for column in FTS_COLUMNS)
+SQLITE_OLD = ', '.join(f'old.{column}' for column in FTS_COLUMNS)
+
+SQLITE_FTS = [
+    f"CREATE VIRTUAL TABLE client_client_fts USING fts5("
+    f"{SQLITE_COLUMNS}, content='client_client', content_rowid='id')",
+    f"CREATE TRIGGER client_client_fts_ai AFTER INSERT ON client_client BEGIN "
+    f"INSERT INTO client_client_fts(rowid, {SQLITE_COLUMNS}) VALUES (new.id, {SQLITE_NEW}); END",
+    f"CREATE TRIGGER client_client_fts_ad AFTER DELETE ON client_client BEGIN "
+    f"INSERT INTO client_client_fts(client_client_fts, rowid, {SQLITE_COLUMNS}) "
+    f"VALUES ('delete', old.id, {SQLITE_OLD}); END",
+    f"CREATE TRIGGER client_client_fts_au AFTER UPDATE ON client_client BEGIN "
+    f"INSERT INTO client_client_fts(client_client_fts, rowid, {SQLITE_COLUMNS}) "
+    f"VALUES ('delete', old.id, {SQLITE_OLD}); "
+    f"INSERT INTO client_client_fts(rowid, {SQLITE_COLUMNS}) VALUES (new.id, {SQLITE_NEW}); END",
+    "INSERT INTO client_client_fts(client_client_fts) VALUES ('rebuild')",
+]
+
+SQLITE_FTS_DROP = [
+    "DROP TRIGGER IF EXISTS client_client_fts_ai",
+    "DROP TRIGGER IF EXISTS client_client_fts_ad",
+    "DROP TRIGGER IF EXISTS client_client_fts_au",
+    "DROP TABLE IF EXISTS client_client_fts",
+]
+
+
+def create_full_text_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        # Triggers keep the external-content FTS5 table in sync with every
+        # write, including QuerySet.update() and bulk operations
+        for statement in SQLITE_FTS:
+            schema_editor.execute(statement)
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for column in FTS_COLUMNS:
+            schema_editor.execute(
+                f'CREATE INDEX client_client_{column}_trgm '
+                f'ON client_client USING gin (UPPER({column}::text) gin_trgm_ops)'
+            )
+
+
+def drop_full_text_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        for statement in SQLITE_FTS_DROP:
+            schema_editor.execute(statement)
+    elif connection.vendor == 'postgresql':
+        for column in FTS_COLUMNS:
+            schema_editor.execute(f'DROP INDEX IF EXISTS client_client_{column}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0002_exportjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='client',
+            name='email',
+            field=models.EmailField(db_index=True, max_length=100, verbose_name='EZIMAP USER ACCOUNT'),
+        ),
+        migrations.AlterField(
+            model_name='client',
+            name='sage_details',
+            field=models.CharField(db_index=True, max_length=255, verbose_name='SAGE ACCOUNT'),
+        ),
+        migrations.RunPython(create_full_text_index, drop_full_text_index),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0003_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['status', 'sim_expire'], name='client_status_sim_expire_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['tracker_status', 'tracker_expire_date'], name='client_trk_status_expire_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['sim_expire'], name='client_sim_expire_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['tracker_expire_date'], name='client_tracker_expire_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['sim_exp_date'], name='client_sim_exp_code_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['expire_date'], name='client_tracker_exp_code_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['sim_provider', 'sim_expire'], name='client_provider_expire_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['sold_by', 'sim_expire'], name='client_sold_by_expire_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['tracker_model'], name='client_tracker_model_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['country'], name='client_country_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(condition=models.Q(('status', 'SUSPENDED')), fields=['-id'], name='client_suspended_idx'),
+        ),
+    ]
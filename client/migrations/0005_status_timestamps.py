@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0004_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='activated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='ACTIVATED AT'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='suspended_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='SUSPENDED AT'),
+        ),
+    ]
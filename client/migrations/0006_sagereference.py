@@ -0,0 +1,152 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+REFERENCE_COLUMNS = {
+    'INVOICE': 'sage_invoice_reference',
+    'PAYMENT': 'sage_payment_reference',
+}
+
+# The free text columns left in the full-text index once the references
+# move to their own table (see 0003_search_indexes)
+OLD_FTS_COLUMNS = ('email', 'sage_details', 'tracker_model', 'sage_invoice_reference', 'sage_payment_reference')
+NEW_FTS_COLUMNS = ('email', 'sage_details', 'tracker_model')
+
+BATCH_SIZE = 1000
+
+
+def sqlite_fts(columns):
+    names = ', '.join(columns)
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE client_client_fts USING fts5("
+        f"{names}, content='client_client', content_rowid='id')",
+        f"CREATE TRIGGER client_client_fts_ai AFTER INSERT ON client_client BEGIN "
+        f"INSERT INTO client_client_fts(rowid, {names}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER client_client_fts_ad AFTER DELETE ON client_client BEGIN "
+        f"INSERT INTO client_client_fts(client_client_fts, rowid, {names}) "
+        f"VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER client_client_fts_au AFTER UPDATE ON client_client BEGIN "
+        f"INSERT INTO client_client_fts(client_client_fts, rowid, {names}) "
+        f"VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO client_client_fts(rowid, {names}) VALUES (new.id, {new}); END",
+        "INSERT INTO client_client_fts(client_client_fts) VALUES ('rebuild')",
+    ]
+
+
+SQLITE_FTS_DROP = [
+    "DROP TRIGGER IF EXISTS client_client_fts_ai",
+    "DROP TRIGGER IF EXISTS client_client_fts_ad",
+    "DROP TRIGGER IF EXISTS client_client_fts_au",
+    "DROP TABLE IF EXISTS client_client_fts",
+]
+
+
+def drop_full_text_index(apps, schema_editor):
+    # The triggers reference the reference columns, which can't be dropped while they exist
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        for statement in SQLITE_FTS_DROP:
+            schema_editor.execute(statement)
+    elif connection.vendor == 'postgresql':
+        for column in REFERENCE_COLUMNS.values():
+            schema_editor.execute(f'DROP INDEX IF EXISTS client_client_{column}_trgm')
+
+
+def create_old_full_text_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        for statement in SQLITE_FTS_DROP + sqlite_fts(OLD_FTS_COLUMNS):
+            schema_editor.execute(statement)
+    elif connection.vendor == 'postgresql':
+        for column in REFERENCE_COLUMNS.values():
+            schema_editor.execute(
+                f'CREATE INDEX client_client_{column}_trgm '
+                f'ON client_client USING gin (UPPER({column}::text) gin_trgm_ops)'
+            )
+
+
+def create_new_full_text_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in SQLITE_FTS_DROP + sqlite_fts(NEW_FTS_COLUMNS):
+            schema_editor.execute(statement)
+
+
+def drop_new_full_text_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in SQLITE_FTS_DROP:
+            schema_editor.execute(statement)
+
+
+def split_references(apps, schema_editor):
+    Client = apps.get_model('client', 'Client')
+    SageReference = apps.get_model('client', 'SageReference')
+
+    rows = []
+    clients = Client.objects.values_list('pk', *REFERENCE_COLUMNS.values()).iterator(chunk_size=BATCH_SIZE)
+    for pk, *values in clients:
+        for kind, value in zip(REFERENCE_COLUMNS, values):
+            references = [reference.strip() for reference in (value or '').split(';') if reference.strip()]
+            rows.extend(
+                SageReference(client_id=pk, kind=kind, reference=reference, position=position)
+                for position, reference in enumerate(references, start=1)
+            )
+        if len(rows) >= BATCH_SIZE:
+            SageReference.objects.bulk_create(rows)
+            rows = []
+    SageReference.objects.bulk_create(rows)
+
+
+def join_references(apps, schema_editor):
+    Client = apps.get_model('client', 'Client')
+    SageReference = apps.get_model('client', 'SageReference')
+
+    joined = {}
+    references = SageReference.objects.order_by('client_id', 'kind', 'position')
+    for client_id, kind, reference in references.values_list('client_id', 'kind', 'reference').iterator():
+        joined.setdefault(client_id, {}).setdefault(REFERENCE_COLUMNS[kind], []).append(reference)
+
+    clients = []
+    for client_id, columns in joined.items():
+        client = Client(pk=client_id, sage_invoice_reference='', sage_payment_reference='')
+        for column, values in columns.items():
+            setattr(client, column, ';'.join(values))
+        clients.append(client)
+    Client.objects.bulk_update(clients, list(REFERENCE_COLUMNS.values()), batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0005_status_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SageReference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('INVOICE', 'INVOICE'), ('PAYMENT', 'PAYMENT')], max_length=10, verbose_name='KIND')),
+                ('reference', models.CharField(db_index=True, max_length=50, verbose_name='REFERENCE')),
+                ('position', models.PositiveSmallIntegerField(verbose_name='POSITION')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sage_references', to='client.client')),
+            ],
+            options={
+                'ordering': ('kind', 'position'),
+                'constraints': [models.UniqueConstraint(fields=('client', 'kind', 'position'), name='client_sage_reference_position_uniq')],
+            },
+        ),
+        migrations.RunPython(split_references, join_references),
+        migrations.RunPython(drop_full_text_index, create_old_full_text_index),
+        migrations.RemoveField(
+            model_name='client',
+            name='sage_invoice_reference',
+        ),
+        migrations.RemoveField(
+            model_name='client',
+            name='sage_payment_reference',
+        ),
+        migrations.RunPython(create_new_full_text_index, drop_new_full_text_index),
+    ]
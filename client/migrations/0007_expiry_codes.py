@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:31
+
+from django.db import migrations, models
+from django.db.models.functions import Cast, Concat, ExtractYear, Right
+
+MONTHS = ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC']
+
+
+def expiry_code_expression(prefix, date_field):
+    month = models.Case(
+        *[models.When(**{f'{date_field}__month': number}, then=models.Value(name))
+          for number, name in enumerate(MONTHS, start=1)],
+        output_field=models.CharField(),
+    )
+    year = Right(Cast(ExtractYear(date_field), models.CharField()), 2)
+    return Concat(models.Value(prefix), month, year, output_field=models.CharField())
+
+
+def sync_expiry_codes(apps, schema_editor):
+    # Codes that drifted from their dates are rewritten in one UPDATE
+    Client = apps.get_model('client', 'Client')
+    Client.objects.update(
+        expire_date=expiry_code_expression('TEXP', 'tracker_expire_date'),
+        sim_exp_date=expiry_code_expression('EXP', 'sim_expire'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0006_sagereference'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='client',
+            name='client_sim_exp_code_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='client',
+            name='client_tracker_exp_code_idx',
+        ),
+        migrations.AlterField(
+            model_name='client',
+            name='expire_date',
+            field=models.CharField(editable=False, max_length=9, verbose_name='TRACKER EXP DATE'),
+        ),
+        migrations.AlterField(
+            model_name='client',
+            name='sim_exp_date',
+            field=models.CharField(editable=False, max_length=9, verbose_name='SIM EXP DATE'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['sim_exp_date', 'sim_expire'], name='client_sim_exp_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['expire_date', 'tracker_expire_date'], name='client_tracker_exp_month_idx'),
+        ),
+        migrations.RunPython(sync_expiry_codes, migrations.RunPython.noop),
+    ]
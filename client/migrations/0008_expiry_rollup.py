@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:33
+
+import django_countries.fields
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+
+ROLLUP_KINDS = {
+    'SIM': ('sim_expire', 'status'),
+    'TRACKER': ('tracker_expire_date', 'tracker_status'),
+}
+ROLLUP_DIMENSIONS = ('sim_provider', 'sold_by', 'country')
+
+
+def build_rollups(apps, schema_editor):
+    Client = apps.get_model('client', 'Client')
+    ExpiryRollup = apps.get_model('client', 'ExpiryRollup')
+
+    for kind, (date_field, status_field) in ROLLUP_KINDS.items():
+        rows = (
+            Client.objects.order_by()
+            .values(status_field, *ROLLUP_DIMENSIONS, month=TruncMonth(date_field))
+            .annotate(count=Count('pk'))
+        )
+        ExpiryRollup.objects.bulk_create([
+            ExpiryRollup(
+                kind=kind,
+                month=row['month'],
+                status=row[status_field],
+                count=row['count'],
+                **{name: row[name] for name in ROLLUP_DIMENSIONS},
+            )
+            for row in rows
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0007_expiry_codes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpiryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('SIM', 'SIM'), ('TRACKER', 'TRACKER')], max_length=10, verbose_name='KIND')),
+                ('month', models.DateField(verbose_name='MONTH')),
+                ('status', models.CharField(choices=[('ACTIVE', 'ACTIVE'), ('SUSPENDED', 'SUSPENDED')], max_length=25, verbose_name='STATUS')),
+                ('sim_provider', models.CharField(choices=[('FLOLIVE_RSA', 'FLOLIVE – RSA NEIGHBOURS'), ('FLOLIVE_SSA', 'FLOLIVE – SUB-SAHARAN AFRICA'), ('FLICKSWITCH_VODACOM', 'FLICKSWITCH - VODACOM'), ('FLICKSWITCH_MTN', 'FLICKSWITCH – MTN'), ('FLICKSWITCH_OTHER', 'FLICKSWITCH - OTHER'), ('CLIENT_OWN', 'CLIENT - OWN SIM'), ('OTHER', 'OTHER')], max_length=50, verbose_name='SIM NETWORK')),
+                ('sold_by', models.CharField(choices=[('TAKEALOT', 'TAKEALOT'), ('EZITRACK_DIRECT_SALE', 'EZITRACK DIRECT SALE'), ('AMAZON', 'AMAZON'), ('OTHER', 'OTHER'), ('EZITRACK_DEALER', 'EZITRACK DEALER')], max_length=25, verbose_name='SOLD BY')),
+                ('country', django_countries.fields.CountryField(max_length=2, verbose_name='COUNTRY IN USE')),
+                ('count', models.IntegerField(default=0, verbose_name='COUNT')),
+            ],
+            options={
+                'verbose_name': 'expiry dashboard',
+                'verbose_name_plural': 'expiry dashboard',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'month', 'status', 'sim_provider', 'sold_by', 'country'), name='client_expiry_rollup_uniq')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
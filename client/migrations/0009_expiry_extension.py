@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0008_expiry_rollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpiryExtension',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('SIM', 'SIM'), ('TRACKER', 'TRACKER')], max_length=10, verbose_name='KIND')),
+                ('months', models.SmallIntegerField(verbose_name='MONTHS')),
+                ('client_count', models.PositiveIntegerField(verbose_name='CLIENTS')),
+                ('description', models.TextField(blank=True, verbose_name='DESCRIPTION')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='CREATED AT')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('-created_at',),
+            },
+        ),
+    ]
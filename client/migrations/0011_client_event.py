@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:02
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0009_expiry_extension'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(max_length=50, verbose_name='FIELD')),
+                ('old_value', models.TextField(blank=True, null=True, verbose_name='OLD VALUE')),
+                ('new_value', models.TextField(blank=True, null=True, verbose_name='NEW VALUE')),
+                ('at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='AT')),
+                ('client', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='events', to='client.client')),
+                ('user', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('-id',),
+                'indexes': [models.Index(fields=['client', 'at'], name='client_event_client_idx'), models.Index(fields=['field', 'at'], name='client_event_field_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:09
+
+from django.db import migrations, models
+
+
+def set_updated_at(apps, schema_editor):
+    # Existing clients count as unchanged since they were created
+    Client = apps.get_model('client', 'Client')
+    Client.objects.using(schema_editor.connection.alias).update(updated_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0011_client_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(set_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+from django.db import migrations
+
+# Columns of the full-text index, see 0006_sagereference
+FTS_COLUMNS = ('email', 'sage_details', 'tracker_model')
+
+
+def sqlite_triggers(update_columns=None):
+    """
+    The triggers keeping the full-text index in sync with client_client. The
+    update trigger fires on any UPDATE, or only on ``update_columns``.
+    """
+    names = ', '.join(FTS_COLUMNS)
+    new = ', '.join(f'new.{column}' for column in FTS_COLUMNS)
+    old = ', '.join(f'old.{column}' for column in FTS_COLUMNS)
+    event = f"UPDATE OF {', '.join(update_columns)}" if update_columns else "UPDATE"
+    return [
+        "DROP TRIGGER IF EXISTS client_client_fts_ai",
+        "DROP TRIGGER IF EXISTS client_client_fts_ad",
+        "DROP TRIGGER IF EXISTS client_client_fts_au",
+        f"CREATE TRIGGER client_client_fts_ai AFTER INSERT ON client_client BEGIN "
+        f"INSERT INTO client_client_fts(rowid, {names}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER client_client_fts_ad AFTER DELETE ON client_client BEGIN "
+        f"INSERT INTO client_client_fts(client_client_fts, rowid, {names}) "
+        f"VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER client_client_fts_au AFTER {event} ON client_client BEGIN "
+        f"INSERT INTO client_client_fts(client_client_fts, rowid, {names}) "
+        f"VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO client_client_fts(rowid, {names}) VALUES (new.id, {new}); END",
+        # Clients saved while the triggers were missing
+        "INSERT INTO client_client_fts(client_client_fts) VALUES ('rebuild')",
+    ]
+
+
+def create_triggers(apps, schema_editor):
+    # 0012 rebuilt client_client to add updated_at, which dropped its triggers.
+    # The index only needs updating when an indexed column changes, not on
+    # every status or expiry UPDATE.
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in sqlite_triggers(FTS_COLUMNS):
+            schema_editor.execute(statement)
+
+
+def widen_update_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in sqlite_triggers():
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0012_client_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_triggers, widen_update_trigger),
+    ]
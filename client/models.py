@@ -1,19 +1,30 @@
-from django.db import models
+import datetime
+
+from django.conf import settings
+from django.db import models, router, transaction
+from django.db.models.functions import Cast, Concat, ExtractMonth, ExtractYear, Right, Substr
+from django.dispatch import Signal
 from django.utils.translation import gettext as _
 from django.utils import timezone
 from django_countries.fields import CountryField
 
-SIM_EXPIRE_DATE = [
-    (f"EXP{month}{year}", f"EXP{month}{year}")
-    for year in range(24, 36)
-    for month in ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC']
-]
+from ezitrack.db import insert_from_select
+
+from .history import CREATE_HISTORY_FIELDS, HISTORY_FIELDS, current_user_id, event_value, queue_events
+
+MONTHS = ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC']
 
-TRACKER_EXPIRE_DATE = [
-    (f"TEXP{month}{year}", f"TEXP{month}{year}")
-    for year in range(24, 36)
-    for month in ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC']
-]
+# Expiry code columns, e.g. EXPJAN25, with their code prefix and the date they are derived from
+EXPIRY_CODE_FIELDS = {
+    'expire_date': ("TEXP", 'tracker_expire_date'),
+    'sim_exp_date': ("EXP", 'sim_expire'),
+}
+
+# Expiry code column of each kind of expiry
+EXPIRY_KIND_CODE_FIELDS = {
+    "SIM": 'sim_exp_date',
+    "TRACKER": 'expire_date',
+}
 
 SIM_PROVIDER = (
     ("FLOLIVE_RSA", "FLOLIVE – RSA NEIGHBOURS"),
@@ -45,20 +56,178 @@ SIM_CODE = (
     ("OTHER", "Other"),
 )
 
+SAGE_REFERENCE_KIND = (
+    ("INVOICE", "INVOICE"),
+    ("PAYMENT", "PAYMENT"),
+)
+
+
+# Sent after set-based updates that bypass save() and the model signals
+clients_bulk_updated = Signal()
+
+# Sent in the transaction of such an update just before it runs, with the
+# queryset and the values it is updated to, for receivers that need the old rows
+clients_bulk_updating = Signal()
+
+
+def expiry_code(prefix, date):
+    return f"{prefix}{MONTHS[date.month - 1]}{date:%y}"
+
+
+def parse_expiry_code(code):
+    """
+    Returns (code field, first day of the month) for an expiry code such as
+    EXPJAN25 or TEXPJAN25, or None if ``code`` isn't one.
+    """
+    code = code.upper()
+    for field_name, (prefix, _date_field) in EXPIRY_CODE_FIELDS.items():
+        rest = code[len(prefix):]
+        if code.startswith(prefix) and len(rest) == 5 and rest[:3] in MONTHS and rest[3:].isdigit():
+            return field_name, datetime.date(2000 + int(rest[3:]), MONTHS.index(rest[:3]) + 1, 1)
+    return None
+
+
+def next_month(date):
+    return (date.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+
+
+def expiry_code_expression(prefix, date):
+    """
+    Database expression computing the expiry code of ``date``, a field name
+    or a date expression, so codes can be kept in sync by a single UPDATE.
+    """
+    if isinstance(date, str):
+        date = models.F(date)
+    # The month's name cut out of JANFEBMAR..., one month extraction per row instead of a CASE of twelve
+    month = Substr(models.Value(''.join(MONTHS)), ExtractMonth(date) * 3 - 2, 3)
+    year = Right(Cast(ExtractYear(date), models.CharField()), 2)
+    return Concat(models.Value(prefix), month, year, output_field=models.CharField())
+
+
+class AddMonths(models.Func):
+    """
+    ``date`` plus ``months`` calendar months. Days past the end of the new
+    month are clamped to its last day, e.g. 31 Jan + 1 month is 28/29 Feb.
+    """
+    arity = 2
+    output_field = models.DateField()
+
+    def compile_arguments(self, compiler):
+        date_sql, date_params = compiler.compile(self.source_expressions[0])
+        months_sql, months_params = compiler.compile(self.source_expressions[1])
+        return date_sql, months_sql, (*date_params, *months_params)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        # PostgreSQL clamps to the end of the month itself
+        date_sql, months_sql, params = self.compile_arguments(compiler)
+        return f'CAST(({date_sql}) + make_interval(months => {months_sql}) AS date)', params
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # SQLite rolls over into the next month instead, so take the earlier of that and the last day of the month
+        date_sql, months_sql, params = self.compile_arguments(compiler)
+        shifted = f"date({date_sql}, printf('%%+d months', {months_sql}))"
+        month_end = f"date({date_sql}, 'start of month', printf('%%+d months', ({months_sql}) + 1), '-1 day')"
+        return f'MIN({shifted}, {month_end})', (*params, *params)
+
+
+class ClientQuerySet(models.QuerySet):
+    def sync_expiry_codes(self):
+        """
+        Recomputes the expiry codes from the dates with a single UPDATE.
+        Returns the number of clients updated.
+        """
+        values = {
+            field_name: expiry_code_expression(prefix, date_field)
+            for field_name, (prefix, date_field) in EXPIRY_CODE_FIELDS.items()
+        }
+        values['updated_at'] = timezone.now()
+        with transaction.atomic():
+            clients_bulk_updating.send(sender=self.model, queryset=self, values=values)
+            count = self.update(**values)
+        clients_bulk_updated.send(sender=self.model, fields=list(values), count=count)
+        return count
+
+    def expiry_rollup(self, code_field):
+        """
+        Returns (code, first expiry date, number of clients) per expiry month
+        in time order, as one GROUP BY over the (code, date) index.
+        """
+        date_field = EXPIRY_CODE_FIELDS[code_field][1]
+        return (
+            self.order_by()
+            .values_list(code_field)
+            .annotate(first_date=models.Min(date_field), count=models.Count('pk'))
+            .order_by('first_date')
+        )
+
+
+class ClientManager(models.Manager.from_queryset(ClientQuerySet)):
+    def bulk_set_status(self, queryset, status):
+        """
+        Sets the SIM status of every client in ``queryset`` with a single
+        UPDATE, stamping activated_at/suspended_at the same way save() does
+        and recording a ClientEvent per client changed. Returns the number of
+        clients whose status changed.
+        """
+        now = timezone.now()
+        values = {'status': status, 'updated_at': now}
+        if status == "ACTIVE":
+            values.update(activated_at=now, suspended_at=None)
+        elif status == "SUSPENDED":
+            values.update(suspended_at=now)
+
+        # Rows already in the target status keep their timestamps
+        queryset = queryset.exclude(status=status)
+        with transaction.atomic():
+            ClientEvent.objects.record_update(queryset, 'status', models.Value(status))
+            clients_bulk_updating.send(sender=self.model, queryset=queryset, values=values)
+            count = queryset.update(**values)
+        clients_bulk_updated.send(sender=self.model, fields=list(values), count=count)
+        return count
+
+    def bulk_extend_expiry(self, queryset, kind, months, user=None, description=''):
+        """
+        Moves the SIM or tracker expiry date (``kind``) of every client in
+        ``queryset`` on by ``months`` months, together with its expiry code,
+        with a single UPDATE. The batch is recorded as one ExpiryExtension,
+        and the new dates as ClientEvents.
+        Returns the number of clients updated.
+        """
+        code_field = EXPIRY_KIND_CODE_FIELDS[kind]
+        prefix, date_field = EXPIRY_CODE_FIELDS[code_field]
+        # The code is computed from the new date; the UPDATE's right-hand sides all see the old row
+        new_date = AddMonths(date_field, models.Value(months))
+        with transaction.atomic():
+            ClientEvent.objects.record_update(queryset, date_field, new_date, user=user)
+            values = {
+                date_field: new_date,
+                code_field: expiry_code_expression(prefix, new_date),
+                'updated_at': timezone.now(),
+            }
+            clients_bulk_updating.send(sender=self.model, queryset=queryset, values=values)
+            count = queryset.update(**values)
+            ExpiryExtension.objects.create(
+                kind=kind, months=months, client_count=count, created_by=user, description=description,
+            )
+        clients_bulk_updated.send(sender=self.model, fields=list(values), count=count)
+        return count
+
 
 class Client(models.Model):
     added = models.DateField(_('ADDED'))
-    email = models.EmailField(_('EZIMAP USER ACCOUNT'), max_length=100)
-    sage_details = models.CharField(_('SAGE ACCOUNT'), max_length=255)
+    email = models.EmailField(_('EZIMAP USER ACCOUNT'), max_length=100, db_index=True)
+    sage_details = models.CharField(_('SAGE ACCOUNT'), max_length=255, db_index=True)
     tracker_imei = models.CharField(_('TRACKER IMEI'), max_length=255, unique=True)
     tracker_activation_date = models.DateField(_('TRACKER ACTIVATION DATE'))
-    expire_date = models.CharField(_('TRACKER EXP DATE'), max_length=9, choices=TRACKER_EXPIRE_DATE)
+    # Derived from tracker_expire_date on save, see set_expiry_codes()
+    expire_date = models.CharField(_('TRACKER EXP DATE'), max_length=9, editable=False)
     tracker_expire_date = models.DateField(_('TRACKER EXPIRE DATE'))
     tracker_status = models.CharField(_('TRACKER STATUS'), max_length=25, choices=STATUS, default="ACTIVE")
     tracker_status_note = models.TextField(_('TRACKER STATUS NOTE'), null=True, blank=True)
     sim_number = models.CharField(_('SIM NUMBER'), max_length=255, unique=True)
     sim_active = models.DateField(_('SIM ACTIVATION DATE'))
-    sim_exp_date = models.CharField(_('SIM EXP DATE'), max_length=9, choices=SIM_EXPIRE_DATE)
+    # Derived from sim_expire on save, see set_expiry_codes()
+    sim_exp_date = models.CharField(_('SIM EXP DATE'), max_length=9, editable=False)
     sim_expire = models.DateField(_('SIM EXPIRE DATE'))
     status = models.CharField(_('SIM STATUS'), max_length=25, choices=STATUS, default="ACTIVE")
     sim_status_note = models.TextField(_('SIM STATUS NOTE'), null=True, blank=True)
@@ -67,26 +236,322 @@ class Client(models.Model):
     tracker_model = models.CharField(_('TRACKER MODEL'), max_length=255)
     sold_by = models.CharField(_('SOLD BY'), max_length=25, choices=SOLD_BY)
     country = CountryField(_('COUNTRY IN USE'))
-    sage_invoice_reference = models.CharField(_('SAGE INVOICE REFERENCE'), max_length=50, blank=True)
-    sage_payment_reference = models.CharField(_('SAGE PAYMENT REFERENCE'), max_length=50, blank=True)
     description = models.TextField(_('ADDITIONAL NOTES'), null=True, blank=True)
+    activated_at = models.DateTimeField(_('ACTIVATED AT'), null=True, blank=True, editable=False)
+    suspended_at = models.DateTimeField(_('SUSPENDED AT'), null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Also set by the bulk updates and the importer, for the API's Last-Modified
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ClientManager()
+
+    class Meta:
+        # Access paths used by the admin list filters and the renewal queries
+        indexes = [
+            models.Index(fields=['status', 'sim_expire'], name='client_status_sim_expire_idx'),
+            models.Index(fields=['tracker_status', 'tracker_expire_date'], name='client_trk_status_expire_idx'),
+            models.Index(fields=['sim_expire'], name='client_sim_expire_idx'),
+            models.Index(fields=['tracker_expire_date'], name='client_tracker_expire_idx'),
+            # Month buckets: the code plus its date, so rollups per expiry month read only the index
+            models.Index(fields=['sim_exp_date', 'sim_expire'], name='client_sim_exp_month_idx'),
+            models.Index(fields=['expire_date', 'tracker_expire_date'], name='client_tracker_exp_month_idx'),
+            models.Index(fields=['sim_provider', 'sim_expire'], name='client_provider_expire_idx'),
+            models.Index(fields=['sold_by', 'sim_expire'], name='client_sold_by_expire_idx'),
+            models.Index(fields=['tracker_model'], name='client_tracker_model_idx'),
+            models.Index(fields=['country'], name='client_country_idx'),
+            # Suspended SIMs are a small share of the fleet, so keep them in their own index
+            models.Index(
+                fields=['-id'], name='client_suspended_idx', condition=models.Q(status='SUSPENDED'),
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Keep the values as loaded so signal handlers can tell what changed
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def get_loaded_values(self):
+        """
+        Returns the column values as they were last loaded or saved, keyed by
+        attname. Fields deferred at load time are missing.
+        """
+        return getattr(self, '_loaded_values', {})
 
     def save(self, *args, **kwargs):
+        self.set_expiry_codes()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            # Saving an expiry date saves its code with it, and any save the update time
+            kwargs['update_fields'] = {*update_fields, 'updated_at', *(
+                field_name for field_name, (_prefix, date_field) in EXPIRY_CODE_FIELDS.items()
+                if date_field in update_fields
+            )}
+
         if self.pk:
-            old_instance = Client.objects.get(pk=self.pk)
-            if old_instance.status != self.status:
-                if self.status == "ACTIVE":
-                    self.activated_at = timezone.now()
-                    self.suspended_at = None
-                elif self.status == "SUSPENDED":
-                    self.suspended_at = timezone.now()
+            # Fetch whatever the client wasn't loaded with, so the signal
+            # receivers always see the whole row as it was before the save
+            loaded = self.get_loaded_values()
+            missing = [field.attname for field in self._meta.concrete_fields if field.attname not in loaded]
+            if missing:
+                stored = Client.objects.filter(pk=self.pk).values(*missing).first()
+                if stored is not None:
+                    self._loaded_values = loaded = {**loaded, **stored}
+            if loaded.get('status') != self.status:
+                self.set_status_timestamps()
+                update_fields = kwargs.get('update_fields')
+                if update_fields is not None and 'status' in update_fields:
+                    kwargs['update_fields'] = {*update_fields, 'activated_at', 'suspended_at'}
         else:
-            if self.status == "ACTIVE":
-                self.activated_at = timezone.now()
-            elif self.status == "SUSPENDED":
-                self.suspended_at = timezone.now()
+            self.set_status_timestamps()
         super().save(*args, **kwargs)
+        self._loaded_values = {
+            field.attname: field.get_prep_value(getattr(self, field.attname))
+            for field in self._meta.concrete_fields
+        }
+
+    def set_expiry_codes(self):
+        deferred = self.get_deferred_fields()
+        for field_name, (prefix, date_field) in EXPIRY_CODE_FIELDS.items():
+            date = None if date_field in deferred else getattr(self, date_field)
+            if date:
+                setattr(self, field_name, expiry_code(prefix, date))
+
+    def set_status_timestamps(self):
+        if self.status == "ACTIVE":
+            self.activated_at = timezone.now()
+            self.suspended_at = None
+        elif self.status == "SUSPENDED":
+            self.suspended_at = timezone.now()
+
+    def get_sage_references(self, kind):
+        # Goes through the prefetch cache when sage_references was prefetched
+        return [reference.reference for reference in self.sage_references.all() if reference.kind == kind]
+
+    def set_sage_references(self, kind, references):
+        SageReference.objects.replace({self.pk: {kind: references}})
+
+    def __str__(self):
+        return self.email
+
+
+class SageReferenceManager(models.Manager):
+    def replace(self, references):
+        """
+        Replaces references given as {client_id: {kind: [reference, ...]}},
+        with one DELETE per kind and one bulk INSERT for all the clients.
+        """
+        client_ids = {}
+        rows = []
+        for client_id, kinds in references.items():
+            for kind, values in kinds.items():
+                client_ids.setdefault(kind, []).append(client_id)
+                rows.extend(
+                    SageReference(client_id=client_id, kind=kind, reference=reference, position=position)
+                    for position, reference in enumerate(values, start=1)
+                )
+        for kind, ids in client_ids.items():
+            self.filter(kind=kind, client_id__in=ids).delete()
+        self.bulk_create(rows)
+
+    def joined_by_client(self, client_ids):
+        """
+        Returns {client_id: {kind: "REF1;REF2"}} for ``client_ids`` with one
+        query, in the semicolon-joined form used by the export.
+        """
+        joined = {}
+        rows = self.filter(client_id__in=client_ids).order_by('client_id', 'kind', 'position')
+        for client_id, kind, reference in rows.values_list('client_id', 'kind', 'reference'):
+            kinds = joined.setdefault(client_id, {})
+            kinds[kind] = f"{kinds[kind]};{reference}" if kind in kinds else reference
+        return joined
+
+
+class SageReference(models.Model):
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='sage_references')
+    kind = models.CharField(_('KIND'), max_length=10, choices=SAGE_REFERENCE_KIND)
+    reference = models.CharField(_('REFERENCE'), max_length=50, db_index=True)
+    position = models.PositiveSmallIntegerField(_('POSITION'))
+
+    objects = SageReferenceManager()
+
+    class Meta:
+        ordering = ('kind', 'position')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['client', 'kind', 'position'], name='client_sage_reference_position_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return self.reference
+
+
+EXPORT_JOB_STATUS = (
+    ("PENDING", "PENDING"),
+    ("RUNNING", "RUNNING"),
+    ("DONE", "DONE"),
+    ("FAILED", "FAILED"),
+)
+
+
+class ExportJob(models.Model):
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(_('CREATED AT'), auto_now_add=True)
+    started_at = models.DateTimeField(_('STARTED AT'), null=True, blank=True)
+    finished_at = models.DateTimeField(_('FINISHED AT'), null=True, blank=True)
+    status = models.CharField(_('STATUS'), max_length=25, choices=EXPORT_JOB_STATUS, default="PENDING")
+    file_format = models.CharField(_('FORMAT'), max_length=10)
+    # Changelist query string (search and list_filter parameters) the export was started from
+    filters = models.TextField(_('FILTERS'), blank=True)
+    # Primary keys selected through the admin action, empty when exporting the filtered changelist
+    items = models.JSONField(_('SELECTED ITEMS'), default=list, blank=True)
+    fields = models.JSONField(_('FIELDS'), default=list, blank=True)
+    total_rows = models.PositiveIntegerField(_('TOTAL ROWS'), default=0)
+    processed_rows = models.PositiveIntegerField(_('PROCESSED ROWS'), default=0)
+    file = models.FileField(_('FILE'), upload_to='exports/', blank=True)
+    error = models.TextField(_('ERROR'), blank=True)
+
+    class Meta:
+        ordering = ('-created_at',)
+
+    def __str__(self):
+        return f"Export #{self.pk} ({self.file_format})"
+
+
+EXPIRY_ROLLUP_KIND = (
+    ("SIM", "SIM"),
+    ("TRACKER", "TRACKER"),
+)
+
+
+class ExpiryRollup(models.Model):
+    """
+    Materialized count of clients per expiry month and provider, seller,
+    country and status. Kept up to date by the signal receivers and rebuilt
+    by the rebuild_expiry_rollups command, see rollups.py.
+    """
+    kind = models.CharField(_('KIND'), max_length=10, choices=EXPIRY_ROLLUP_KIND)
+    month = models.DateField(_('MONTH'))
+    status = models.CharField(_('STATUS'), max_length=25, choices=STATUS)
+    sim_provider = models.CharField(_('SIM NETWORK'), max_length=50, choices=SIM_PROVIDER)
+    sold_by = models.CharField(_('SOLD BY'), max_length=25, choices=SOLD_BY)
+    country = CountryField(_('COUNTRY IN USE'))
+    count = models.IntegerField(_('COUNT'), default=0)
+
+    class Meta:
+        verbose_name = _('expiry dashboard')
+        verbose_name_plural = _('expiry dashboard')
+        constraints = [
+            # Also the index the dashboard reads through, by kind and month range
+            models.UniqueConstraint(
+                fields=['kind', 'month', 'status', 'sim_provider', 'sold_by', 'country'],
+                name='client_expiry_rollup_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.month:%b %Y}: {self.count}"
+
+
+class ExpiryExtension(models.Model):
+    """
+    Audit record of one bulk expiry extension, see
+    ClientManager.bulk_extend_expiry.
+    """
+    kind = models.CharField(_('KIND'), max_length=10, choices=EXPIRY_ROLLUP_KIND)
+    months = models.SmallIntegerField(_('MONTHS'))
+    client_count = models.PositiveIntegerField(_('CLIENTS'))
+    # What was extended: the admin filters and selection, or the command line
+    description = models.TextField(_('DESCRIPTION'), blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(_('CREATED AT'), auto_now_add=True)
+
+    class Meta:
+        ordering = ('-created_at',)
+
+    def __str__(self):
+        return f"{self.kind} +{self.months} months for {self.client_count} clients"
+
+
+class ClientEventManager(models.Manager):
+
+    def changes(self, client, old_values, created=False):
+        """
+        Returns unsaved events for the HISTORY_FIELDS of ``client`` that differ
+        from ``old_values`` (keyed by attname). Fields missing from
+        ``old_values`` are skipped; a new client gets its first statuses.
+        """
+        events = []
+        for name in CREATE_HISTORY_FIELDS if created else HISTORY_FIELDS:
+            if not created and name not in old_values:
+                continue
+            field = Client._meta.get_field(name)
+            old_value = None if created else event_value(field, old_values[name])
+            new_value = event_value(field, getattr(client, name))
+            if created or old_value != new_value:
+                events.append(self.model(client_id=client.pk, field=name, old_value=old_value, new_value=new_value))
+        return events
+
+    def record(self, events):
+        """
+        Queues ``events`` to be written in one batch when the current
+        transaction commits, attributed to the acting user.
+        """
+        user_id = current_user_id()
+        for event in events:
+            if event.user_id is None:
+                event.user_id = user_id
+        queue_events(self, events, router.db_for_write(self.model))
+
+    def record_update(self, queryset, field_name, new_value, user=None):
+        """
+        Records ``field_name`` of every client in ``queryset`` changing to
+        ``new_value``, an expression that may refer to the client's current
+        values, with one INSERT ... SELECT. Call it before the UPDATE, in the
+        same transaction.
+        """
+        user_id = user.pk if user is not None else current_user_id()
+        rows = queryset.order_by().values(
+            event_client=models.F('pk'),
+            event_field=models.Value(field_name),
+            event_old_value=Cast(field_name, models.TextField()),
+            event_new_value=Cast(new_value, models.TextField()),
+            event_at=models.Value(timezone.now(), models.DateTimeField()),
+            event_user=models.Value(user_id, models.IntegerField()),
+        )
+        insert_from_select(
+            self.model, ('client', 'field', 'old_value', 'new_value', 'at', 'user'), rows,
+            using=router.db_for_write(self.model),
+        )
+
+
+class ClientEvent(models.Model):
+    """
+    Append-only change history of the HISTORY_FIELDS of a client, written by
+    save(), the bulk updates and the importer.
+    """
+    # Indexed by client_event_client_idx below
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='events', db_index=False)
+    field = models.CharField(_('FIELD'), max_length=50)
+    old_value = models.TextField(_('OLD VALUE'), null=True, blank=True)
+    new_value = models.TextField(_('NEW VALUE'), null=True, blank=True)
+    at = models.DateTimeField(_('AT'), default=timezone.now)
+    # Not indexed: users are hardly ever deleted, and every index slows down the inserts
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='+', db_index=False,
+    )
+
+    objects = ClientEventManager()
+
+    class Meta:
+        ordering = ('-id',)
+        indexes = [
+            models.Index(fields=['client', 'at'], name='client_event_client_idx'),
+            models.Index(fields=['field', 'at'], name='client_event_field_idx'),
+        ]
 
     def __str__(self):
-        return self.email
\ No newline at end of file
+        return f"{self.field}: {self.old_value} → {self.new_value}"
@@ -0,0 +1,228 @@
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.admin.views.main import ChangeList
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F, Q
+from django.db.models.expressions import OrderBy
+from django.utils.functional import cached_property
+
+# Query string parameter holding the position of the current page
+CURSOR_VAR = 'cursor'
+
+# Up to this many rows the changelist shows an exact count
+EXACT_COUNT_LIMIT = getattr(settings, 'CLIENT_EXACT_COUNT_LIMIT', 10000)
+
+# How long a count over the limit is reused when it can't be estimated
+COUNT_CACHE_TIMEOUT = getattr(settings, 'CLIENT_COUNT_CACHE_TIMEOUT', 5 * 60)
+
+
+def planner_estimate(queryset):
+    """
+    Returns the PostgreSQL planner's row estimate for ``queryset``, which
+    costs no more than planning the query.
+    """
+    connection = connections[queryset.db]
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def cached_count(queryset):
+    sql, params = queryset.order_by().query.sql_with_params()
+    key = 'client:count:' + hashlib.md5(f'{queryset.db}:{sql}:{params!r}'.encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def estimate_count(queryset, limit=EXACT_COUNT_LIMIT):
+    """
+    Returns (count, exact). Counts exactly up to ``limit`` rows; above that
+    the count is the planner's estimate on PostgreSQL and a count cached
+    for COUNT_CACHE_TIMEOUT elsewhere.
+    """
+    # COUNT over a LIMIT subquery reads at most limit + 1 rows
+    count = queryset.order_by()[:limit + 1].count()
+    if count <= limit:
+        return count, True
+    if connections[queryset.db].vendor == 'postgresql':
+        return max(planner_estimate(queryset), count), False
+    return cached_count(queryset), False
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator whose count is exact for small result sets and estimated for
+    large ones, so a changelist page doesn't COUNT(*) the whole fleet.
+    """
+
+    @cached_property
+    def count(self):
+        count, self.count_is_exact = estimate_count(self.object_list)
+        return count
+
+
+def encode_cursor(direction, values):
+    data = json.dumps([direction, [str(value) for value in values]])
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, fields):
+    """
+    Returns (direction, values) for a cursor made by encode_cursor, or
+    (None, None) if it is invalid or was made for other fields.
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, values = json.loads(data)
+        if direction not in ('next', 'previous') or len(values) != len(fields):
+            return None, None
+        return direction, [field.to_python(value) for field, value in zip(fields, values)]
+    except Exception:
+        return None, None
+
+
+def seek_q(keyset, values, forward, inclusive=False):
+    """
+    Returns a Q for the rows after ``values`` in the keyset order (before
+    them if not ``forward``), i.e. the row comparison (a, b) > (x, y)
+    written as a > x OR (a = x AND b > y).
+    """
+    q = Q()
+    equal = {}
+    last = len(keyset) - 1
+    for index, ((name, descending), value) in enumerate(zip(keyset, values)):
+        lookup = 'lt' if descending == forward else 'gt'
+        if inclusive and index == last:
+            lookup += 'e'
+        q |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    # Bound the leading column on its own as well, so the planner can seek its index
+    name, descending = keyset[0]
+    lookup = 'lte' if descending == forward else 'gte'
+    return Q(**{f'{name}__{lookup}': values[0]}) & q
+
+
+class KeysetChangeList(ChangeList):
+    """
+    ChangeList paged by position instead of OFFSET: the next and previous
+    links carry the ordering values of the last or first row shown, and a
+    page is read by seeking past them, so a deep page costs the same as the
+    first one. Falls back to numbered pages when the ordering can't be
+    sought, e.g. on a nullable or related field. The links are rendered by
+    admin/client/pagination.html, for every model of the app.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_VAR)
+        super().__init__(request, *args, **kwargs)
+        # Sorting and filtering start again from the first page
+        self.params.pop(CURSOR_VAR, None)
+        # Django 5 keeps the filter parameters separately
+        getattr(self, 'filter_params', {}).pop(CURSOR_VAR, None)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def project(self, request, queryset):
+        """
+        Loads the rows shown with only the columns the model admin lists in
+        get_list_columns(), if it defines it.
+        """
+        get_list_columns = getattr(self.model_admin, 'get_list_columns', None)
+        if get_list_columns is None:
+            return queryset
+        return queryset.only(*get_list_columns(request))
+
+    def get_keyset(self):
+        """
+        Returns the ordering as [(field, descending)] over non-null columns
+        of the model, or None if it isn't one.
+        """
+        keyset = []
+        for part in self.queryset.query.order_by:
+            if isinstance(part, str):
+                name, descending = part.lstrip('-'), part.startswith('-')
+            elif isinstance(part, OrderBy) and isinstance(part.expression, F):
+                name, descending = part.expression.name, part.descending
+            else:
+                return None
+            try:
+                field = self.lookup_opts.pk if name == 'pk' else self.lookup_opts.get_field(name)
+            except FieldDoesNotExist:
+                return None
+            if not field.concrete or field.null or field.is_relation:
+                return None
+            keyset.append((field, descending))
+        if not keyset or keyset[-1][0] != self.lookup_opts.pk:
+            return None
+        return keyset
+
+    def get_results(self, request):
+        keyset = self.get_keyset()
+        if keyset is None or self.show_all:
+            super().get_results(request)
+            self.result_list = self.project(request, self.result_list)
+            self.keyset = None
+            return
+
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        self.result_count = paginator.count
+        self.result_count_is_exact = getattr(paginator, 'count_is_exact', True)
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = self.result_count > self.list_per_page
+        self.paginator = paginator
+        self.keyset = keyset
+
+        fields = [field for field, _descending in keyset]
+        order = [(field.attname, descending) for field, descending in keyset]
+        direction, values = decode_cursor(self.cursor, fields) if self.cursor else (None, None)
+        forward = direction != 'previous'
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(seek_q(order, values, forward))
+        if not forward:
+            queryset = queryset.reverse()
+
+        # One more key than shown tells whether there is a page beyond this one
+        keys = list(queryset.values_list(*(name for name, _descending in order))[:self.list_per_page + 1])
+        more = len(keys) > self.list_per_page
+        keys = keys[:self.list_per_page]
+        if not forward:
+            keys.reverse()
+
+        if keys:
+            # The page is the range between its first and last key, read in the changelist's order
+            self.result_list = self.project(request, self.queryset.filter(
+                seek_q(order, keys[0], True, inclusive=True),
+                seek_q(order, keys[-1], False, inclusive=True),
+            ))
+        else:
+            self.result_list = self.queryset.none()
+
+        has_previous = values is not None if forward else more
+        has_next = more if forward else True
+        self.previous_url = None
+        self.next_url = None
+        self.first_url = self.get_query_string(remove=[CURSOR_VAR]) if has_previous else None
+        if keys and has_previous:
+            self.previous_url = self.get_query_string({CURSOR_VAR: encode_cursor('previous', keys[0])})
+        if keys and has_next:
+            self.next_url = self.get_query_string({CURSOR_VAR: encode_cursor('next', keys[-1])})
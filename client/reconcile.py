@@ -0,0 +1,200 @@
+import csv
+import heapq
+import tempfile
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+from itertools import groupby, islice
+
+from django.conf import settings
+from django.db import connections
+from django.db.models.functions import Collate
+
+from ezitrack.db import replica_alias
+
+from .export import write_csv
+from .importer import read_rows
+from .models import Client
+
+# Columns of each provider's monthly SIM activity file, and the SIM_PROVIDER
+# choices its SIMs are registered under. Headers match case-insensitively
+PROVIDER_FILES = getattr(settings, 'CLIENT_SIM_PROVIDER_FILES', {
+    'FLOLIVE': {
+        'providers': ('FLOLIVE_RSA', 'FLOLIVE_SSA'),
+        'sim_column': 'ICCID',
+        'state_column': 'Status',
+        'active_states': ('ACTIVE', 'ACTIVATED'),
+        'charge_column': 'Charges',
+    },
+    'FLICKSWITCH': {
+        'providers': ('FLICKSWITCH_VODACOM', 'FLICKSWITCH_MTN', 'FLICKSWITCH_OTHER'),
+        'sim_column': 'SIM Number',
+        'state_column': 'Status',
+        'active_states': ('ACTIVE',),
+        'charge_column': 'Amount',
+    },
+})
+
+# Provider rows sorted in memory at a time; longer files are sorted in runs
+# spooled to disk, so memory stays bounded whatever the file size
+SORT_RUN_SIZE = getattr(settings, 'CLIENT_RECONCILE_RUN_SIZE', 100000)
+
+# Number of clients fetched per round trip while merging
+CLIENT_CHUNK_SIZE = 5000
+
+RECONCILE_CATEGORY = (
+    ("UNKNOWN", "Unknown SIM"),
+    ("SUSPENDED_BUT_ACTIVE", "Suspended but active"),
+    ("EXPIRED_BUT_BILLING", "Expired but billing"),
+    ("MISSING", "Active but not in the file"),
+)
+
+DIFF_HEADERS = (
+    'category', 'sim_number', 'client_id', 'status', 'sim_expire', 'sim_provider',
+    'provider_state', 'provider_charge',
+)
+
+
+def normalize_sim(value):
+    if isinstance(value, float) and value.is_integer():
+        # A number cell in an XLSX file
+        value = int(value)
+    # Spreadsheets keep long numbers as text with a leading apostrophe
+    return str(value).strip().lstrip("'").replace(' ', '')
+
+
+def parse_charge(value):
+    try:
+        return Decimal(str(value).replace(',', '').strip() or 0)
+    except InvalidOperation:
+        return Decimal(0)
+
+
+def provider_rows(rows, file_format):
+    """
+    Returns the (SIM number, state, charge) rows of a provider file, given
+    its rows with the header first. Raises ValueError when a column is
+    missing, before any row is read.
+    """
+    spec = PROVIDER_FILES[file_format]
+    headers = [str(header).strip().lower() for header in next(rows, [])]
+    indexes = []
+    for key in ('sim_column', 'state_column', 'charge_column'):
+        try:
+            indexes.append(headers.index(spec[key].lower()))
+        except ValueError:
+            raise ValueError(f"The {file_format} file has no {spec[key]!r} column.")
+    sim, state, charge = indexes
+
+    def parse():
+        for row in rows:
+            if len(row) <= max(indexes) or not normalize_sim(row[sim]):
+                continue
+            yield normalize_sim(row[sim]), str(row[state]).strip().upper(), str(row[charge]).strip()
+
+    return parse()
+
+
+def sort_rows(rows, run_size=SORT_RUN_SIZE):
+    """
+    Yields ``rows`` (tuples of strings) in order. Runs of ``run_size`` rows
+    are sorted in memory and written to temporary files, which are then
+    merged, so only one run is ever held in memory.
+    """
+    runs = []
+    try:
+        while True:
+            run = sorted(islice(rows, run_size))
+            if not runs and len(run) < run_size:
+                # Fits in one run, nothing to spool
+                yield from run
+                return
+            if not run:
+                break
+            spool = tempfile.TemporaryFile('w+', encoding='utf-8', newline='')
+            csv.writer(spool).writerows(run)
+            spool.seek(0)
+            runs.append(spool)
+            del run
+        yield from heapq.merge(*(map(tuple, csv.reader(spool)) for spool in runs))
+    finally:
+        for spool in runs:
+            spool.close()
+
+
+def iter_clients(using):
+    """
+    Yields (sim_number, pk, status, sim_expire, sim_provider) of every
+    client, in the order Python compares the SIM numbers.
+    """
+    if connections[using].vendor == 'postgresql':
+        # The database's collation may order text differently
+        order = Collate('sim_number', 'C')
+    else:
+        order = 'sim_number'
+    return Client.objects.using(using).order_by(order).values_list(
+        'sim_number', 'pk', 'status', 'sim_expire', 'sim_provider',
+    ).iterator(chunk_size=CLIENT_CHUNK_SIZE)
+
+
+def reconcile(rows, file_format, as_of, using=None):
+    """
+    Merges the provider rows with the clients, both sorted by SIM number,
+    and yields the differences as rows under DIFF_HEADERS. The provider
+    rows come from provider_rows(); a SIM listed twice counts as active or
+    billed if any of its rows is.
+    """
+    providers = set(PROVIDER_FILES[file_format]['providers'])
+    active_states = {state.upper() for state in PROVIDER_FILES[file_format]['active_states']}
+    clients = iter_clients(using or replica_alias())
+    client = next(clients, None)
+
+    def missing(client):
+        sim_number, pk, status, sim_expire, sim_provider = client
+        if sim_provider in providers and status == "ACTIVE":
+            return ("MISSING", sim_number, pk, status, sim_expire, sim_provider, '', '')
+
+    for sim_number, group in groupby(sort_rows(rows), key=lambda row: row[0]):
+        group = list(group)
+        state = next((state for _, state, _ in group if state in active_states), group[0][1])
+        charge = sum((parse_charge(charge) for _, _, charge in group), Decimal(0))
+
+        while client is not None and client[0] < sim_number:
+            if diff := missing(client):
+                yield diff
+            client = next(clients, None)
+
+        if client is None or client[0] != sim_number:
+            yield ("UNKNOWN", sim_number, '', '', '', '', state, charge)
+            continue
+
+        _, pk, status, sim_expire, sim_provider = client
+        if state in active_states and status == "SUSPENDED":
+            yield ("SUSPENDED_BUT_ACTIVE", sim_number, pk, status, sim_expire, sim_provider, state, charge)
+        if charge > 0 and sim_expire < as_of:
+            yield ("EXPIRED_BUT_BILLING", sim_number, pk, status, sim_expire, sim_provider, state, charge)
+        client = next(clients, None)
+
+    while client is not None:
+        if diff := missing(client):
+            yield diff
+        client = next(clients, None)
+
+
+def count_categories(diff, counts):
+    """
+    Passes the diff rows through while counting them by category.
+    """
+    for row in diff:
+        counts[row[0]] += 1
+        yield row
+
+
+def reconcile_file(fileobj, extension, file_format, as_of, output):
+    """
+    Reconciles a provider file and writes the diff to the text file
+    ``output`` as CSV. Returns the number of rows in each category.
+    """
+    counts = Counter()
+    rows = provider_rows(read_rows(fileobj, extension), file_format)
+    write_csv(DIFF_HEADERS, count_categories(reconcile(rows, file_format, as_of), counts), output)
+    return counts
@@ -0,0 +1,79 @@
+from django.utils.translation import gettext as _
+from import_export.fields import Field
+from import_export.resources import ModelResource
+
+from .models import Client, SageReference
+
+
+class ClientResource(ModelResource):
+    # Sage references are exported in their semicolon-joined form
+    sage_invoice_reference = Field(column_name=_('SAGE INVOICE REFERENCE'), readonly=True)
+    sage_payment_reference = Field(column_name=_('SAGE PAYMENT REFERENCE'), readonly=True)
+
+    # Resource fields filled from the SageReference table, by kind
+    reference_fields = {
+        'sage_invoice_reference': "INVOICE",
+        'sage_payment_reference': "PAYMENT",
+    }
+
+    class Meta:
+        # Set the model to be used for the resource
+        model = Client
+
+        # Exclude following fields from export
+        exclude = (
+            'id',
+            # 'added', 'tracker_activation_date',
+            # 'tracker_status_note', 'sim_active', 'sim_status_note',
+            # 'sim_code', 'sage_invoice_reference', 'sage_payment_reference',
+            # 'description',
+            'created_at', 'updated_at',
+        )
+
+        # Set export field order
+        # export_order = (
+        #     'email', 'sage_details', 'tracker_imei', 'expire_date', 'tracker_expire_date',
+        #     'sim_number', 'sim_exp_date', 'sim_expire', 'sim_provider', 'tracker_status',
+        #     'tracker_model', 'sold_by', 'country', 'status'
+        # )
+
+    def get_export_headers(self, fields=None, selected_fields=None):
+        """
+        Returns a list of headers to be used in the export file.
+        Uses the verbose name of each field in the export fields.
+        """
+        headers = []
+        # If selected_fields is provided, use it; otherwise, use all export fields
+        if selected_fields:
+            fields = selected_fields
+        else:
+            fields = [self.get_field_name(field) for field in self.get_export_fields()]
+
+        for field in fields:
+            if field in self.reference_fields:
+                headers.append(self.fields[field].column_name)
+            else:
+                # Get the verbose name of the field from the model's meta data
+                headers.append(self.Meta.model._meta.get_field(field).verbose_name)
+        return headers
+
+    def filter_export(self, queryset, **kwargs):
+        # Fetch the references with one extra query per chunk of exported clients
+        return super().filter_export(queryset, **kwargs).prefetch_related('sage_references')
+
+    def dehydrate_sage_invoice_reference(self, client):
+        return ';'.join(client.get_sage_references("INVOICE"))
+
+    def dehydrate_sage_payment_reference(self, client):
+        return ';'.join(client.get_sage_references("PAYMENT"))
+
+    def get_related_values(self, client_ids):
+        """
+        Returns {client_id: {field name: value}} for the reference fields,
+        with one query for the whole chunk of clients.
+        """
+        joined = SageReference.objects.joined_by_client(client_ids)
+        return {
+            client_id: {name: kinds.get(kind, '') for name, kind in self.reference_fields.items()}
+            for client_id, kinds in joined.items()
+        }
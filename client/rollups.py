@@ -0,0 +1,269 @@
+import datetime
+from collections import Counter
+
+from django.db import IntegrityError, router, transaction
+from django.db.models import Count, DateField, F, Sum, Value
+from django.db.models.functions import TruncMonth
+
+from ezitrack.db import insert_from_select
+
+from .models import Client, ExpiryRollup, next_month
+
+# Expiry code, expiry date and status field of each kind of expiry
+ROLLUP_KINDS = {
+    "SIM": ('sim_exp_date', 'sim_expire', 'status'),
+    "TRACKER": ('expire_date', 'tracker_expire_date', 'tracker_status'),
+}
+
+# Breakdowns shown on the expiry dashboard
+ROLLUP_DIMENSIONS = ('sim_provider', 'sold_by', 'country')
+
+# Client fields the rollups are counted by
+ROLLUP_FIELDS = (
+    *(name for _code_field, *fields in ROLLUP_KINDS.values() for name in fields),
+    *ROLLUP_DIMENSIONS,
+)
+
+
+def rollup_fields(kind):
+    """
+    Returns the Client fields a rollup row of ``kind`` depends on.
+    """
+    _code_field, date_field, status_field = ROLLUP_KINDS[kind]
+    return (date_field, status_field, *ROLLUP_DIMENSIONS)
+
+
+def count_rollup(kind):
+    """
+    Counts the clients per rollup row of ``kind`` with a single GROUP BY,
+    selecting the ROLLUP_COLUMNS in order.
+    """
+    _code_field, date_field, status_field = ROLLUP_KINDS[kind]
+    return (
+        Client.objects.order_by()
+        .values(status_field, *ROLLUP_DIMENSIONS, kind=Value(kind), month=TruncMonth(date_field))
+        .annotate(count=Count('pk'))
+    )
+
+
+# Columns identifying an ExpiryRollup row, in the order of a rollup_key()
+ROLLUP_KEY = ('kind', 'month', 'status', *ROLLUP_DIMENSIONS)
+
+# Deltas over more rows than this are written in bulk, see apply_rollup_delta()
+ROLLUP_ROW_UPDATES = 10
+
+# ExpiryRollup columns, in the order count_rollup() selects them
+ROLLUP_COLUMNS = ('status', *ROLLUP_DIMENSIONS, 'kind', 'month', 'count')
+
+
+def rebuild_rollups(kinds=ROLLUP_KINDS):
+    """
+    Recounts the rollup rows of ``kinds`` with one INSERT ... SELECT each,
+    so the counts never pass through Python.
+    """
+    using = router.db_for_write(ExpiryRollup)
+    with transaction.atomic(using=using):
+        for kind in kinds:
+            ExpiryRollup.objects.using(using).filter(kind=kind).delete()
+            insert_from_select(ExpiryRollup, ROLLUP_COLUMNS, count_rollup(kind), using=using)
+
+
+def rollup_key(kind, values):
+    """
+    Returns the ExpiryRollup lookup a client with ``values`` (keyed by field
+    name) is counted in, or None if one of the fields is missing.
+    """
+    fields = rollup_fields(kind)
+    if any(name not in values for name in fields):
+        return None
+    key = {}
+    for name in fields:
+        field = Client._meta.get_field(name)
+        key[name] = field.get_prep_value(field.to_python(values[name]))
+    date_field, status_field = fields[:2]
+    return {
+        'kind': kind,
+        'month': key.pop(date_field).replace(day=1),
+        'status': key.pop(status_field),
+        **key,
+    }
+
+
+def add_to_rollup(key, delta):
+    updated = ExpiryRollup.objects.filter(**key).update(count=F('count') + delta)
+    if updated:
+        if delta < 0:
+            ExpiryRollup.objects.filter(**key, count__lte=0).delete()
+        return
+    if delta > 0:
+        try:
+            with transaction.atomic():
+                ExpiryRollup.objects.create(count=delta, **key)
+        except IntegrityError:
+            # Another request created the row in the meantime
+            ExpiryRollup.objects.filter(**key).update(count=F('count') + delta)
+
+
+def rollup_delta(changes):
+    """
+    Returns how many clients each rollup row gains or loses, keyed by the
+    row's lookup as a tuple of items, when clients move from the old to the
+    new values of ``changes``, (old values, new values) pairs keyed by field
+    name. Either is empty for a create or a delete.
+    """
+    delta = Counter()
+    for old_values, new_values in changes:
+        for kind in ROLLUP_KINDS:
+            old = rollup_key(kind, old_values) if old_values else None
+            new = rollup_key(kind, new_values) if new_values else None
+            if old == new:
+                continue
+            if old:
+                delta[tuple(old.items())] -= 1
+            if new:
+                delta[tuple(new.items())] += 1
+    return delta
+
+
+def count_update(kind, queryset, values):
+    """
+    Counts the clients of ``queryset`` per rollup row of ``kind`` with a
+    single GROUP BY, as they would be counted after ``queryset.update(**values)``.
+    """
+    date_field, status_field, *dimensions = rollup_fields(kind)
+
+    def column(name):
+        value = values.get(name, F(name))
+        return value if hasattr(value, 'resolve_expression') else Value(value)
+
+    # Aliased, as values() can't name an expression after a model field
+    return (
+        queryset.order_by()
+        .values(
+            rollup_month=TruncMonth(column(date_field), output_field=DateField()),
+            rollup_status=column(status_field),
+            **{f'rollup_{name}': column(name) for name in dimensions},
+        )
+        .annotate(rollup_count=Count('pk'))
+    )
+
+
+def update_delta(queryset, values):
+    """
+    Returns the rollup_delta() of ``queryset.update(**values)``, computed
+    before the UPDATE runs: one GROUP BY of the clients as they are and one
+    as they will be per kind the update touches, whatever the number of
+    clients.
+    """
+    delta = Counter()
+    for kind in ROLLUP_KINDS:
+        if not set(rollup_fields(kind)) & set(values):
+            continue
+        for sign, rows in ((-1, count_update(kind, queryset, {})), (1, count_update(kind, queryset, values))):
+            for row in rows:
+                key = {'kind': kind, **{
+                    name: row[f'rollup_{name}'] for name in ('month', 'status', *ROLLUP_DIMENSIONS)
+                }}
+                delta[tuple(key.items())] += sign * row['rollup_count']
+    return delta
+
+
+def apply_rollup_delta(delta):
+    """
+    Applies a rollup_delta() or update_delta(). Run it in the transaction of
+    the change it counts.
+    """
+    delta = {key: count for key, count in delta.items() if count}
+    if len(delta) <= ROLLUP_ROW_UPDATES:
+        for key, count in delta.items():
+            add_to_rollup(dict(key), count)
+        return
+
+    # Many rows, e.g. a bulk action over the fleet: read the rows of the months
+    # touched, locked until the commit, and write them back in bulk
+    keys = [dict(key) for key in delta]
+    rows = (
+        ExpiryRollup.objects.select_for_update().order_by()
+        .filter(
+            kind__in={key['kind'] for key in keys},
+            month__in={key['month'] for key in keys},
+            status__in={key['status'] for key in keys},
+        )
+        .values_list('pk', 'count', *ROLLUP_KEY)
+    )
+    existing = {tuple(zip(ROLLUP_KEY, key)): (pk, count) for pk, count, *key in rows}
+    updated, deleted, created = [], [], {}
+    for key, count in delta.items():
+        if key in existing:
+            pk, old_count = existing[key]
+            if old_count + count > 0:
+                updated.append(ExpiryRollup(pk=pk, count=old_count + count))
+            else:
+                deleted.append(pk)
+        elif count > 0:
+            created[key] = count
+    ExpiryRollup.objects.bulk_update(updated, ['count'], batch_size=500)
+    ExpiryRollup.objects.filter(pk__in=deleted).delete()
+    try:
+        with transaction.atomic():
+            ExpiryRollup.objects.bulk_create(
+                [ExpiryRollup(count=count, **dict(key)) for key, count in created.items()], batch_size=500,
+            )
+    except IntegrityError:
+        # Another request created one of the rows in the meantime
+        for key, count in created.items():
+            add_to_rollup(dict(key), count)
+
+
+def adjust_rollups(old_values, new_values):
+    """
+    Moves one client from the rollup rows of ``old_values`` to those of
+    ``new_values``; either is empty for a create or a delete.
+    """
+    apply_rollup_delta(rollup_delta([(old_values, new_values)]))
+
+
+def add_months(month, count):
+    """
+    Returns the first day of the month ``count`` months after ``month``.
+    """
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def month_range(start, months):
+    """
+    Returns the first day of ``months`` consecutive months from ``start``.
+    """
+    return [add_months(start, offset) for offset in range(months)]
+
+
+def dashboard_tables(kind, status, start, months=12):
+    """
+    Returns one table per dimension for the expiry dashboard: the column
+    values and, per month, the total and the count per column. Reads only
+    the rollup table, so the cost doesn't depend on the number of clients.
+    """
+    month_list = month_range(start, months)
+    rollups = ExpiryRollup.objects.filter(
+        kind=kind, month__gte=month_list[0], month__lt=next_month(month_list[-1]),
+    )
+    if status:
+        rollups = rollups.filter(status=status)
+
+    tables = []
+    for dimension in ROLLUP_DIMENSIONS:
+        counts = {}
+        for month, value, count in (
+            rollups.order_by().values_list('month', dimension).annotate(total=Sum('count'))
+        ):
+            counts[month, value] = count
+        values = sorted({value for _month, value in counts})
+        labels = dict(Client._meta.get_field(dimension).flatchoices)
+        columns = [(value, labels.get(value, value)) for value in values]
+        rows = []
+        for month in month_list:
+            cells = [counts.get((month, value), 0) for value in values]
+            rows.append((month, sum(cells), cells))
+        tables.append((dimension, columns, rows))
+    return tables
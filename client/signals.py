@@ -0,0 +1,87 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .facets import FACET_FIELDS, adjust_facets, changed_facets, invalidate_facets
+from .lookups import API_FIELDS, LOOKUP_FIELDS, invalidate_client, invalidate_lookups
+from .models import Client, ClientEvent, clients_bulk_updated, clients_bulk_updating
+from .rollups import ROLLUP_FIELDS, adjust_rollups, apply_rollup_delta, update_delta
+
+
+def current_values(instance, field_names):
+    return {field_name: getattr(instance, field_name) for field_name in field_names}
+
+
+@receiver(post_save, sender=Client)
+def update_facets_on_save(sender, instance, created, raw=False, **kwargs):
+    old_values = {} if created else instance.get_loaded_values()
+    new_values = current_values(instance, FACET_FIELDS)
+    # After the commit, so a rolled back save leaves the counts alone
+    if not (created or old_values):
+        # Saved without being loaded, e.g. by loaddata, so the previous values are unknown
+        transaction.on_commit(invalidate_facets)
+    elif changed_facets(old_values, new_values):
+        transaction.on_commit(lambda: adjust_facets(old_values, new_values))
+
+
+@receiver(post_delete, sender=Client)
+def update_facets_on_delete(sender, instance, **kwargs):
+    old_values = instance.get_loaded_values() or current_values(instance, FACET_FIELDS)
+    transaction.on_commit(lambda: adjust_facets(old_values, {}))
+
+
+@receiver(clients_bulk_updated, sender=Client)
+def update_facets_on_bulk_update(sender, fields, **kwargs):
+    field_names = [field_name for field_name in fields if field_name in FACET_FIELDS]
+    if field_names:
+        transaction.on_commit(lambda: invalidate_facets(field_names))
+
+
+@receiver(post_save, sender=Client)
+def update_rollups_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw and not created:
+        # Fixtures overwrite rows without loading them; run rebuild_expiry_rollups after loaddata
+        return
+    # save() fills in the values a client wasn't loaded with
+    adjust_rollups({} if created else instance.get_loaded_values(), current_values(instance, ROLLUP_FIELDS))
+
+
+@receiver(post_delete, sender=Client)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    adjust_rollups(instance.get_loaded_values() or current_values(instance, ROLLUP_FIELDS), {})
+
+
+@receiver(clients_bulk_updating, sender=Client)
+def update_rollups_on_bulk_update(sender, queryset, values, **kwargs):
+    apply_rollup_delta(update_delta(queryset, values))
+
+
+@receiver(post_save, sender=Client)
+def record_history_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    ClientEvent.objects.record(ClientEvent.objects.changes(instance, instance.get_loaded_values(), created))
+
+
+@receiver(post_save, sender=Client)
+def invalidate_lookups_on_save(sender, instance, created, raw=False, **kwargs):
+    # After the commit, so a lookup made in between can't cache the old row again
+    if created or instance.get_loaded_values():
+        old_values, new_values = instance.get_loaded_values(), current_values(instance, LOOKUP_FIELDS)
+        transaction.on_commit(lambda: invalidate_client(old_values, new_values))
+    else:
+        # Saved without being loaded first, so the previous identifiers are unknown
+        transaction.on_commit(invalidate_lookups)
+
+
+@receiver(post_delete, sender=Client)
+def invalidate_lookups_on_delete(sender, instance, **kwargs):
+    old_values, new_values = instance.get_loaded_values(), current_values(instance, LOOKUP_FIELDS)
+    transaction.on_commit(lambda: invalidate_client(old_values, new_values))
+
+
+@receiver(clients_bulk_updated, sender=Client)
+def invalidate_lookups_on_bulk_update(sender, fields, **kwargs):
+    if set(fields) & set(API_FIELDS):
+        transaction.on_commit(invalidate_lookups)
+
@@ -1,4 +0,0 @@
-$(document).ready(function() {
-    $("#result_list td.field-status:contains('SUSPENDED')").css("background-color", "red");
-    $("#result_list td.field-tracker_status:contains('SUSPENDED')").css("background-color", "red");
-  });
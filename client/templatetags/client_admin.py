@@ -0,0 +1,18 @@
+import datetime
+
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def with_row_classes(results, cl):
+    """
+    Pairs each rendered changelist row with the CSS classes the model admin
+    gives its object in ``row_classes()``, or '' if it doesn't define it.
+    """
+    row_classes = getattr(cl.model_admin, 'row_classes', None)
+    if row_classes is None:
+        return [(result, '') for result in results]
+    today = datetime.date.today()
+    return zip(results, (row_classes(obj, today) for obj in cl.result_list))
@@ -1,3 +1,682 @@
-from django.test import TestCase
+import csv
+import datetime
+import functools
+import io
+import re
+import subprocess
+import sys
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django import forms
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection, models, transaction
+from django.http import QueryDict, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ezitrack.storage import ManifestStaticFilesStorage
+
+from . import reconcile
+from .facets import FACET_FIELDS, count_facet, get_facet
+from .forms import ClientAdminForm
+from .importer import import_clients, read_rows
+from .jobs import claim_export_job, run_export_job
+from .lookups import LOOKUPS, get_clients, lookup_key, make_entry
+from .models import AddMonths, Client, ClientEvent, ExpiryRollup, ExportJob, SageReference
+from .pagination import seek_q
+from .resources import ClientResource
+from .rollups import rebuild_rollups
+from .search import search_clients
+from .widgets import CachedSelect
+
+
+# A cache with an atomic incr(), unlike the default file cache
+LOCMEM_CACHE = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+
+
+def make_client(number, **values):
+    """
+    Saves a client whose unique fields are derived from ``number``.
+    """
+    defaults = dict(
+        added=datetime.date(2024, 1, 1), email=f'user{number}@example.com', sage_details=f'SAGE{number}',
+        tracker_imei=f'35{number:013d}', tracker_activation_date=datetime.date(2024, 1, 1),
+        tracker_expire_date=datetime.date(2025, 1, 31), sim_number=f'8927{number:015d}',
+        sim_active=datetime.date(2024, 1, 1), sim_expire=datetime.date(2025, 1, 31),
+        sim_provider='FLOLIVE_RSA', sim_code='ESC', tracker_model='TK1', sold_by='TAKEALOT', country='ZA',
+    )
+    client = Client(**{**defaults, **values})
+    client.save()
+    return client
+
+
+def rollup_rows():
+    return sorted(ExpiryRollup.objects.values_list(
+        'kind', 'month', 'status', 'sim_provider', 'sold_by', 'country', 'count',
+    ))
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        for number in range(12):
+            make_client(
+                number,
+                sim_expire=datetime.date(2025, 1 + 2 * (number % 3), 28 + number % 4),
+                status="SUSPENDED" if number % 4 == 0 else "ACTIVE",
+                sold_by='TAKEALOT' if number % 2 else 'AMAZON',
+            )
+
+    def assertRollupsCounted(self):
+        adjusted = rollup_rows()
+        rebuild_rollups()
+        self.assertEqual(adjusted, rollup_rows())
+
+    def test_save_and_delete(self):
+        client = Client.objects.get(tracker_imei=f'35{1:013d}')
+        client.sim_expire = datetime.date(2026, 6, 1)
+        client.status = "SUSPENDED"
+        client.save()
+        Client.objects.filter(tracker_imei=f'35{2:013d}').delete()
+        self.assertRollupsCounted()
+
+    def test_save_without_loading(self):
+        stored = Client.objects.values().get(tracker_imei=f'35{3:013d}')
+        client = Client(**{**stored, 'tracker_status': "SUSPENDED", 'tracker_expire_date': datetime.date(2027, 2, 1)})
+        client.save()
+        client = Client.objects.only('pk', 'sim_expire').get(tracker_imei=f'35{4:013d}')
+        client.sim_expire = datetime.date(2024, 12, 31)
+        client.save()
+        self.assertRollupsCounted()
+
+    def test_bulk_set_status(self):
+        count = Client.objects.bulk_set_status(Client.objects.filter(sold_by='TAKEALOT'), "SUSPENDED")
+        self.assertEqual(count, 6)
+        self.assertRollupsCounted()
+
+    def test_bulk_extend_expiry(self):
+        Client.objects.bulk_extend_expiry(Client.objects.filter(status="ACTIVE"), "SIM", 1)
+        Client.objects.bulk_extend_expiry(Client.objects.all(), "TRACKER", 13)
+        self.assertRollupsCounted()
+
+    def test_rows_written_in_bulk(self):
+        # Rows created, updated and emptied, all through the bulk path
+        with mock.patch('client.rollups.ROLLUP_ROW_UPDATES', 0):
+            Client.objects.bulk_set_status(Client.objects.filter(sold_by='TAKEALOT'), "SUSPENDED")
+            Client.objects.bulk_extend_expiry(Client.objects.all(), "SIM", 2)
+            client = Client.objects.get(tracker_imei=f'35{5:013d}')
+            client.sold_by = 'OTHER'
+            client.save()
+        self.assertRollupsCounted()
+
+
+class BulkActionQueryTests(TestCase):
+    def bulk_action_queries(self, action, client_count):
+        Client.objects.all().delete()
+        for number in range(client_count):
+            make_client(number)
+        with CaptureQueriesContext(connection) as context:
+            action(Client.objects.all())
+        return [query['sql'] for query in context.captured_queries]
+
+    def assertQueriesIndependentOfClients(self, action):
+        few = self.bulk_action_queries(action, 3)
+        many = self.bulk_action_queries(action, 30)
+        self.assertEqual(len(few), len(many))
+        # The rollups are adjusted, not recounted from the whole table
+        self.assertFalse([sql for sql in many if 'INSERT INTO "client_expiryrollup"' in sql and 'SELECT' in sql])
+
+    def test_bulk_extend_expiry(self):
+        self.assertQueriesIndependentOfClients(
+            lambda queryset: Client.objects.bulk_extend_expiry(queryset, "TRACKER", 12)
+        )
+
+    def test_bulk_set_status(self):
+        self.assertQueriesIndependentOfClients(
+            lambda queryset: Client.objects.bulk_set_status(queryset, "SUSPENDED")
+        )
+
+
+@override_settings(CLIENT_API_KEYS=['test-key'])
+class ApiTests(TestCase):
+    def test_async_view_with_session(self):
+        # The admin session's lazy user must not be loaded inside the event loop
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(user)
+        client = make_client(1)
+        response = self.client.get(
+            reverse('client_api_imei', args=[client.tracker_imei]), HTTP_AUTHORIZATION='Bearer test-key',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['tracker_imei'], client.tracker_imei)
+        self.assertIn('Server-Timing', response)
+
+    def test_cached_session(self):
+        get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.post(reverse('admin:login'), {'username': 'admin', 'password': 'password'})
+        client = make_client(1)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:index'))
+        self.assertEqual(response.status_code, 200)
+        # The cached_db engine reads the session from the cache
+        self.assertFalse([query for query in queries if 'django_session' in query['sql']])
+        response = self.client.get(
+            reverse('client_api_imei', args=[client.tracker_imei]), HTTP_AUTHORIZATION='Bearer test-key',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['tracker_imei'], client.tracker_imei)
+
+    def test_no_timings_for_anonymous_users(self):
+        client = make_client(1)
+        response = self.client.get(
+            reverse('client_api_imei', args=[client.tracker_imei]), HTTP_AUTHORIZATION='Bearer test-key',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
+        response = self.client.get(reverse('admin:login'))
+        self.assertNotIn('Server-Timing', response)
+
+
+def export_csv(queryset):
+    return io.BytesIO(ClientResource().export(queryset).csv.encode())
+
+
+class ImportTests(TestCase):
+    def test_reimport_export_unchanged(self):
+        make_client(1, description="Fleet car", sim_status_note=None, tracker_status_note=None)
+        make_client(2, description=None, sim_status_note="")
+        SageReference.objects.replace({Client.objects.get(tracker_imei=f'35{1:013d}').pk: {"INVOICE": ['INV1', 'INV2']}})
+        rows = list(read_rows(export_csv(Client.objects.all()), 'csv'))
+
+        report = import_clients(ClientResource(), rows, dry_run=True)
+        self.assertEqual((report.created, report.updated, report.unchanged), (0, 0, 2), report.changes)
+        report = import_clients(ClientResource(), rows, dry_run=False)
+        self.assertEqual((report.created, report.updated, report.unchanged), (0, 0, 2), report.changes)
+        self.assertEqual(Client.objects.filter(tracker_status_note__isnull=True).count(), 2)
+
+    def row(self, number, **values):
+        data = {
+            'tracker_imei': f'35{number:013d}', 'sim_number': f'8927{number:015d}', 'email': f'user{number}@example.com',
+            'sage_details': f'SAGE{number}', 'added': '2024-01-01', 'tracker_activation_date': '2024-01-01',
+            'tracker_expire_date': '2025-01-31', 'sim_active': '2024-01-01', 'sim_expire': '2025-01-31',
+            'sim_provider': 'FLOLIVE_RSA', 'sim_code': 'ESC', 'tracker_model': 'TK1', 'sold_by': 'TAKEALOT',
+            'country': 'ZA', 'status': "ACTIVE", 'tracker_status': "ACTIVE",
+        }
+        data.update(values)
+        return data
+
+    def import_rows(self, rows, dry_run=False):
+        headers = list(rows[0])
+        table = [headers, *([row[name] for name in headers] for row in rows)]
+        return import_clients(ClientResource(), table, dry_run=dry_run, batch_size=2)
+
+    def test_batches(self):
+        make_client(1)
+        report = self.import_rows([self.row(number) for number in range(1, 6)] + [self.row(1, status="SUSPENDED")])
+        # The second row for client 1 is a duplicate, even though it is in another batch
+        self.assertEqual(report.errors, [
+            (7, f"35{1:013d} appears more than once in the file."),
+            (7, f"8927{1:015d} appears more than once in the file."),
+        ])
+        self.assertEqual(Client.objects.count(), 1)
+
+        report = self.import_rows([self.row(number) for number in range(2, 7)] + [self.row(1, status="SUSPENDED")])
+        self.assertFalse(report.has_errors, report.errors)
+        self.assertEqual((report.created, report.updated, report.unchanged), (5, 1, 0))
+        self.assertEqual(Client.objects.count(), 6)
+        self.assertEqual(Client.objects.get(tracker_imei=f'35{1:013d}').status, "SUSPENDED")
+        # Codes follow the imported dates
+        self.assertEqual(set(Client.objects.values_list('sim_exp_date', flat=True)), {'EXPJAN25'})
+
+    def test_dry_run(self):
+        report = self.import_rows([self.row(number) for number in range(1, 4)], dry_run=True)
+        self.assertEqual(report.created, 3)
+        self.assertFalse(Client.objects.exists())
+
+    def test_error_rolls_back_earlier_batches(self):
+        make_client(1)
+        report = self.import_rows([
+            self.row(1, status="SUSPENDED"), self.row(2), self.row(3),
+            # Another tracker's SIM, then an unknown country, both in later batches
+            self.row(4, sim_number=f'8927{1:015d}'), self.row(5, country='XX'),
+        ])
+        self.assertEqual([row_number for row_number, _message in report.errors], [5, 6])
+        self.assertEqual(list(Client.objects.values_list('tracker_imei', 'status')), [(f'35{1:013d}', "ACTIVE")])
+
+
+class FacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client_1 = make_client(1)
+        make_client(2)
+        self.assertEqual(get_facet('status'), {"ACTIVE": 2})
+
+    def test_rolled_back_save(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.client_1.status = "SUSPENDED"
+                self.client_1.save()
+                transaction.set_rollback(True)
+        self.assertEqual(get_facet('status'), {"ACTIVE": 2})
+
+    def test_saves(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client_1.status = "SUSPENDED"
+            self.client_1.save()
+            # Counted again once the change commits
+            self.assertEqual(get_facet('status'), {"ACTIVE": 2})
+        self.assertEqual(get_facet('status'), {"ACTIVE": 1, "SUSPENDED": 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            Client.objects.bulk_set_status(Client.objects.all(), "SUSPENDED")
+            make_client(3)
+            Client.objects.filter(pk=self.client_1.pk).delete()
+        for field_name in ('status', 'country'):
+            self.assertEqual(get_facet(field_name), count_facet(field_name))
+
+    @override_settings(CACHES={**settings.CACHES, 'default': LOCMEM_CACHE})
+    def test_adjusted(self):
+        client_3 = make_client(3, status="SUSPENDED", country='NA')
+        for field_name in FACET_FIELDS:
+            get_facet(field_name)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client_1.status = "SUSPENDED"
+            self.client_1.save()
+            make_client(4)
+            client_3.delete()
+        expected = {field_name: count_facet(field_name) for field_name in FACET_FIELDS}
+        # Adjusted in the cache, not counted again
+        with self.assertNumQueries(0):
+            self.assertEqual({field_name: get_facet(field_name) for field_name in FACET_FIELDS}, expected)
+        self.assertEqual(expected['status'], {"ACTIVE": 2, "SUSPENDED": 1})
+        self.assertEqual(expected['country'], {'ZA': 3})
+
+
+class SearchTests(TestCase):
+    def search(self, term):
+        return list(search_clients(Client.objects.all(), term))
+
+    def test_full_text_follows_changes(self):
+        client, other = make_client(1), make_client(2)
+        client.sage_details = 'SAGE1 Dumela Motors'
+        client.save()
+        # Matched in the middle of the column, through the full-text index only
+        self.assertEqual(self.search('dumela'), [client])
+        Client.objects.filter(pk=client.pk).update(status="SUSPENDED")
+        other.sage_details = 'SAGE2 Dumela Logistics'
+        other.save()
+        self.assertEqual(self.search('dumela motors'), [client])
+        self.assertEqual(self.search('logistics'), [other])
+        client.delete()
+        self.assertEqual(self.search('dumela'), [other])
+
+
+class ClientAdminTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(user)
+
+    def test_change_saves_references(self):
+        client = make_client(1)
+        SageReference.objects.replace({client.pk: {"INVOICE": ['INV1', 'INV2'], "PAYMENT": ['RCP1']}})
+        data = {
+            name: value for name, value in Client.objects.values().get(pk=client.pk).items()
+            if name not in ('id', 'expire_date', 'sim_exp_date', 'activated_at', 'suspended_at', 'created_at')
+            and value is not None
+        }
+        data.update(inv_ref_1='INV3', rcp_ref_1='RCP2', rcp_ref_2='RCP1', status="SUSPENDED")
+        response = self.client.post(reverse('admin:client_client_change', args=[client.pk]), data)
+        self.assertEqual(response.status_code, 302)
+        client.refresh_from_db()
+        self.assertEqual(client.status, "SUSPENDED")
+        self.assertEqual(client.get_sage_references("INVOICE"), ['INV3'])
+        self.assertEqual(client.get_sage_references("PAYMENT"), ['RCP2', 'RCP1'])
+
+    def test_changelist_loads_listed_columns(self):
+        make_client(1, country='NA', description="Fleet car")
+        make_client(2)
+        response = self.client.get(reverse('admin:client_client_changelist'))
+        for result in response.context['cl'].result_list:
+            self.assertLessEqual({'description', 'sim_status_note', 'tracker_status_note'}, result.get_deferred_fields())
+        # From the country name dict, with the country column loaded
+        self.assertContains(response, '<td class="field-country_name">Namibia</td>', html=True)
+        self.assertContains(response, '<td class="field-country_name">South Africa</td>', html=True)
+
+    def test_row_classes(self):
+        today = datetime.date.today()
+        next_year = today + datetime.timedelta(days=365)
+        make_client(
+            1, status="SUSPENDED", sim_expire=today + datetime.timedelta(days=10),
+            tracker_expire_date=today - datetime.timedelta(days=1),
+        )
+        make_client(2, sim_expire=next_year, tracker_expire_date=today)
+        make_client(3, sim_expire=next_year, tracker_expire_date=next_year)
+        response = self.client.get(reverse('admin:client_client_changelist'))
+        rows = dict(zip(
+            (client.tracker_imei for client in response.context['cl'].result_list),
+            re.findall(r'<tr role="row" class="(?:even|odd) ?([^"]*)">', response.content.decode()),
+        ))
+        self.assertEqual(rows, {
+            f'35{1:013d}': 'sim-suspended sim-expiring tracker-expired',
+            f'35{2:013d}': 'tracker-expiring',
+            f'35{3:013d}': '',
+        })
+
+    def export(self, file_format):
+        return self.client.post(reverse('admin:client_client_export'), {
+            'format': file_format,
+            **{f'clientresource_{name}': 'on' for name in ('tracker_imei', 'status', 'country')},
+        })
+
+    def test_csv_export_streams(self):
+        for number in range(3):
+            make_client(number)
+        response = self.export('0')
+        self.assertIsInstance(response, StreamingHttpResponse)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertFalse(ExportJob.objects.exists())
+
+    def test_export_loaded_lazily(self):
+        # A fresh interpreter, as this one has run exports already
+        script = (
+            "import sys, django; django.setup(); import ezitrack.urls; "
+            "print(*sorted(name for name in ('import_export.admin', 'openpyxl', 'yaml') if name in sys.modules))"
+        )
+        process = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        self.assertEqual(process.stdout.strip(), '')
+
+    def test_large_xlsx_export_queued(self):
+        for number in range(3):
+            make_client(number)
+        with mock.patch.object(type(admin.site._registry[Client]), 'xlsx_export_limit', 2):
+            response = self.export('1')
+        self.assertRedirects(response, reverse('admin:client_exportjob_changelist'))
+        job = ExportJob.objects.get()
+        self.assertEqual((job.file_format, job.status), ('xlsx', "PENDING"))
+        self.assertEqual(job.fields, ['tracker_imei', 'status', 'country'])
+
+
+class CachedSelectTests(TestCase):
+    def test_selected(self):
+        client = make_client(1, status="SUSPENDED", country='NA')
+        # Twice, the second time from the memoized options
+        for _ in range(2):
+            form = ClientAdminForm(instance=client)
+            self.assertInHTML('<option value="SUSPENDED" selected>SUSPENDED</option>', str(form['status']))
+            self.assertInHTML('<option value="NA" selected>Namibia</option>', str(form['country']))
+            self.assertInHTML('<option value="ACTIVE">ACTIVE</option>', str(form['status']))
+
+    def test_queryset_choices_refused(self):
+        with self.assertRaises(ImproperlyConfigured):
+            forms.ModelChoiceField(Client.objects.all(), widget=CachedSelect('client:test'))
+
+
+class ExportJobTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        overrides = override_settings(MEDIA_ROOT=media_root.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_run(self):
+        for number in range(3):
+            make_client(number, status="SUSPENDED" if number == 1 else "ACTIVE")
+        job = ExportJob.objects.create(
+            created_by=get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password'),
+            file_format='csv', filters='status__exact=ACTIVE', fields=['tracker_imei', 'status'],
+        )
+        self.assertTrue(claim_export_job(job.pk))
+        # Another runner polling the same table doesn't get it
+        self.assertFalse(claim_export_job(job.pk))
+        run_export_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.total_rows, job.processed_rows), ("DONE", 2, 2))
+        with job.file.open('rb') as f:
+            lines = f.read().decode().splitlines()
+        self.assertEqual(lines[1:], [f'35{0:013d},ACTIVE', f'35{2:013d},ACTIVE'])
+
+
+class LookupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_read_racing_a_change(self):
+        client = make_client(1)
+        # A lookup reads the client, then the client changes before the lookup caches it
+        key = lookup_key('tracker_imei', client.tracker_imei)
+        versions = LOOKUPS.versions([key])
+        stale = make_entry(Client.objects.get(pk=client.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            client.status = "SUSPENDED"
+            client.save()
+        LOOKUPS.add_many({key: stale}, versions)
+        entry = get_clients('tracker_imei', [client.tracker_imei])[client.tracker_imei]
+        self.assertEqual(entry['client']['status'], "SUSPENDED")
+
+    def test_modified_is_last_change(self):
+        client = make_client(1)
+        changed = datetime.datetime(2025, 3, 1, tzinfo=datetime.timezone.utc)
+        Client.objects.filter(pk=client.pk).update(updated_at=changed)
+        entry = get_clients('tracker_imei', [client.tracker_imei])[client.tracker_imei]
+        self.assertEqual(entry['modified'], changed.timestamp())
+        with self.captureOnCommitCallbacks(execute=True):
+            Client.objects.bulk_set_status(Client.objects.all(), "SUSPENDED")
+        entry = get_clients('tracker_imei', [client.tracker_imei])[client.tracker_imei]
+        client.refresh_from_db()
+        self.assertGreater(client.updated_at, changed)
+        self.assertEqual(entry['modified'], int(client.updated_at.timestamp()))
+
+    @override_settings(CACHES={'default': LOCMEM_CACHE, 'lookups': {**LOCMEM_CACHE, 'LOCATION': 'lookups'}})
+    def test_save_keeps_other_lookups(self):
+        with mock.patch.object(LOOKUPS, 'alias', 'lookups'):
+            self.assertTrue(LOOKUPS.local)
+            changed, other = make_client(1), make_client(2)
+            get_clients('tracker_imei', [changed.tracker_imei, other.tracker_imei])
+            with self.captureOnCommitCallbacks(execute=True):
+                changed.status = "SUSPENDED"
+                changed.save()
+            with self.assertNumQueries(0):
+                entry = get_clients('tracker_imei', [other.tracker_imei])[other.tracker_imei]
+            self.assertEqual(entry['client']['status'], "ACTIVE")
+            entry = get_clients('tracker_imei', [changed.tracker_imei])[changed.tracker_imei]
+            self.assertEqual(entry['client']['status'], "SUSPENDED")
+
+
+class KeysetPaginationTests(TestCase):
+    # Ascending seller, then latest SIM expiry first, with ties on both
+    order = [('sold_by', False), ('sim_expire', True), ('id', True)]
+
+    def setUp(self):
+        for number in range(11):
+            make_client(
+                number,
+                sold_by=('AMAZON', 'OTHER', 'TAKEALOT')[number % 3],
+                sim_expire=datetime.date(2025, 1 + number % 2, 15),
+            )
+        # The changelist's own order for ?o=<sold_by>.-<sim_expire>, see ChangeList.get_ordering()
+        self.ordered = list(Client.objects.order_by('sold_by', '-sim_expire', '-id'))
+        self.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def keys(self, client):
+        return [getattr(client, name) for name, _descending in self.order]
+
+    def test_seek_q(self):
+        for index, client in enumerate(self.ordered):
+            after = Client.objects.filter(seek_q(self.order, self.keys(client), True))
+            before = Client.objects.filter(seek_q(self.order, self.keys(client), False))
+            from_here = Client.objects.filter(seek_q(self.order, self.keys(client), True, inclusive=True))
+            self.assertEqual(set(after), set(self.ordered[index + 1:]))
+            self.assertEqual(set(before), set(self.ordered[:index]))
+            self.assertEqual(set(from_here), set(self.ordered[index:]))
+
+    def changelist(self, query_string):
+        request = RequestFactory().get('/admin/client/client/', QueryDict(query_string.lstrip('?')))
+        request.user = self.user
+        model_admin = admin.site._registry[Client]
+        with mock.patch.object(model_admin, 'list_per_page', 4):
+            return model_admin.get_changelist_instance(request)
+
+    def test_pages(self):
+        list_display = ['action_checkbox', *admin.site._registry[Client].list_display]
+        ordering = f'{list_display.index("sold_by")}.-{list_display.index("sim_expire")}'
+        changelist = self.changelist(f'o={ordering}')
+        # Paged by position, not by page number
+        self.assertIsNotNone(changelist.keyset)
+        self.assertIsNone(changelist.previous_url)
+        pages = [list(changelist.result_list)]
+        while changelist.next_url:
+            changelist = self.changelist(changelist.next_url)
+            pages.append(list(changelist.result_list))
+        self.assertEqual([len(page) for page in pages], [4, 4, 3])
+        self.assertEqual([client for page in pages for client in page], self.ordered)
+
+        # And back from the last page
+        for page in reversed(pages[:-1]):
+            changelist = self.changelist(changelist.previous_url)
+            self.assertEqual(list(changelist.result_list), page)
+        self.assertIsNone(changelist.previous_url)
+        self.assertIsNotNone(changelist.next_url)
+
+
+class ExpiryCodeTests(TestCase):
+    def test_sync(self):
+        for number in range(3):
+            make_client(number)
+        Client.objects.filter(tracker_imei=f'35{1:013d}').update(sim_exp_date='BROKEN', expire_date='BROKEN')
+        out = io.StringIO()
+        call_command('sync_expiry_codes', stdout=out)
+        self.assertIn("Synced the expiry codes of 1 clients", out.getvalue())
+        self.assertEqual(
+            set(Client.objects.values_list('sim_exp_date', 'expire_date')), {('EXPJAN25', 'TEXPJAN25')},
+        )
+
+
+class ReconcileTests(TestCase):
+    def test_runs_merged(self):
+        # 0 is billed after expiring, 1 is suspended but active, 2 is active but
+        # left out of the file, 3 is suspended and left out, 99 is unknown
+        make_client(0, sim_expire=datetime.date(2024, 6, 30))
+        make_client(1, status="SUSPENDED")
+        make_client(2)
+        make_client(3, status="SUSPENDED")
+        sim = [f'8927{number:015d}' for number in range(100)]
+        rows = [
+            ['ICCID', 'Status', 'Charges'],
+            [sim[99], 'ACTIVE', '5.00'],
+            [sim[1], 'SUSPENDED', '0'],
+            [sim[0], 'ACTIVE', '10.00'],
+            [sim[1], 'ACTIVE', '0'],
+            [sim[0], 'ACTIVE', '2.50'],
+        ]
+        fileobj = io.StringIO()
+        csv.writer(fileobj).writerows(rows)
+        output = io.StringIO()
+        # Runs of two rows, so SIMs listed twice are split across spooled runs
+        with mock.patch.object(reconcile, 'sort_rows', functools.partial(reconcile.sort_rows, run_size=2)), \
+                mock.patch.object(reconcile.tempfile, 'TemporaryFile', wraps=tempfile.TemporaryFile) as spool:
+            counts = reconcile.reconcile_file(
+                io.BytesIO(fileobj.getvalue().encode()), 'csv', 'FLOLIVE', datetime.date(2025, 1, 1), output,
+            )
+        self.assertEqual(spool.call_count, 3)
+        diff = list(csv.reader(io.StringIO(output.getvalue())))
+        self.assertEqual(tuple(diff[0]), reconcile.DIFF_HEADERS)
+        self.assertEqual([(row[0], row[1], row[6], row[7]) for row in diff[1:]], [
+            ("EXPIRED_BUT_BILLING", sim[0], 'ACTIVE', '12.50'),
+            ("SUSPENDED_BUT_ACTIVE", sim[1], 'ACTIVE', '0'),
+            ("MISSING", sim[2], '', ''),
+            ("UNKNOWN", sim[99], 'ACTIVE', '5.00'),
+        ])
+        self.assertEqual(counts, {"EXPIRED_BUT_BILLING": 1, "SUSPENDED_BUT_ACTIVE": 1, "MISSING": 1, "UNKNOWN": 1})
+
+
+class AddMonthsTests(TestCase):
+    def test_month_end_clamping(self):
+        cases = [
+            (datetime.date(2025, 1, 31), 1, datetime.date(2025, 2, 28)),
+            (datetime.date(2024, 1, 31), 1, datetime.date(2024, 2, 29)),
+            (datetime.date(2025, 8, 31), 1, datetime.date(2025, 9, 30)),
+            (datetime.date(2025, 3, 31), -1, datetime.date(2025, 2, 28)),
+            (datetime.date(2024, 2, 29), 12, datetime.date(2025, 2, 28)),
+            (datetime.date(2025, 12, 15), 1, datetime.date(2026, 1, 15)),
+            (datetime.date(2025, 1, 30), 25, datetime.date(2027, 2, 28)),
+            (datetime.date(2025, 4, 30), 0, datetime.date(2025, 4, 30)),
+        ]
+        client = make_client(1)
+        for date, months, expected in cases:
+            with self.subTest(date=date, months=months):
+                Client.objects.filter(pk=client.pk).update(sim_expire=date)
+                shifted = Client.objects.annotate(
+                    shifted=AddMonths('sim_expire', models.Value(months)),
+                ).get(pk=client.pk).shifted
+                self.assertEqual(shifted, expected)
+
+    def test_bulk_extend_expiry(self):
+        make_client(1, tracker_expire_date=datetime.date(2025, 1, 31))
+        make_client(2, tracker_expire_date=datetime.date(2025, 3, 15))
+        Client.objects.bulk_extend_expiry(Client.objects.all(), "TRACKER", 1)
+        self.assertEqual(
+            list(Client.objects.order_by('pk').values_list('tracker_expire_date', 'expire_date')),
+            [(datetime.date(2025, 2, 28), 'TEXPFEB25'), (datetime.date(2025, 4, 15), 'TEXPAPR25')],
+        )
+
+
+@override_settings(STORAGES={
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'ezitrack.storage.ManifestStaticFilesStorage'},
+})
+class StaticFilesTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(user)
+        static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(static_root.cleanup)
+        overrides = override_settings(STATIC_ROOT=static_root.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_without_manifest(self):
+        response = self.client.get(reverse('admin:client_client_changelist'))
+        self.assertContains(response, '"/static/jazzmin/css/main.css"')
+
+    def test_after_collectstatic(self):
+        # Compressing every vendor file takes a minute, only the names matter here
+        with mock.patch.object(ManifestStaticFilesStorage, 'compress_files', return_value=iter(())):
+            call_command('collectstatic', interactive=False, verbosity=0)
+        response = self.client.get(reverse('admin:client_client_changelist'))
+        url = staticfiles_storage.url('jazzmin/css/main.css')
+        self.assertRegex(url, r'^/static/jazzmin/css/main\.[0-9a-f]{12}\.css$')
+        self.assertContains(response, url)
+
+
+class ClientEventAdminTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(user)
+        # Two events each, the first status and tracker status
+        with self.captureOnCommitCallbacks(execute=True):
+            for number in range(60):
+                make_client(number)
+
+    def test_pages(self):
+        url = reverse('admin:client_clientevent_changelist')
+        response = self.client.get(url)
+        changelist = response.context['cl']
+        self.assertContains(response, 'cursor=')
+        self.assertNotContains(response, '?p=1')
+        first_page = [event.pk for event in changelist.result_list]
+
+        response = self.client.get(url + changelist.next_url)
+        second_page = [event.pk for event in response.context['cl'].result_list]
+        self.assertEqual(len(first_page) + len(second_page), ClientEvent.objects.count())
+        self.assertFalse(set(first_page) & set(second_page))
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path('clients/', views.client_list, name='client_api_list'),
+    path('clients/lookup/', views.client_lookup, name='client_api_lookup'),
+    path('clients/imei/<str:value>/', views.client_detail, {'field_name': 'tracker_imei'}, name='client_api_imei'),
+    path('clients/sim/<str:value>/', views.client_detail, {'field_name': 'sim_number'}, name='client_api_sim'),
+]
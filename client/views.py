@@ -1,3 +1,182 @@
-from django.shortcuts import render
+import functools
+import hashlib
+import hmac
+import json
 
-# Create your views here.
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods
+
+from .lookups import LOOKUP_FIELDS, aget_clients, get_clients
+from .models import Client
+from .pagination import decode_cursor, encode_cursor
+
+# Most identifiers one batch lookup may ask for
+LOOKUP_LIMIT = getattr(settings, 'CLIENT_API_LOOKUP_LIMIT', 1000)
+
+# Default and largest number of clients on a list page
+LIST_PAGE_SIZE = getattr(settings, 'CLIENT_API_PAGE_SIZE', 100)
+LIST_MAX_PAGE_SIZE = getattr(settings, 'CLIENT_API_MAX_PAGE_SIZE', 1000)
+
+# Client fields the list can be filtered on, all indexed
+LIST_FILTERS = (
+    'status', 'tracker_status', 'sim_provider', 'sold_by', 'country', 'tracker_model',
+    'sim_exp_date', 'expire_date',
+)
+
+
+def error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def has_api_key(request):
+    scheme, _, key = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not key:
+        return False
+    return any(hmac.compare_digest(key.encode(), api_key.encode()) for api_key in settings.CLIENT_API_KEYS)
+
+
+def unauthorized():
+    response = error("A valid API key is required.", status=401)
+    response['WWW-Authenticate'] = 'Bearer'
+    return response
+
+
+def api_view(view):
+    """
+    Requires one of settings.CLIENT_API_KEYS as a bearer token. The API
+    doesn't take the admin session: CORS allows every origin with
+    credentials, so any site could read it with a logged-in user's cookie.
+    Works for sync and async views.
+    """
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if not has_api_key(request):
+                return unauthorized()
+            return await view(request, *args, **kwargs)
+    else:
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not has_api_key(request):
+                return unauthorized()
+            return view(request, *args, **kwargs)
+    return csrf_exempt(wrapper)
+
+
+def cached_response(request, data, entries, extra=''):
+    """
+    Returns ``data`` as JSON with an ETag and Last-Modified made from the
+    cache ``entries`` it was built from (and ``extra``, anything else in
+    ``data``), or 304 if the client already has it.
+    """
+    tags = [entry['etag'] for entry in entries] + [extra]
+    etag = quote_etag(hashlib.md5(':'.join(tags).encode()).hexdigest())
+    last_modified = max((entry['modified'] for entry in entries), default=None)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = JsonResponse(data)
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Clients may keep responses but must revalidate them
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+# The lookups are async: gateways poll them at high rates, and under ASGI a
+# cache or database wait doesn't hold a worker thread
+
+@api_view
+@require_GET
+async def client_detail(request, field_name, value):
+    """
+    One client by tracker IMEI or SIM number.
+    """
+    entry = (await aget_clients(field_name, [value]))[value]
+    if entry['client'] is None:
+        return error("No such client.", status=404)
+    return cached_response(request, entry['client'], [entry])
+
+
+@api_view
+@require_http_methods(['GET', 'POST'])
+async def client_lookup(request):
+    """
+    Up to LOOKUP_LIMIT clients by tracker IMEI or SIM number, given as
+    ?tracker_imei=...&tracker_imei=... or as a JSON body such as
+    {"sim_number": [...]}. Unknown identifiers map to null.
+    """
+    if request.method == 'POST':
+        try:
+            body = json.loads(request.body)
+        except ValueError:
+            return error("The body isn't valid JSON.")
+        if not isinstance(body, dict):
+            return error("The body must be a JSON object.")
+        given = {name: body[name] for name in LOOKUP_FIELDS if name in body}
+    else:
+        given = {name: request.GET.getlist(name) for name in LOOKUP_FIELDS if name in request.GET}
+    if len(given) != 1:
+        return error(f"Give exactly one of {', '.join(LOOKUP_FIELDS)}.")
+
+    (field_name, values), = given.items()
+    if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+        return error(f"{field_name} must be a list of strings.")
+    values = list(dict.fromkeys(values))
+    if len(values) > LOOKUP_LIMIT:
+        return error(f"At most {LOOKUP_LIMIT} identifiers can be looked up at once.")
+
+    entries = await aget_clients(field_name, values)
+    return cached_response(
+        request,
+        {'field': field_name, 'clients': {value: entries[value]['client'] for value in values}},
+        [entries[value] for value in values],
+    )
+
+
+@api_view
+@require_GET
+def client_list(request):
+    """
+    Clients matching the LIST_FILTERS given, in id order, paged with
+    the ``next`` cursor of the previous page.
+    """
+    try:
+        limit = int(request.GET.get('limit', LIST_PAGE_SIZE))
+    except ValueError:
+        return error("limit must be a number.")
+    if not 1 <= limit <= LIST_MAX_PAGE_SIZE:
+        return error(f"limit must be between 1 and {LIST_MAX_PAGE_SIZE}.")
+
+    queryset = Client.objects.filter(**{
+        name: request.GET[name] for name in LIST_FILTERS if name in request.GET
+    }).order_by('pk')
+    cursor = request.GET.get('cursor')
+    if cursor:
+        _direction, values = decode_cursor(cursor, [Client._meta.pk])
+        if values is None:
+            return error("Invalid cursor.")
+        queryset = queryset.filter(pk__gt=values[0])
+
+    # The page's keys come from the indexes; the clients themselves from the lookup cache
+    rows = list(queryset.values_list('pk', 'tracker_imei')[:limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+    imeis = [imei for _pk, imei in rows]
+    entries = get_clients('tracker_imei', imeis)
+    next_url = None
+    if more:
+        params = request.GET.copy()
+        params['cursor'] = encode_cursor('next', [rows[-1][0]])
+        next_url = request.build_absolute_uri('?' + params.urlencode())
+    return cached_response(
+        request,
+        {'results': [entries[imei]['client'] for imei in imeis], 'next': next_url},
+        [entries[imei] for imei in imeis],
+        extra=next_url or '',
+    )
@@ -0,0 +1,63 @@
+from django import forms
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.choices import BlankChoiceIterator
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+
+class CachedSelect(forms.Select):
+    """
+    Select whose options are rendered once per language and reused, instead
+    of through a template per option on every render. The country list alone
+    is ~250 options, re-sorted by their translated names on each pass.
+
+    Only for choice lists that don't change while the process runs: the
+    options are memoized under ``key`` and the language, not the choices.
+    Choices from a queryset are refused; lazily translated ones, like the
+    countries, are fine.
+    """
+    template_name = 'client/widgets/cached_select.html'
+
+    # (key, language) -> options HTML with nothing selected
+    rendered_options = {}
+
+    def __init__(self, key, attrs=None, choices=()):
+        self.key = key
+        super().__init__(attrs, choices)
+
+    @property
+    def choices(self):
+        return self._choices
+
+    @choices.setter
+    def choices(self, choices):
+        # Model fields with choices hand them over wrapped with the blank choice
+        static = choices.choices if isinstance(choices, BlankChoiceIterator) else choices
+        if isinstance(static, forms.models.ModelChoiceIterator):
+            raise ImproperlyConfigured(f"CachedSelect {self.key!r} can't memoize choices from a queryset.")
+        self._choices = choices
+
+    def render_options(self):
+        cache_key = (self.key, get_language())
+        options = self.rendered_options.get(cache_key)
+        if options is None:
+            options = format_html_join(
+                '', '<option value="{}">{}</option>',
+                ((self.format_value(value)[0], label) for value, label in self.choices),
+            )
+            self.rendered_options[cache_key] = options
+        return options
+
+    def get_context(self, name, value, attrs):
+        # Skips ChoiceWidget.get_context, which builds an option dict per choice
+        context = forms.Widget.get_context(self, name, value, attrs)
+        options = self.render_options()
+        # Mark the first option with the value as selected, like Select does
+        for selected in context['widget']['value']:
+            option = format_html('<option value="{}">', selected)
+            if option in options:
+                options = options.replace(option, format_html('<option value="{}" selected>', selected), 1)
+                break
+        context['widget']['options'] = mark_safe(options)
+        return context
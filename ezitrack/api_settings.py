@@ -0,0 +1,19 @@
+"""
+Settings for serving only the client API, e.g. to tracker gateways, from
+its own ASGI workers. See ezitrack/asgi.py for the deployment profile.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+ROOT_URLCONF = 'ezitrack.api_urls'
+
+# Only natively async middleware. The session, CSRF, auth and message
+# middleware the admin needs each cost two thread switches per request under
+# ASGI, and the API uses none of them (it authenticates with API keys)
+MIDDLEWARE = [
+    'ezitrack.instrumentation.RequestMetricsMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
+]
+
+# The admin is installed but not served by this profile
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
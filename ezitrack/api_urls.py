@@ -0,0 +1,9 @@
+from django.urls import include, path
+
+from .instrumentation import metrics_view
+
+# URLs of the API-only profile, see ezitrack/api_settings.py
+urlpatterns = [
+    path('api/', include('client.urls')),
+    path('metrics', metrics_view, name='metrics'),
+]
@@ -0,0 +1,24 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.contrib.admin.apps import SimpleAdminConfig
+from django.utils.module_loading import module_has_submodule
+
+
+class AdminConfig(SimpleAdminConfig):
+    """
+    The admin, autodiscovering the admin module of every app but those in
+    ``skip_autodiscover``. import_export's only defines its admin mixins,
+    and importing it loads every export format it checks for, openpyxl and
+    PyYAML among them, at each process start. ClientAdmin loads them on the
+    first export instead, see client.export.LazyExportMixin.
+    """
+    skip_autodiscover = ('import_export',)
+
+    def ready(self):
+        super().ready()
+        for app_config in apps.get_app_configs():
+            if app_config.name in self.skip_autodiscover:
+                continue
+            if module_has_submodule(app_config.module, 'admin'):
+                import_module(f'{app_config.name}.admin')
@@ -5,6 +5,21 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+
+Deployment profile for the client lookup API (async views, see
+client/views.py), next to the admin on gunicorn/WSGI:
+
+    DJANGO_SETTINGS_MODULE=ezitrack.api_settings \\
+    DB_ENGINE=postgresql DB_POOL=1 \\
+    uvicorn ezitrack.asgi:application --workers 4 --lifespan off --no-access-log
+
+- ezitrack.api_settings serves /api/ only, with async middleware only.
+- Use DB_POOL rather than persistent connections (DB_CONN_MAX_AGE), as
+  Django recommends under ASGI.
+- Use a shared CACHES backend such as Redis, so the workers share the
+  lookup cache and its invalidation.
+
+`manage.py benchmark_api` compares this profile with WSGI on one dataset.
 """
 
 import os
@@ -0,0 +1,76 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = 'replica'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_alias():
+    """
+    Returns the alias reads that tolerate replication lag should use: the
+    replica when one is configured, otherwise the default database.
+    """
+    return REPLICA_DB_ALIAS if REPLICA_DB_ALIAS in connections.settings else DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def read_from_replica():
+    """
+    Routes the reads made inside the block to the replica, if configured.
+    """
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Sends reads to the replica only inside read_from_replica() (changelist
+    pages) or when a queryset asks for it with .using() (exports). All other
+    reads stay on the primary, so a page never misses a write it just made.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get():
+            return replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def tune_sqlite(sender, connection, **kwargs):
+    """
+    connection_created receiver applying settings.SQLITE_PRAGMAS.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def insert_from_select(model, field_names, queryset, using=DEFAULT_DB_ALIAS):
+    """
+    Inserts the rows ``queryset`` selects into ``model`` with one
+    INSERT ... SELECT, so they never pass through Python. The queryset must
+    select one value per name in ``field_names``, in that order.
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(model._meta.get_field(name).column) for name in field_names)
+    sql, params = queryset.query.get_compiler(using=using).as_sql()
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {quote(model._meta.db_table)} ({columns}) {sql}', params)
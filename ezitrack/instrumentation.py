@@ -0,0 +1,375 @@
+"""
+Per-request latency and query instrumentation.
+
+RequestMetricsMiddleware times every request, and record_query(), an
+execute_wrapper installed on every database connection, counts its queries,
+their time and the ones it repeats (N+1 patterns). Queries slower than
+settings.SLOW_QUERY_MS are logged by fingerprint, never with their
+parameters. The totals are kept per view in process-local histograms, shared
+between the server processes through the cache and served in the Prometheus
+text format by metrics_view().
+"""
+
+import hashlib
+import hmac
+import logging
+import os
+import re
+import secrets
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = getattr(settings, 'SLOW_QUERY_MS', 200)
+
+# A request running the same SQL this many times is logged as an N+1 pattern
+DUPLICATE_QUERY_THRESHOLD = getattr(settings, 'DUPLICATE_QUERY_THRESHOLD', 10)
+
+# How often a process copies its metrics to the cache, in seconds
+METRICS_PUBLISH_INTERVAL = getattr(settings, 'METRICS_PUBLISH_INTERVAL', 15)
+
+# Upper bounds of the histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# (type, help, buckets) of each metric, in the order they are served
+METRICS = {
+    'ezitrack_request_duration_seconds': (
+        'histogram', "Time spent handling requests, by view.", DURATION_BUCKETS,
+    ),
+    'ezitrack_request_db_duration_seconds': (
+        'histogram', "Time requests spent in database queries, by view.", DURATION_BUCKETS,
+    ),
+    'ezitrack_request_queries': (
+        'histogram', "Database queries per request, by view.", QUERY_COUNT_BUCKETS,
+    ),
+    'ezitrack_duplicate_queries_total': (
+        'counter', "Queries repeating SQL their request already ran, by view.", None,
+    ),
+    'ezitrack_slow_queries_total': (
+        'counter', f"Queries slower than {SLOW_QUERY_MS} ms, by view.", None,
+    ),
+}
+
+# Label of the requests no URL pattern matched, and of queries run outside a request
+UNRESOLVED_VIEW = '<unresolved>'
+NO_VIEW = '<none>'
+
+# Cache keys of the processes that published metrics
+PROCESSES_KEY = 'ezitrack:metrics:processes'
+
+_request_stats = ContextVar('request_stats', default=None)
+
+_IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)+\s*\)')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """
+    Returns ``sql`` with its literals replaced by ? and its IN lists
+    collapsed, so the queries of one statement share a fingerprint.
+    """
+    sql = _IN_LIST.sub('(%s, ...)', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    normalized = normalize_sql(sql)
+    return hashlib.md5(normalized.encode()).hexdigest()[:12], normalized
+
+
+class RequestStats:
+    __slots__ = ('request', 'queries', 'db_time', 'slow_queries', 'statements')
+
+    def __init__(self, request):
+        self.request = request
+        self.queries = 0
+        self.db_time = 0.0
+        self.slow_queries = 0
+        # Executions of each SQL string, to find the repeated ones
+        self.statements = Counter()
+
+    @property
+    def view_name(self):
+        # Set once URL resolution ran, after the outer middleware
+        match = getattr(self.request, 'resolver_match', None)
+        return match.view_name if match is not None else UNRESOLVED_VIEW
+
+    def duplicates(self):
+        return self.queries - len(self.statements)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    execute_wrapper timing every query: counted against the current request,
+    and logged when slower than SLOW_QUERY_MS.
+    """
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += duration
+            stats.statements[sql] += 1
+        if duration * 1000 >= SLOW_QUERY_MS:
+            log_slow_query(sql, duration, stats)
+
+
+def log_slow_query(sql, duration, stats):
+    view_name, path = NO_VIEW, '-'
+    if stats is not None:
+        stats.slow_queries += 1
+        view_name, path = stats.view_name, stats.request.path
+    key, normalized = fingerprint(sql)
+    logger.warning(
+        "Slow query %.1f ms in %s (%s) [%s]: %s", duration * 1000, view_name, path, key, normalized[:2000],
+        extra={'duration': duration, 'view_name': view_name, 'fingerprint': key},
+    )
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    connection_created receiver adding record_query() to the connection's
+    execute wrappers, once per connection object.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+class MetricsRegistry:
+    """
+    The histograms and counters of this process, keyed by (metric, view).
+    Histogram values are [bucket counts, sum, count], bucket counts not yet
+    cumulative.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+        # Unique per process; a PID can come back after a restart
+        self.key = f'ezitrack:metrics:{os.getpid()}:{secrets.token_hex(4)}'
+        self.published = 0.0
+
+    def observe(self, name, view_name, value):
+        buckets = METRICS[name][2]
+        with self.lock:
+            histogram = self.values.get((name, view_name))
+            if histogram is None:
+                histogram = self.values[(name, view_name)] = [[0] * len(buckets), 0.0, 0]
+            index = bisect_left(buckets, value)
+            if index < len(buckets):
+                histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def increment(self, name, view_name, amount=1):
+        with self.lock:
+            self.values[(name, view_name)] = self.values.get((name, view_name), 0) + amount
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                key: [list(value[0]), value[1], value[2]] if isinstance(value, list) else value
+                for key, value in self.values.items()
+            }
+
+    def publish(self, force=False):
+        """
+        Copies this process' metrics to the cache, at most once per
+        METRICS_PUBLISH_INTERVAL unless ``force``, and makes sure the process
+        is listed in PROCESSES_KEY.
+        """
+        now = time.monotonic()
+        if not force and now - self.published < METRICS_PUBLISH_INTERVAL:
+            return
+        self.published = now
+        # Outlives a few missed publishes; a dead process' metrics then expire
+        cache.set(self.key, self.snapshot(), METRICS_PUBLISH_INTERVAL * 10)
+        processes = cache.get(PROCESSES_KEY, [])
+        if self.key not in processes:
+            cache.set(PROCESSES_KEY, [*processes, self.key], None)
+
+
+registry = MetricsRegistry()
+
+
+def collect():
+    """
+    Returns the metrics of every live process, summed.
+    """
+    registry.publish(force=True)
+    processes = cache.get(PROCESSES_KEY, [])
+    snapshots = cache.get_many(processes)
+    if len(snapshots) < len(processes):
+        # Forget the processes whose metrics expired
+        cache.set(PROCESSES_KEY, [key for key in processes if key in snapshots], None)
+    if registry.key not in snapshots:
+        # The cache isn't shared with this process or doesn't keep values
+        snapshots[registry.key] = registry.snapshot()
+
+    totals = {}
+    for snapshot in snapshots.values():
+        for key, value in snapshot.items():
+            total = totals.get(key)
+            if total is None:
+                totals[key] = [list(value[0]), value[1], value[2]] if isinstance(value, list) else value
+            elif isinstance(value, list):
+                total[0] = [a + b for a, b in zip(total[0], value[0])]
+                total[1] += value[1]
+                total[2] += value[2]
+            else:
+                totals[key] += value
+    return totals
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_metrics(totals):
+    """
+    Formats collect()'s totals in the Prometheus text exposition format.
+    """
+    lines = []
+    for name, (metric_type, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        views = sorted(view_name for metric, view_name in totals if metric == name)
+        for view_name in views:
+            value = totals[(name, view_name)]
+            label = f'view="{escape_label(view_name)}"'
+            if metric_type == 'counter':
+                lines.append(f'{name}{{{label}}} {value}')
+                continue
+            counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{label},le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{{label}}} {total:.6f}')
+            lines.append(f'{name}_count{{{label}}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def has_metrics_token(request):
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return False
+    return any(
+        hmac.compare_digest(token.encode(), key.encode())
+        for key in getattr(settings, 'METRICS_TOKENS', [])
+    )
+
+
+def is_staff(user):
+    return user is not None and user.is_active and user.is_staff
+
+
+def metrics_view(request):
+    """
+    Serves the metrics to staff users, or to a scraper sending one of
+    settings.METRICS_TOKENS as a Bearer token.
+    """
+    if not is_staff(getattr(request, 'user', None)) and not has_metrics_token(request):
+        return HttpResponseForbidden()
+    response = HttpResponse(render_metrics(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+class RequestMetricsMiddleware:
+    """
+    Records each request's time, database time, query count and repeated
+    queries against its view, and adds them to the response as a
+    Server-Timing header for staff users, or anyone with DEBUG on. Goes
+    first in MIDDLEWARE, to time the others too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats(request)
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        self.finish(request, response, stats, time.perf_counter() - start, getattr(request, 'user', None))
+        return response
+
+    async def __acall__(self, request):
+        # Queries run in sync_to_async threads still see the context variable
+        stats = RequestStats(request)
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        duration = time.perf_counter() - start
+        # request.user would load the user synchronously
+        user = await request.auser() if hasattr(request, 'auser') else None
+        self.finish(request, response, stats, duration, user)
+        return response
+
+    def finish(self, request, response, stats, duration, user):
+        view_name = stats.view_name
+
+        registry.observe('ezitrack_request_duration_seconds', view_name, duration)
+        registry.observe('ezitrack_request_db_duration_seconds', view_name, stats.db_time)
+        registry.observe('ezitrack_request_queries', view_name, stats.queries)
+        duplicates = stats.duplicates()
+        if duplicates:
+            registry.increment('ezitrack_duplicate_queries_total', view_name, duplicates)
+        if stats.slow_queries:
+            registry.increment('ezitrack_slow_queries_total', view_name, stats.slow_queries)
+
+        if stats.statements:
+            sql, repeats = stats.statements.most_common(1)[0]
+            if repeats >= DUPLICATE_QUERY_THRESHOLD:
+                key, normalized = fingerprint(sql)
+                logger.warning(
+                    "%s ran the same query %d times (%d queries in all) [%s]: %s",
+                    view_name, repeats, stats.queries, key, normalized[:2000],
+                    extra={'view_name': view_name, 'fingerprint': key},
+                )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "%s %s %s: %.1f ms, %d queries in %.1f ms, %d duplicates",
+                request.method, request.path, view_name, duration * 1000,
+                stats.queries, stats.db_time * 1000, duplicates,
+            )
+
+        # The timings tell anyone how much work a URL costs, so only staff see them
+        if settings.DEBUG or is_staff(user):
+            response['Server-Timing'] = (
+                f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+                f'total;dur={duration * 1000:.1f}'
+            )
+        # A cache call every METRICS_PUBLISH_INTERVAL, not per request
+        registry.publish()
@@ -25,7 +25,8 @@ INSTALLED_APPS = [
     'import_export',
     'django_countries',
     'corsheaders',
-    'django.contrib.admin',
+    # The admin without import_export's admin module, see ezitrack/apps.py
+    'ezitrack.apps.AdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -36,7 +37,17 @@ INSTALLED_APPS = [
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
 
+# Bearer tokens accepted by the client API, comma separated
+CLIENT_API_KEYS = [key for key in os.environ.get('CLIENT_API_KEYS', '').split(',') if key]
+
+# Bearer tokens accepted by /metrics besides a staff login, comma separated
+METRICS_TOKENS = [key for key in os.environ.get('METRICS_TOKENS', '').split(',') if key]
+
+# Queries slower than this are logged, see ezitrack/instrumentation.py
+SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', 200))
+
 MIDDLEWARE = [
+    'ezitrack.instrumentation.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -44,6 +55,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'client.middleware.ClientHistoryMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -71,12 +83,114 @@ WSGI_APPLICATION = 'ezitrack.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE selects the profile: "sqlite" (default, small installs) or "postgresql"
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+
+def env_bool(name, default=False):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+
+def postgres_database(host):
+    database = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('DB_NAME', 'ezitrack'),
+        'USER': os.environ.get('DB_USER', 'ezitrack'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': host,
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        # Keep connections open between requests and check them before reuse
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
+    }
+    if env_bool('DB_POOL'):
+        # psycopg connection pool (Django 5.1+); replaces persistent connections
+        database['CONN_MAX_AGE'] = 0
+        database['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+        }
+    return database
+
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': postgres_database(os.environ.get('DB_HOST', 'localhost')),
+    }
+    if os.environ.get('DB_REPLICA_HOST'):
+        # Read replica for changelist reads and exports, see ezitrack.db.ReplicaRouter
+        DATABASES['replica'] = {
+            **postgres_database(os.environ['DB_REPLICA_HOST']),
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            # Take the write lock when a transaction starts; a deferred transaction that
+            # reads and then writes fails at once when another writer holds the lock
+            'OPTIONS': {'transaction_mode': 'IMMEDIATE'} if env_bool('DB_SQLITE_TUNED', True) else {},
+        }
     }
-}
+
+DATABASE_ROUTERS = ['ezitrack.db.ReplicaRouter']
+
+# Applied to every new SQLite connection by ezitrack.db.tune_sqlite. WAL lets
+# readers run alongside the writer, busy_timeout makes writers wait for the
+# lock instead of failing with "database is locked"
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.environ.get('DB_BUSY_TIMEOUT', 20000)),
+    'mmap_size': int(os.environ.get('DB_MMAP_SIZE', 256 * 1024 * 1024)),
+} if env_bool('DB_SQLITE_TUNED', True) else {}
+
+# CACHE_BACKEND selects the cache shared by the workers: "redis" (CACHE_LOCATION
+# is its URL; any Redis-compatible server), "file" (default, a directory on
+# this host) or "locmem" (per process, for a single worker)
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'file')
+CACHE_KEY_PREFIX = os.environ.get('CACHE_KEY_PREFIX', 'ezitrack')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', 'redis://127.0.0.1:6379/0'),
+            'KEY_PREFIX': CACHE_KEY_PREFIX,
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')),
+            'KEY_PREFIX': CACHE_KEY_PREFIX,
+            # Culling lists the directory on every set, so keep it small
+            'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 5000))},
+        },
+        # An API batch caches up to a thousand lookups at once, too many
+        # sets for the file cache; they stay in each worker's memory and a
+        # change drops them in all workers through the shared versions
+        'lookups': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'lookups',
+            'KEY_PREFIX': CACHE_KEY_PREFIX,
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        },
+    }
+    CLIENT_API_CACHE_ALIAS = 'lookups'
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'KEY_PREFIX': CACHE_KEY_PREFIX,
+        }
+    }
+
+# Sessions are read from the cache and only written through to the database
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -116,8 +230,32 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
-WHITENOISE_AUTOREFRESH = True  # Set this to False in production
-WHITENOISE_USE_FINDERS = True
+# STATIC_DEV=1 serves the static files straight from the apps, for runserver
+# without collectstatic. Otherwise collectstatic writes content-hashed copies
+# with gzip and brotli versions next to them, and WhiteNoise serves those
+# precompressed with a far-future immutable Cache-Control. Check the result
+# with manage.py static_report
+STATIC_DEV = env_bool('STATIC_DEV', DEBUG)
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if STATIC_DEV
+            else 'ezitrack.storage.ManifestStaticFilesStorage'
+        ),
+    },
+}
+
+# Jazzmin's base template asks for {% static 'vendor/bootswatch' %}, a
+# directory, which has no manifest entry; unlisted names are served unhashed
+WHITENOISE_MANIFEST_STRICT = False
+
+# Rescanning the files on every request is only useful while they change
+WHITENOISE_AUTOREFRESH = STATIC_DEV
+WHITENOISE_USE_FINDERS = STATIC_DEV
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -200,6 +338,9 @@ JAZZMIN_SETTINGS: Dict[str, Any] = {
         "auth.Group": "fas fa-users",
         "admin.LogEntry": "fas fa-file",
         "client.Client": "fas fa-users",
+        "client.ExpiryRollup": "fas fa-calendar-alt",
+        "client.ExpiryExtension": "fas fa-calendar-plus",
+        "client.ClientEvent": "fas fa-history",
     },
     # Icons that are used when one is not manually specified
     "default_icon_parents": "fas fa-chevron-circle-right",
@@ -214,7 +355,7 @@ JAZZMIN_SETTINGS: Dict[str, Any] = {
     #############
     # Relative paths to custom CSS/JS scripts (must be present in static files)
     "custom_css": "css/custom.css",
-    "custom_js": "js/custom.js",
+    "custom_js": None,
     # Whether to show the UI customizer on the sidebar
     "show_ui_builder": False,
     ###############
@@ -268,3 +409,22 @@ JAZZMIN_UI_TWEAKS = {
         "success": "btn-success"
     }
 }
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '{asctime} {levelname} {name}: {message}', 'style': '{'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
+    },
+    'loggers': {
+        # Slow queries and N+1 patterns; DEBUG also logs every request
+        'ezitrack.instrumentation': {
+            'handlers': ['console'],
+            'level': os.environ.get('INSTRUMENTATION_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
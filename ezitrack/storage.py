@@ -0,0 +1,14 @@
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class ManifestStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    Hashed, precompressed static files. Until collectstatic has written the
+    manifest the files keep their plain names, instead of every page failing
+    to hash names that aren't in STATIC_ROOT yet.
+    """
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
@@ -1,10 +1,12 @@
-from django.conf import settings
 from django.contrib import admin
-from django.urls import path
-from django.conf.urls.static import static
+from django.urls import include, path
+
+from .instrumentation import metrics_view
 
 admin.site.site_header = "EziTrack QMS"
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+    path('api/', include('client.urls')),
+    path('metrics', metrics_view, name='metrics'),
+]